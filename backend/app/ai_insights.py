@@ -9,11 +9,39 @@ Service Coordination Strategy:
 """
 
 import os
-from typing import List, Dict, Any
-from dotenv import load_dotenv
-from .gemini_client import generate_text, check_ai_available, GEMINI_MODEL
+import re
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from .gemini_client import generate_text_async, check_ai_available, GEMINI_MODEL
+from .cache_manager import cache_manager, generate_cache_key
+from .embedding_service import encode_texts
+from .token_budget import truncate_to_tokens
+from .rule_based_insights import (
+    keyword_strings, rule_based_strengths, rule_based_gaps, rule_based_recommendations,
+    generate_offline_insights, generate_rule_based_insights
+)
 
-load_dotenv()
+# Prompt token budgets for the resume and job description excerpts
+RESUME_PROMPT_TOKENS = 125
+JOB_PROMPT_TOKENS = 100
+
+# Insight responses are a single short list; stop if the model starts a new section
+INSIGHTS_STOP_SEQUENCES = ['\n\n\n']
+
+# Bulleted line ("- ", "• ", "* ") with more than 15 characters of text in
+# group 2. The lookahead and backreference take the whole marker run without
+# backtracking into it (an atomic group before Python 3.11), so markers and
+# padding never count toward the text
+BULLET_PATTERN = re.compile(r'^[ \t]*[-•*](?=([-•* ]*))\1(\S.{14,}\S)[ \t\r]*$', re.M)
+
+# Numbered or bulleted line ("1. ", "- ", "• ") with more than 20 characters of text in group 2
+NUMBERED_PATTERN = re.compile(r'^[ \t]*[\d\-•](?=([\d.\-•* ]*))\1(\S.{19,}\S)[ \t\r]*$', re.M)
+
+# Worker processes for rule-based insights, created on first use
+_rule_based_pool: Optional[ProcessPoolExecutor] = None
 
 # Check AI availability on startup
 AI_AVAILABLE = check_ai_available()
@@ -24,7 +52,112 @@ else:
     print("⚠ AI service not available, using rule-based fallback")
 
 
-def generate_ai_insights(
+async def generate_ai_insights_cached(
+    resume_text: str,
+    job_description: str,
+    keyword_analysis: Dict[str, Any],
+    scores: Dict[str, float]
+) -> Dict[str, Any]:
+    """
+    Generate insights, reusing results for near-identical resume/job pairs
+    
+    Users typically re-submit lightly edited resumes against the same job,
+    so insights are cached by an exact hash and by embedding similarity.
+    The resume and job are only embedded when the exact hash misses, and
+    insights that fell back to rules are not cached.
+    
+    Args:
+        resume_text: Full resume text
+        job_description: Full job description text
+        keyword_analysis: Keyword matching results
+        scores: Calculated scores (semantic, keyword, format, ats)
+    
+    Returns:
+        Dictionary with strengths, gaps, and recommendations
+    """
+    if not AI_AVAILABLE:
+        # Rule-based insights are pure-Python CPU work; keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_rule_based_pool(),
+            generate_offline_insights,
+            resume_text,
+            job_description,
+            keyword_analysis,
+            scores
+        )
+    
+    cache = cache_manager.get_insights_cache()
+    cache_key = f"insights:{generate_cache_key(resume_text, job_description)}"
+    
+    cached_insights = cache.get(cache_key)
+    if cached_insights is not None:
+        return cached_insights
+    
+    query_vector = await asyncio.to_thread(embed_insights_query, resume_text, job_description)
+    
+    if query_vector is not None:
+        cached_insights = cache.get(cache_key, query_vector)
+        if cached_insights is not None:
+            return cached_insights
+    
+    insights, used_fallback = await generate_insights_with_fallback_flag(
+        resume_text, job_description, keyword_analysis, scores
+    )
+    
+    # A rule-based section would otherwise outlive the outage that caused it
+    if not used_fallback:
+        cache.set(cache_key, query_vector, insights)
+    
+    return insights
+
+
+def get_rule_based_pool() -> ProcessPoolExecutor:
+    """Get the process pool for rule-based insights, creating it on first use"""
+    global _rule_based_pool
+    
+    if _rule_based_pool is None:
+        # Spawned rather than forked, since the app is running threads by
+        # now; workers only import the rule_based_insights module
+        _rule_based_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    
+    return _rule_based_pool
+
+
+def shutdown_rule_based_pool() -> None:
+    """Stop the rule-based insights worker processes"""
+    global _rule_based_pool
+    
+    if _rule_based_pool is not None:
+        _rule_based_pool.shutdown(wait=False, cancel_futures=True)
+        _rule_based_pool = None
+
+
+def embed_insights_query(resume_text: str, job_description: str) -> Optional[np.ndarray]:
+    """
+    Embed a resume/job pair for semantic cache lookups
+    
+    Resume and job are embedded separately so a long resume cannot crowd the
+    job description out of the model's input window. The two unit vectors
+    are concatenated and rescaled, making the dot product of two queries the
+    mean of their resume and job cosine similarities.
+    
+    Returns:
+        Unit-length query vector, or None if embeddings are unavailable
+    """
+    try:
+        resume_vector, job_vector = encode_texts([resume_text, job_description])
+    except Exception as e:
+        print(f"Insights cache embedding unavailable: {e}")
+        return None
+    
+    return (np.concatenate([resume_vector, job_vector]) / np.sqrt(2)).astype(np.float32)
+
+
+async def generate_ai_insights(
     resume_text: str,
     job_description: str,
     keyword_analysis: Dict[str, Any],
@@ -42,351 +175,212 @@ def generate_ai_insights(
     Returns:
         Dictionary with strengths, gaps, and recommendations
     """
+    insights, _ = await generate_insights_with_fallback_flag(resume_text, job_description, keyword_analysis, scores)
+    return insights
+
+
+async def generate_insights_with_fallback_flag(
+    resume_text: str,
+    job_description: str,
+    keyword_analysis: Dict[str, Any],
+    scores: Dict[str, float]
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Generate personalized insights using AI, reporting any rule-based fallback
+    
+    Args:
+        resume_text: Full resume text
+        job_description: Full job description text
+        keyword_analysis: Keyword matching results
+        scores: Calculated scores (semantic, keyword, format, ats)
+    
+    Returns:
+        Dictionary with strengths, gaps, and recommendations, and whether
+        any section fell back to rule-based output
+    """
     
     try:
-        # Generate strengths
-        strengths = generate_strengths(resume_text, job_description, keyword_analysis, scores)
+        # Strengths and gaps are independent, so generate them concurrently
+        (strengths, strengths_from_ai), (gaps, gaps_from_ai) = await asyncio.gather(
+            generate_strengths(resume_text, job_description, keyword_analysis, scores),
+            generate_gaps(resume_text, job_description, keyword_analysis, scores)
+        )
         
-        # Generate gaps
-        gaps = generate_gaps(resume_text, job_description, keyword_analysis, scores)
+        # Recommendations depend on the gaps
+        recommendations, recommendations_from_ai = await generate_recommendations(
+            resume_text, job_description, keyword_analysis, scores, gaps
+        )
         
-        # Generate specific recommendations
-        recommendations = generate_recommendations(resume_text, job_description, keyword_analysis, scores, gaps)
-        
-        return {
+        insights = {
             "strengths": strengths,
             "gaps": gaps,
             "recommendations": recommendations
         }
+        return insights, not (strengths_from_ai and gaps_from_ai and recommendations_from_ai)
         
     except Exception as e:
         print(f"AI insights generation failed: {e}")
         import traceback
         traceback.print_exc()
         # Fallback to rule-based
-        return generate_rule_based_insights(resume_text, job_description, keyword_analysis, scores)
+        return generate_rule_based_insights(resume_text, job_description, keyword_analysis, scores), True
 
 
-def call_ai(prompt: str, max_tokens: int = 500) -> str:
-    """Call AI service for text generation"""
-    return generate_text(
+async def call_ai(prompt: str, max_tokens: int = 500) -> str:
+    """Call AI service for text generation without blocking the event loop"""
+    return await generate_text_async(
         prompt=prompt,
         model=GEMINI_MODEL,
         max_tokens=max_tokens,
-        temperature=0.7,
-        timeout=90
+        temperature=0.0,
+        top_p=0.1,
+        timeout=90,
+        stop_sequences=INSIGHTS_STOP_SEQUENCES
     )
 
 
-def generate_strengths(resume_text: str, job_description: str, keyword_analysis: Dict, scores: Dict) -> List[str]:
-    """Generate personalized strengths using Ollama AI"""
+def build_insights_context(resume_text: str, job_description: str, keyword_analysis: Dict, scores: Dict) -> str:
+    """
+    Build the context block shared by the strengths, gaps and recommendations prompts
     
+    Every insights prompt starts with this byte-identical block and ends with
+    its own task instruction, so Gemini can reuse the processed prefix
+    across the three calls.
+    """
     try:
-        matched_keywords = keyword_analysis.get('matched_keywords', [])[:10]
-        matched_kw_str = ', '.join([kw.get('keyword', '') if isinstance(kw, dict) else str(kw) for kw in matched_keywords[:5]])
+        matched_kw_str = ', '.join(keyword_strings(keyword_analysis.get('matched_keywords', [])[:5]))
+        missing_kw_str = ', '.join(keyword_strings(keyword_analysis.get('missing_keywords', [])[:8]))
     except Exception as e:
-        print(f"Error parsing matched keywords: {e}")
-        matched_keywords = []
+        print(f"Error parsing keywords for prompt context: {e}")
         matched_kw_str = ''
+        missing_kw_str = ''
     
-    # Try AI first
-    if AI_AVAILABLE:
-        try:
-            prompt = f"""Analyze candidate strengths for this job.
-
+    return f"""CONTEXT:
 Job Requirements:
-{job_description[:400]}
+{truncate_to_tokens(job_description, JOB_PROMPT_TOKENS)}
 
 Resume:
-{resume_text[:500]}
+{truncate_to_tokens(resume_text, RESUME_PROMPT_TOKENS)}
 
 Matched Skills: {matched_kw_str}
-Score: {scores.get('keyword', 0)}/100
+Missing Skills: {missing_kw_str}
+Score: {scores.get('keyword', 0)}/100"""
+
+
+async def generate_strengths(
+    resume_text: str, job_description: str, keyword_analysis: Dict, scores: Dict
+) -> Tuple[List[str], bool]:
+    """Generate personalized strengths using AI, and whether the AI produced them"""
+    
+    try:
+        matched_keywords = keyword_strings(keyword_analysis.get('matched_keywords', [])[:10])
+    except Exception as e:
+        print(f"Error parsing matched keywords: {e}")
+        matched_keywords = []
+    
+    # Try AI first
+    if AI_AVAILABLE:
+        try:
+            prompt = f"""{build_insights_context(resume_text, job_description, keyword_analysis, scores)}
 
-List 3-4 specific strengths. Use - for bullets."""
+TASK: Analyze candidate strengths for this job.
+List 3-4 specific strengths. Use - for bullets. Output only the bulleted list, nothing else."""
 
-            response = call_ai(prompt, max_tokens=200)
+            response = await call_ai(prompt, max_tokens=130)
             
             # Parse response into list
-            strengths = []
-            for line in response.split('\n'):
-                line = line.strip()
-                if line and (line.startswith('-') or line.startswith('•') or line.startswith('*')):
-                    strength = line.lstrip('-•* ').strip()
-                    if strength and len(strength) > 15:
-                        strengths.append(strength)
+            strengths = [match.group(2) for match in BULLET_PATTERN.finditer(response)]
             
             if strengths:
-                return strengths[:5]
+                return strengths[:5], True
                 
         except Exception as e:
             print(f"AI strengths generation failed: {e}")
     
     # Fallback to rule-based
-    strengths = []
-    
-    if len(matched_keywords) >= 5:
-        top_skills = [kw.get('keyword', '') if isinstance(kw, dict) else str(kw) for kw in matched_keywords[:3]]
-        strengths.append(f"Strong match in key areas: {', '.join(top_skills)}")
-    
-    keyword_score = scores.get('keyword', 0)
-    if keyword_score > 70:
-        strengths.append(f"Excellent keyword alignment ({keyword_score}% match with job requirements)")
-    elif keyword_score > 50:
-        strengths.append(f"Good keyword coverage ({keyword_score}% match with job requirements)")
-    
-    format_score = scores.get('format', 0)
-    if format_score > 80:
-        strengths.append("Well-structured, ATS-optimized resume format")
-    
-    return strengths[:5] if strengths else ["Relevant experience for the role"]
+    return rule_based_strengths(matched_keywords, scores), False
 
 
-def generate_gaps(resume_text: str, job_description: str, keyword_analysis: Dict, scores: Dict) -> List[str]:
-    """Generate personalized gaps using Ollama AI"""
+async def generate_gaps(
+    resume_text: str, job_description: str, keyword_analysis: Dict, scores: Dict
+) -> Tuple[List[str], bool]:
+    """Generate personalized gaps using AI, and whether the AI produced them"""
     
     try:
-        missing_keywords = keyword_analysis.get('missing_keywords', [])[:15]
-        missing_kw_str = ', '.join([kw.get('keyword', '') if isinstance(kw, dict) else str(kw) for kw in missing_keywords[:8]])
+        missing_keywords = keyword_strings(keyword_analysis.get('missing_keywords', [])[:15])
     except Exception as e:
         print(f"Error parsing missing keywords: {e}")
         missing_keywords = []
-        missing_kw_str = ''
     
     # Try AI first
     if AI_AVAILABLE:
         try:
-            prompt = f"""Identify gaps in this resume for the job.
+            prompt = f"""{build_insights_context(resume_text, job_description, keyword_analysis, scores)}
 
-Job Requirements:
-{job_description[:400]}
-
-Resume:
-{resume_text[:500]}
-
-Missing: {missing_kw_str}
-Score: {scores.get('keyword', 0)}/100
+TASK: Identify gaps in this resume for the job.
+List 3-4 specific gaps. Use - for bullets. Output only the bulleted list, nothing else."""
 
-List 3-4 specific gaps. Use - for bullets."""
-
-            response = call_ai(prompt, max_tokens=200)
+            response = await call_ai(prompt, max_tokens=130)
             
             # Parse response
-            gaps = []
-            for line in response.split('\n'):
-                line = line.strip()
-                if line and (line.startswith('-') or line.startswith('•') or line.startswith('*')):
-                    gap = line.lstrip('-•* ').strip()
-                    if gap and len(gap) > 15:
-                        gaps.append(gap)
+            gaps = [match.group(2) for match in BULLET_PATTERN.finditer(response)]
             
             if gaps:
-                return gaps[:5]
+                return gaps[:5], True
                 
         except Exception as e:
             print(f"AI gaps generation failed: {e}")
     
     # Fallback to rule-based
-    gaps = []
-    
-    if missing_keywords:
-        top_missing = [kw.get('keyword', '') if isinstance(kw, dict) else str(kw) for kw in missing_keywords[:5]]
-        meaningful_missing = [kw for kw in top_missing if len(kw) > 3 and kw not in ['with', 'and', 'the', 'for', 'from', 'that', 'this', 'work', 'using', 'experience']]
-        if meaningful_missing:
-            gaps.append(f"Missing key skills: {', '.join(meaningful_missing)}")
-    
-    keyword_score = scores.get('keyword', 0)
-    if keyword_score < 50:
-        gaps.append("Resume lacks many keywords from the job description")
-    
-    return gaps[:5] if gaps else ["Consider tailoring resume more specifically to this job description"]
+    return rule_based_gaps(missing_keywords, scores), False
 
 
-def generate_recommendations(
+async def generate_recommendations(
     resume_text: str, 
     job_description: str, 
     keyword_analysis: Dict, 
     scores: Dict,
     gaps: List[str]
-) -> List[Dict[str, Any]]:
-    """Generate specific, actionable recommendations using Ollama AI"""
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Generate specific, actionable recommendations using AI, and whether the AI produced them"""
     
     # Try AI first
     if AI_AVAILABLE:
         try:
             gaps_str = '\n'.join([f"- {gap}" for gap in gaps[:3]])
             
-            prompt = f"""Provide actionable recommendations to improve this resume.
-
-Job:
-{job_description[:350]}
+            prompt = f"""{build_insights_context(resume_text, job_description, keyword_analysis, scores)}
 
 Gaps:
 {gaps_str}
 
-Give 3-4 specific recommendations. Use numbered list (1., 2., 3.)."""
+TASK: Provide actionable recommendations to improve this resume.
+Give 3-4 specific recommendations. Use numbered list (1., 2., 3.). Output only the numbered list, nothing else."""
 
-            response = call_ai(prompt, max_tokens=250)
+            response = await call_ai(prompt, max_tokens=180)
             
             # Parse response
             recommendations = []
-            lines = response.split('\n')
             
-            for i, line in enumerate(lines):
-                line = line.strip()
-                if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
-                    rec_text = line.lstrip('0123456789.-•* ').strip()
-                    
-                    if rec_text and len(rec_text) > 20:
-                        priority = 'high' if i < 2 else 'medium' if i < 4 else 'low'
-                        
-                        recommendations.append({
-                            "id": f"ai-rec-{i+1}",
-                            "type": "content",
-                            "priority": priority,
-                            "suggestedText": rec_text[:250],
-                            "explanation": "AI-generated personalized recommendation",
-                            "impact": 15 if priority == 'high' else 10 if priority == 'medium' else 5,
-                            "applied": False
-                        })
+            for i, match in enumerate(NUMBERED_PATTERN.finditer(response)):
+                rec_text = match.group(2)
+                priority = 'high' if i < 2 else 'medium' if i < 4 else 'low'
+                
+                recommendations.append({
+                    "id": f"ai-rec-{i+1}",
+                    "type": "content",
+                    "priority": priority,
+                    "suggestedText": rec_text[:250],
+                    "explanation": "AI-generated personalized recommendation",
+                    "impact": 15 if priority == 'high' else 10 if priority == 'medium' else 5,
+                    "applied": False
+                })
             
             if recommendations:
-                return recommendations[:5]
+                return recommendations[:5], True
                 
         except Exception as e:
             print(f"AI recommendations generation failed: {e}")
     
     # Fallback to rule-based
-    recommendations = []
-    rec_id = 1
-    
-    try:
-        missing_keywords = keyword_analysis.get('missing_keywords', [])[:10]
-    except Exception as e:
-        print(f"Error getting missing keywords: {e}")
-        missing_keywords = []
-    
-    # Recommendation 1: Add missing keywords (filtered)
-    if missing_keywords:
-        try:
-            top_missing = [kw.get('keyword', '') if isinstance(kw, dict) else str(kw) for kw in missing_keywords[:10]]
-            meaningful_missing = [kw for kw in top_missing if len(kw) > 3 and kw not in ['with', 'and', 'the', 'for', 'from', 'that', 'this', 'work', 'using', 'experience', 'including', 'turing', 'memory']]
-        except Exception as e:
-            print(f"Error extracting keywords for recommendations: {e}")
-            meaningful_missing = []
-        
-        if meaningful_missing:
-            recommendations.append({
-                "id": f"rec-{rec_id}",
-                "type": "keyword",
-                "priority": "high",
-                "suggestedText": f"Add these important keywords to your resume: {', '.join(meaningful_missing[:5])}",
-                "explanation": "These keywords appear frequently in the job description but are missing from your resume.",
-                "impact": 20,
-                "applied": False
-            })
-            rec_id += 1
-    
-    # Recommendation 2: Improve semantic alignment
-    semantic_score = scores.get('semantic', 0)
-    if semantic_score < 70:
-        recommendations.append({
-            "id": f"rec-{rec_id}",
-            "type": "content",
-            "priority": "high",
-            "suggestedText": "Rephrase your experience using terminology from the job description",
-            "explanation": "Your resume uses different language than the job posting. Mirror the job description's phrasing to improve relevance.",
-            "impact": 15,
-            "applied": False
-        })
-        rec_id += 1
-    
-    # Recommendation 3: Add quantifiable achievements (context-aware)
-    has_numbers = any(char.isdigit() for char in resume_text[:1000])
-    if not has_numbers or resume_text.count('%') < 2:
-        # Detect role type from job description
-        is_technical = any(word in job_description.lower() for word in ['developer', 'engineer', 'programmer', 'software', 'technical'])
-        is_management = any(word in job_description.lower() for word in ['manager', 'lead', 'director', 'supervisor'])
-        
-        if is_technical:
-            example = "e.g., 'Reduced API response time by 40%', 'Improved code coverage to 85%', 'Optimized database queries reducing load time by 50%'"
-        elif is_management:
-            example = "e.g., 'Led team of 8 engineers', 'Increased team velocity by 35%', 'Reduced sprint cycle time by 2 days'"
-        else:
-            example = "e.g., 'Improved process efficiency by 30%', 'Reduced costs by $50K annually', 'Managed portfolio of 15+ projects'"
-        
-        recommendations.append({
-            "id": f"rec-{rec_id}",
-            "type": "content",
-            "priority": "medium",
-            "suggestedText": f"Add quantifiable metrics to your achievements {example}",
-            "explanation": "Numbers and metrics make your accomplishments more concrete and measurable.",
-            "impact": 12,
-            "applied": False
-        })
-        rec_id += 1
-    
-    # Recommendation 4: Format improvements
-    format_score = scores.get('format', 0)
-    if format_score < 80:
-        recommendations.append({
-            "id": f"rec-{rec_id}",
-            "type": "format",
-            "priority": "medium",
-            "suggestedText": "Improve resume formatting for better ATS compatibility",
-            "explanation": "Use standard section headers (Experience, Education, Skills), avoid tables/columns, and use simple formatting.",
-            "impact": 10,
-            "applied": False
-        })
-        rec_id += 1
-    
-    # Recommendation 5: Tailor experience descriptions
-    if len(missing_keywords) > 5:
-        recommendations.append({
-            "id": f"rec-{rec_id}",
-            "type": "content",
-            "priority": "medium",
-            "suggestedText": "Tailor your experience bullet points to highlight skills mentioned in the job description",
-            "explanation": "Review each bullet point and add relevant keywords where they naturally fit your actual experience.",
-            "impact": 15,
-            "applied": False
-        })
-        rec_id += 1
-    
-    return recommendations[:5]
-
-
-def generate_rule_based_insights(
-    resume_text: str,
-    job_description: str,
-    keyword_analysis: Dict,
-    scores: Dict
-) -> Dict[str, Any]:
-    """Fallback rule-based insights when AI is not available"""
-    
-    matched_keywords = keyword_analysis.get('matched_keywords', [])
-    missing_keywords = keyword_analysis.get('missing_keywords', [])
-    
-    strengths = []
-    gaps = []
-    
-    # Analyze strengths
-    if len(matched_keywords) > 10:
-        strengths.append(f"Strong keyword match with {len(matched_keywords)} relevant skills")
-    
-    if scores.get('format', 0) > 80:
-        strengths.append("Well-formatted, ATS-friendly resume")
-    
-    # Analyze gaps
-    if missing_keywords:
-        top_missing = [kw.get('keyword', '') for kw in missing_keywords[:5]]
-        gaps.append(f"Missing key skills: {', '.join(top_missing)}")
-    
-    if scores.get('semantic', 0) < 60:
-        gaps.append("Resume language doesn't closely match job description terminology")
-    
-    return {
-        "strengths": strengths[:5],
-        "gaps": gaps[:5],
-        "recommendations": []
-    }
+    return rule_based_recommendations(resume_text, job_description, keyword_analysis, scores), False
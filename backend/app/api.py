@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from .models import (
     BiasAnalysisRequest, BiasAnalysisResponse,
     LocalizationRequest, LocalizationResponse,
@@ -10,24 +10,83 @@ from .models import (
     AutoFixRequest, AutoFixResponse,
     PDFGenerationRequest
 )
-from .ai_insights import generate_ai_insights
+from .ai_insights import generate_ai_insights_cached
 from .bias_detection import analyze_bias
 from .localization import get_localization_advice
 from .ats_analyzer import analyze_ats_compatibility
-from .batch_rewriter import rewrite_bullets_batch, check_ai_rewriter_available
-from .chat_service import generate_chat_response
+from .batch_rewriter import (
+    rewrite_bullets_batch, check_ai_rewriter_available,
+    submit_rewrite_batch_job, collect_rewrite_batch_job
+)
+from .gemini_client import GEMINI_BATCH_ENABLED
+from .chat_service import generate_chat_response, stream_chat_response
+from .embedding_service import (
+    encode_texts_for_api, encode_embeddings_base64, encode_embeddings_binary,
+    get_api_embedding_model_name
+)
 from .rate_limiter import rate_limit
 from .resume_optimizer import optimize_resume_content
 from .grammar_fixer import fix_grammar_and_ats
-from .keyword_injector import inject_keywords_intelligently
-from .template_engine import template_engine
+from .keyword_injector import (
+    inject_keywords_intelligently, plan_keyword_placements, merge_injected_skills
+)
+from .template_engine import generate_pdf_async
+from .cache_manager import cache_manager
 import time
+import json
 import asyncio
+import hashlib
+import orjson
+from typing import Dict, Any
 
 router = APIRouter()
 
-# In-memory storage for rate limiting (will be replaced with Redis in production)
-request_history = {}
+
+class NumpyJSONResponse(JSONResponse):
+    """JSON response rendered by orjson, serializing NumPy arrays directly"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+# In-flight /generate-insights work keyed by payload hash, so concurrent
+# duplicate requests (double-clicks, retries) share one upstream call
+_inflight_insights: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+def insights_request_key(
+    resume_text: str,
+    job_description: str,
+    keyword_analysis: dict,
+    scores: dict
+) -> str:
+    """
+    Hash an insights payload for in-flight request coalescing
+    
+    Returns:
+        Hex digest identifying the payload
+    """
+    payload = json.dumps(
+        [resume_text, job_description, keyword_analysis, scores],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def auto_fix_request_key(payload: AutoFixRequest) -> str:
+    """
+    Hash an auto-fix payload for result caching
+    
+    Returns:
+        Cache key identifying the payload
+    """
+    key_payload = json.dumps(
+        [payload.resume_json, payload.job_description, payload.ats_issues,
+         payload.recommendations, payload.options],
+        sort_keys=True,
+        default=str
+    )
+    return f"auto_fix:{hashlib.blake2b(key_payload.encode('utf-8'), digest_size=16).hexdigest()}"
 
 
 @router.post("/analyze-bias", response_model=BiasAnalysisResponse)
@@ -39,7 +98,7 @@ async def analyze_bias_endpoint(request: Request, payload: BiasAnalysisRequest):
     Returns detected biased phrases with neutral suggestions
     """
     try:
-        result = analyze_bias(payload.text)
+        result = await asyncio.to_thread(analyze_bias, payload.text)
         return BiasAnalysisResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -54,7 +113,9 @@ async def localize_endpoint(request: Request, payload: LocalizationRequest):
     Returns region-specific formatting and terminology recommendations
     """
     try:
-        result = get_localization_advice(payload.resume_text, payload.target_region)
+        result = await asyncio.to_thread(
+            get_localization_advice, payload.resume_text, payload.target_region
+        )
         return LocalizationResponse(**result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -68,7 +129,9 @@ async def rewrite_batch_endpoint(request: Request, payload: RewriteBatchRequest)
     """
     Rewrite multiple resume bullets in batch using AI
     
-    Uses Ollama to generate improved, impactful bullet points
+    Uses Ollama to generate improved, impactful bullet points.
+    When GEMINI_BATCH_ENABLED is set, the bullets are submitted as a single
+    Gemini batch job and a 202 response with a job ID to poll is returned.
     """
     try:
         # Check if AI service is available
@@ -78,8 +141,22 @@ async def rewrite_batch_endpoint(request: Request, payload: RewriteBatchRequest)
                 detail="AI service is not available. Please check your AI Gateway configuration."
             )
         
+        if GEMINI_BATCH_ENABLED:
+            # Uploading the requests and creating the job are blocking calls
+            job_id = await asyncio.to_thread(
+                submit_rewrite_batch_job,
+                bullets=payload.bullets,
+                job_description=payload.job_description,
+                tone=payload.tone
+            )
+            return JSONResponse(status_code=202, content={
+                "job_id": job_id,
+                "status": "pending",
+                "status_url": f"/api/rewrite-batch/jobs/{job_id}"
+            })
+        
         # Rewrite bullets using AI Gateway
-        rewrite_results = rewrite_bullets_batch(
+        rewrite_results = await rewrite_bullets_batch(
             bullets=payload.bullets,
             job_description=payload.job_description,
             tone=payload.tone
@@ -105,31 +182,76 @@ async def rewrite_batch_endpoint(request: Request, payload: RewriteBatchRequest)
         raise HTTPException(status_code=500, detail=f"Batch rewriting failed: {str(e)}")
 
 
+@router.get("/rewrite-batch/jobs/{job_id:path}")
+async def rewrite_batch_job_endpoint(job_id: str):
+    """
+    Poll a batch rewriting job submitted through the Gemini Batch API
+    
+    Returns 202 while the job is running and the rewritten bullets once done
+    """
+    try:
+        rewrite_results = await asyncio.to_thread(collect_rewrite_batch_job, job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown rewrite job: {job_id}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch rewriting failed: {str(e)}")
+    
+    if rewrite_results is None:
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "pending"})
+    
+    rewritten = [
+        RewrittenBullet(
+            original=result.original,
+            improved=result.rewritten,
+            changes=result.changes
+        )
+        for result in rewrite_results
+    ]
+    
+    return RewriteBatchResponse(rewritten=rewritten)
+
+
 @router.post("/embeddings")
 @rate_limit(max_requests=20, window_seconds=60)
 async def generate_embeddings_endpoint(request: Request, payload: EmbedRequest):
     """
-    Generate embeddings for text using sentence-transformers
+    Generate embeddings for text using sentence-transformers (or Gemini
+    when EMBEDDINGS_PROVIDER is 'gemini')
     
-    Returns embeddings as arrays of floats
+    Returns embeddings as arrays of floats, or as base64-encoded float16
+    strings when encoding is "base64". Clients sending
+    "Accept: application/octet-stream" get the raw float16 matrix instead,
+    with its shape in the X-Embedding-Count and X-Embedding-Dimension headers.
     """
     try:
-        from sentence_transformers import SentenceTransformer
+        # Generate embeddings with the shared, already-loaded model
+        embeddings = await encode_texts_for_api(payload.texts)
         
-        # Load model (cached after first load)
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        
-        # Generate embeddings
-        embeddings = model.encode(payload.texts, convert_to_numpy=True)
+        if "application/octet-stream" in request.headers.get("accept", ""):
+            return Response(
+                content=encode_embeddings_binary(embeddings),
+                media_type="application/octet-stream",
+                headers={
+                    "X-Embedding-Count": str(len(embeddings)),
+                    "X-Embedding-Dimension": str(embeddings.shape[1] if len(embeddings) else 0),
+                    "X-Embedding-Dtype": "float16",
+                    "X-Embedding-Model": get_api_embedding_model_name()
+                }
+            )
         
-        # Convert to list of lists
-        embeddings_list = [emb.tolist() for emb in embeddings]
+        if payload.encoding == "base64":
+            embeddings_out = encode_embeddings_base64(embeddings)
+        else:
+            # orjson writes the array straight to JSON, without a Python
+            # float object per value
+            embeddings_out = embeddings
         
-        return {
-            "embeddings": embeddings_list,
-            "model": "all-MiniLM-L6-v2",
-            "dimension": len(embeddings_list[0]) if embeddings_list else 0
-        }
+        return NumpyJSONResponse({
+            "embeddings": embeddings_out,
+            "encoding": payload.encoding,
+            "model": get_api_embedding_model_name(),
+            "dimension": embeddings.shape[1] if len(embeddings) else 0
+        })
         
     except ImportError:
         raise HTTPException(
@@ -161,12 +283,21 @@ async def generate_insights_endpoint(request: Request, payload: dict):
         if not resume_text or not job_description:
             raise HTTPException(status_code=400, detail="resume_text and job_description are required")
         
-        insights = generate_ai_insights(
-            resume_text=resume_text,
-            job_description=job_description,
-            keyword_analysis=keyword_analysis,
-            scores=scores
-        )
+        key = insights_request_key(resume_text, job_description, keyword_analysis, scores)
+        task = _inflight_insights.get(key)
+        
+        if task is None:
+            task = asyncio.ensure_future(generate_ai_insights_cached(
+                resume_text=resume_text,
+                job_description=job_description,
+                keyword_analysis=keyword_analysis,
+                scores=scores
+            ))
+            _inflight_insights[key] = task
+            task.add_done_callback(lambda _: _inflight_insights.pop(key, None))
+        
+        # Shield so one client disconnecting doesn't cancel the shared work
+        insights = await asyncio.shield(task)
         
         return insights
         
@@ -185,7 +316,7 @@ async def analyze_ats_endpoint(request: Request, payload: ATSAnalysisRequest):
     Returns ATS score and list of issues with severity levels
     """
     try:
-        result = analyze_ats_compatibility(payload.resume_text)
+        result = await asyncio.to_thread(analyze_ats_compatibility, payload.resume_text)
         return ATSAnalysisResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -200,7 +331,7 @@ async def chat_endpoint(request: Request, payload: ChatRequest):
     Provides conversational guidance with context awareness
     """
     try:
-        response_text = generate_chat_response(
+        response_text = await generate_chat_response(
             message=payload.message,
             context=payload.context,
             conversation_history=payload.conversation_history
@@ -210,6 +341,34 @@ async def chat_endpoint(request: Request, payload: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/chat/stream")
+@rate_limit(max_requests=20, window_seconds=60)
+async def chat_stream_endpoint(request: Request, payload: ChatRequest):
+    """
+    Streaming AI chat assistant
+    
+    Sends the response as Server-Sent Events: one {"delta": text} event per
+    generated chunk, followed by a "done" event
+    """
+    async def event_stream():
+        async for chunk in stream_chat_response(
+            message=payload.message,
+            context=payload.context,
+            conversation_history=payload.conversation_history
+        ):
+            # Encoded straight to UTF-8 bytes so each chunk is written out
+            # without an extra str-to-bytes pass
+            yield b"data: " + orjson.dumps({'delta': chunk}) + b"\n\n"
+        
+        yield b"event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/auto-fix", response_model=AutoFixResponse)
 @rate_limit(max_requests=5, window_seconds=60)
 async def auto_fix_endpoint(request: Request, payload: AutoFixRequest):
@@ -230,6 +389,15 @@ async def auto_fix_endpoint(request: Request, payload: AutoFixRequest):
         print(f"  - recommendations count: {len(payload.recommendations)}")
         print(f"  - job_description length: {len(payload.job_description)}")
         
+        # Re-runs on an unchanged payload (e.g. after switching templates)
+        # reuse the previous result instead of three more Gemini calls
+        cache_key = auto_fix_request_key(payload)
+        cache = cache_manager.get_ai_response_cache()
+        cached_response = cache.get(cache_key)
+        if cached_response is not None:
+            print("[Auto-Fix] Returning cached result")
+            return AutoFixResponse(**{**cached_response, "processing_time": time.time() - start_time})
+        
         # Step 1: Content Optimization
         print("[Auto-Fix] Step 1: Optimizing content...")
         optimized_content = await optimize_resume_content(
@@ -240,19 +408,32 @@ async def auto_fix_endpoint(request: Request, payload: AutoFixRequest):
         )
         applied_fixes.append("Content optimization")
         
-        # Step 2: Grammar and ATS Phrasing
-        print("[Auto-Fix] Step 2: Fixing grammar and ATS phrasing...")
-        grammar_fixed = await fix_grammar_and_ats(optimized_content)
-        applied_fixes.append("Grammar and ATS phrasing")
-        
-        # Step 3: Keyword Injection
-        print("[Auto-Fix] Step 3: Injecting keywords...")
-        final_resume = await inject_keywords_intelligently(
-            resume=grammar_fixed,
-            recommendations=payload.recommendations,
-            job_description=payload.job_description
+        # When every keyword goes into the skills list, injection is just an
+        # append, so it is applied to the grammar-fixed list without an AI call
+        placements = plan_keyword_placements(
+            optimized_content, payload.recommendations, payload.job_description
         )
-        applied_fixes.append("Keyword injection")
+        
+        if set(placements) == {'skills'}:
+            # Step 2, then step 3 as a merge of the planned skills
+            print("[Auto-Fix] Steps 2-3: Fixing grammar and adding skills keywords...")
+            grammar_fixed = await fix_grammar_and_ats(optimized_content)
+            final_resume = merge_injected_skills(grammar_fixed, placements['skills'])
+            applied_fixes.extend(["Grammar and ATS phrasing", "Keyword injection"])
+        else:
+            # Step 2: Grammar and ATS Phrasing
+            print("[Auto-Fix] Step 2: Fixing grammar and ATS phrasing...")
+            grammar_fixed = await fix_grammar_and_ats(optimized_content)
+            applied_fixes.append("Grammar and ATS phrasing")
+            
+            # Step 3: Keyword Injection
+            print("[Auto-Fix] Step 3: Injecting keywords...")
+            final_resume = await inject_keywords_intelligently(
+                resume=grammar_fixed,
+                recommendations=payload.recommendations,
+                job_description=payload.job_description
+            )
+            applied_fixes.append("Keyword injection")
         
         # Calculate metrics
         processing_time = time.time() - start_time
@@ -265,12 +446,15 @@ async def auto_fix_endpoint(request: Request, payload: AutoFixRequest):
         
         print(f"[Auto-Fix] Completed in {processing_time:.2f}s")
         
-        return AutoFixResponse(
+        response = AutoFixResponse(
             optimized_resume=final_resume,
             applied_fixes=applied_fixes,
             improvement_metrics=metrics,
             processing_time=processing_time
         )
+        cache.set(cache_key, response.model_dump())
+        
+        return response
         
     except ValueError as e:
         # Validation or parsing errors
@@ -315,7 +499,8 @@ def calculate_improvement_metrics(
         "grammar_fixes_applied": 0
     }
     
-    # Count content enhancements (sections that changed)
+    # Count content enhancements (sections that changed). Plain equality is
+    # the cheapest check here: it runs in C and stops at the first difference
     for section in ['summary', 'experience', 'skills']:
         if section in original and section in optimized:
             if original[section] != optimized[section]:
@@ -323,8 +508,8 @@ def calculate_improvement_metrics(
     
     # Estimate keywords added by comparing skills sections
     if 'skills' in original and 'skills' in optimized:
-        original_skills = set(original.get('skills', []))
-        optimized_skills = set(optimized.get('skills', []))
+        original_skills = {skill_fingerprint(skill) for skill in original.get('skills', [])}
+        optimized_skills = {skill_fingerprint(skill) for skill in optimized.get('skills', [])}
         metrics["keywords_added"] = len(optimized_skills - original_skills)
     
     # Count keyword recommendations
@@ -338,6 +523,22 @@ def calculate_improvement_metrics(
     return metrics
 
 
+def skill_fingerprint(skill: Any) -> str:
+    """
+    Get a hashable form of a skills entry
+    
+    Entries are usually strings, but structured entries (e.g. a category
+    with a list of items) are compared by their canonical JSON.
+    
+    Returns:
+        The skill string, or canonical JSON for any other entry
+    """
+    if isinstance(skill, str):
+        return skill
+    
+    return json.dumps(skill, sort_keys=True, default=str)
+
+
 @router.post("/generate-pdf")
 @rate_limit(max_requests=10, window_seconds=60)
 async def generate_pdf_endpoint(request: Request, payload: PDFGenerationRequest):
@@ -360,7 +561,7 @@ async def generate_pdf_endpoint(request: Request, payload: PDFGenerationRequest)
         print(f"[PDF Generation] Using template: {payload.template_id}")
         print(f"[PDF Generation] Resume data keys: {list(payload.resume_json.keys())}")
         try:
-            pdf_bytes = template_engine.generate_pdf(
+            pdf_bytes = await generate_pdf_async(
                 template_id=payload.template_id,
                 resume_data=payload.resume_json,
                 options=payload.options
@@ -414,9 +615,10 @@ async def ai_status():
     Returns status of Gemini API and model information
     """
     try:
-        from .gemini_client import check_ai_available, GEMINI_MODEL
+        from .gemini_client import check_ai_available_async, GEMINI_MODEL
         
-        gemini_available = check_ai_available()
+        # Awaited so the round-trip to Gemini doesn't block other requests
+        gemini_available = await check_ai_available_async()
         
         # Log the status for debugging
         if gemini_available:
@@ -470,7 +672,7 @@ async def clear_cache(cache_type: str = None):
     Clear cache(s)
     
     Args:
-        cache_type: Optional specific cache to clear (template, prompt, ai_response, pdf, general)
+        cache_type: Optional specific cache to clear (template, prompt, ai_response, pdf, general, rewrite, insights)
                    If not provided, clears all caches
     """
     try:
@@ -487,6 +689,10 @@ async def clear_cache(cache_type: str = None):
                 cache_manager.get_pdf_cache().clear()
             elif cache_type == 'general':
                 cache_manager.get_general_cache().clear()
+            elif cache_type == 'rewrite':
+                cache_manager.get_rewrite_cache().clear()
+            elif cache_type == 'insights':
+                cache_manager.get_insights_cache().clear()
             else:
                 raise HTTPException(status_code=400, detail=f"Invalid cache type: {cache_type}")
             
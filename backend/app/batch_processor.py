@@ -4,29 +4,83 @@ Optimizes processing of multiple fixes by batching AI calls and parallel process
 """
 
 import asyncio
-from typing import List, Dict, Any, Callable, TypeVar, Optional
+import copy
+from typing import List, Dict, Any, Callable, TypeVar, Optional, AsyncIterator, Tuple, Awaitable
 from concurrent.futures import ThreadPoolExecutor
 import time
+import orjson
+from .cache_manager import LRUCache
+from .gemini_client import generate_text_async, GEMINI_MODEL
 
 T = TypeVar('T')
 
+# Resume section each independent fix type edits. Fixes of types not listed
+# here may touch the whole resume and are applied sequentially
+FIX_SCOPES = {
+    'grammar': 'experience',
+    'keyword': 'skills'
+}
+
+# Independent fixes at or above this count are sent to the AI as one
+# combined prompt instead of being applied one by one
+COMBINED_FIX_THRESHOLD = 3
+
+# Fixed parts of the combined fix prompt, around the resume and fix data
+COMBINED_FIX_PROMPT_HEADER = """You are a comprehensive resume optimization expert. Apply ALL of the following improvements in a single pass:
+
+RESUME (JSON):
+"""
+
+COMBINED_FIX_PROMPT_INSTRUCTIONS = """
+
+INSTRUCTIONS:
+1. Fix ALL grammar errors
+2. Inject ALL recommended keywords naturally
+3. Apply ALL formatting improvements
+4. Implement ALL recommendations
+5. Maintain factual accuracy and authentic voice
+
+Return the complete optimized resume as JSON with the same structure."""
+
+# Threads shared by every processor and, once the app has started, by
+# asyncio.to_thread, created on first use
+_shared_executor: Optional[ThreadPoolExecutor] = None
+
 
 class BatchProcessor:
     """
     Batch processor for optimizing multiple operations
     """
     
-    def __init__(self, max_workers: int = 5, batch_size: int = 10):
+    def __init__(
+        self,
+        max_workers: int = 5,
+        batch_size: int = 10,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
         """
         Initialize batch processor
         
         Args:
             max_workers: Maximum number of parallel workers
             batch_size: Maximum items per batch
+            executor: Executor to run items in (defaults to the shared executor)
         """
         self.max_workers = max_workers
         self.batch_size = batch_size
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._executor = executor
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Executor items are run in
+        
+        The work queue is left unbounded: a bounded queue would make submit()
+        block the event loop when full. Submissions are throttled by a
+        semaphore in _run_in_executor instead, so this processor never queues
+        more than max_workers * 2 items.
+        """
+        return self._executor or get_shared_executor()
     
     async def process_batch(
         self,
@@ -50,9 +104,9 @@ class BatchProcessor:
         
         if parallel and len(items) > 1:
             # Process in parallel
-            loop = asyncio.get_event_loop()
+            semaphore = asyncio.Semaphore(self.max_workers * 2)
             tasks = [
-                loop.run_in_executor(self.executor, processor, item)
+                self._run_in_executor(semaphore, processor, item)
                 for item in items
             ]
             results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -77,6 +131,60 @@ class BatchProcessor:
                     print(f"Error processing item: {e}")
             return results
     
+    async def iter_batch(
+        self,
+        items: List[T],
+        processor: Callable[[T], Any]
+    ) -> AsyncIterator[Any]:
+        """
+        Process items in parallel, yielding each result as soon as it is ready
+        
+        Unlike process_batch, results come in completion order and the caller
+        can start on the first one without waiting for the slowest item.
+        
+        Args:
+            items: List of items to process
+            processor: Function to process each item
+            
+        Yields:
+            Processed results, skipping items that failed
+        """
+        semaphore = asyncio.Semaphore(self.max_workers * 2)
+        tasks = [
+            self._run_in_executor(semaphore, processor, item)
+            for item in items
+        ]
+        
+        for next_result in asyncio.as_completed(tasks):
+            try:
+                yield await next_result
+            except Exception as e:
+                print(f"Error processing item: {e}")
+    
+    async def _run_in_executor(
+        self,
+        semaphore: asyncio.Semaphore,
+        processor: Callable[[T], Any],
+        item: T
+    ) -> Any:
+        """
+        Run processor on one item in the executor once a slot is free
+        
+        Holding submissions back keeps at most a couple of items per worker
+        queued inside the executor instead of the whole list.
+        
+        Args:
+            semaphore: Limits items submitted to the executor at once
+            processor: Function to process the item
+            item: Item to process
+            
+        Returns:
+            Processed result
+        """
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, processor, item)
+    
     async def process_in_batches(
         self,
         items: List[T],
@@ -103,36 +211,97 @@ class BatchProcessor:
             for i in range(0, len(items), actual_batch_size)
         ]
         
+        loop = asyncio.get_running_loop()
         results = []
         for batch in batches:
             try:
-                result = await asyncio.to_thread(processor, batch)
+                result = await loop.run_in_executor(self.executor, processor, batch)
                 results.append(result)
             except Exception as e:
                 print(f"Error processing batch: {e}")
         
         return results
+
+
+class AsyncBatchProcessor:
+    """
+    Batch processor for async operations such as AI API calls
+    
+    Network-bound processors wait on the event loop rather than holding a
+    thread each, so concurrency is limited only by max_concurrency.
+    Use BatchProcessor for blocking processors.
+    """
     
-    def shutdown(self):
-        """Shutdown the executor"""
-        self.executor.shutdown(wait=True)
+    def __init__(self, max_concurrency: int = 50):
+        """
+        Initialize async batch processor
+        
+        Args:
+            max_concurrency: Maximum number of items processed at once
+        """
+        self.max_concurrency = max_concurrency
+    
+    async def process_batch(
+        self,
+        items: List[T],
+        processor: Callable[[T], Awaitable[Any]]
+    ) -> List[Any]:
+        """
+        Process a batch of items concurrently
+        
+        Args:
+            items: List of items to process
+            processor: Async function to process each item
+            
+        Returns:
+            List of processed results, in input order, skipping items that failed
+        """
+        if not items:
+            return []
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def process_item(item: T) -> Any:
+            async with semaphore:
+                return await processor(item)
+        
+        results = await asyncio.gather(
+            *(process_item(item) for item in items),
+            return_exceptions=True
+        )
+        
+        # Filter out exceptions and log them
+        processed_results = []
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                print(f"Error processing item {i}: {result}")
+            else:
+                processed_results.append(result)
+        
+        return processed_results
 
 
 class DebouncedProcessor:
     """
     Debounced processor to prevent duplicate calls
+    
+    Concurrent calls for the same key share one execution, and expired
+    results are served stale while they are refreshed in the background.
     """
     
-    def __init__(self, delay: float = 0.5):
+    def __init__(self, ttl: float = 60.0, max_size: int = 1024):
         """
         Initialize debounced processor
         
         Args:
-            delay: Delay in seconds before processing
+            ttl: Seconds a result is served before it is refreshed
+            max_size: Maximum number of cached results (least recently used are evicted)
         """
-        self.delay = delay
+        self.ttl = ttl
         self.pending_tasks: Dict[str, asyncio.Task] = {}
-        self.results_cache: Dict[str, Any] = {}
+        # Expiry is tracked alongside each result rather than by the cache's
+        # own TTL, so expired results can still be served while refreshing
+        self.results_cache = LRUCache[Tuple[Any, float]](max_size=max_size)
     
     async def process(
         self,
@@ -151,32 +320,40 @@ class DebouncedProcessor:
         Returns:
             Result of processing
         """
-        # Check if result is already cached
-        if key in self.results_cache and not force:
-            return self.results_cache[key]
-        
-        # Cancel pending task if exists
-        if key in self.pending_tasks:
-            self.pending_tasks[key].cancel()
-        
-        if force:
-            # Execute immediately
-            result = await asyncio.to_thread(processor)
-            self.results_cache[key] = result
+        # Return cached result, refreshing it in the background once expired
+        cached = self.results_cache.get(key)
+        if cached is not None and not force:
+            result, expires_at = cached
+            if time.monotonic() >= expires_at and key not in self.pending_tasks:
+                self._start_task(key, processor)
             return result
         
-        # Create debounced task
-        async def debounced_task():
-            await asyncio.sleep(self.delay)
-            result = await asyncio.to_thread(processor)
-            self.results_cache[key] = result
-            del self.pending_tasks[key]
-            return result
+        # Join a pending execution for this key rather than starting another
+        task = self.pending_tasks.get(key)
+        if task is None or force:
+            task = self._start_task(key, processor)
         
-        task = asyncio.create_task(debounced_task())
+        # Shield so one caller giving up doesn't cancel it for the others
+        return await asyncio.shield(task)
+    
+    def _start_task(self, key: str, processor: Callable[[], Any]) -> asyncio.Task:
+        """Run processor in the background and cache its result under key"""
+        async def run_processor():
+            try:
+                result = await asyncio.to_thread(processor)
+                self.results_cache.set(key, (result, time.monotonic() + self.ttl))
+                return result
+            finally:
+                if self.pending_tasks.get(key) is task:
+                    del self.pending_tasks[key]
+        
+        task = asyncio.create_task(run_processor())
         self.pending_tasks[key] = task
         
-        return await task
+        # Background refreshes have no caller to receive their errors
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        
+        return task
     
     def clear_cache(self, key: Optional[str] = None):
         """
@@ -186,7 +363,7 @@ class DebouncedProcessor:
             key: Specific key to clear, or None to clear all
         """
         if key:
-            self.results_cache.pop(key, None)
+            self.results_cache.delete(key)
         else:
             self.results_cache.clear()
 
@@ -219,18 +396,19 @@ class ParallelFixProcessor:
         Returns:
             Resume with all fixes applied
         """
-        # Group fixes by dependency
-        independent_fixes = []
+        # Group independent fixes by the section they edit. Fixes on the same
+        # section are chained; different sections are processed in parallel
+        scoped_fixes: Dict[str, List[Dict[str, Any]]] = {}
         dependent_fixes = []
         
         for fix in fixes:
-            # Determine if fix is independent
-            # Independent fixes: grammar, keyword injection, formatting
-            # Dependent fixes: content optimization (needs to be done first)
-            fix_type = fix.get('type', 'unknown')
+            # Independent fixes: grammar, keyword injection
+            # Dependent fixes: formatting and content optimization, which
+            # may touch any section (done first)
+            scope = FIX_SCOPES.get(fix.get('type', 'unknown'))
             
-            if fix_type in ['grammar', 'keyword', 'format']:
-                independent_fixes.append(fix)
+            if scope is not None:
+                scoped_fixes.setdefault(scope, []).append(fix)
             else:
                 dependent_fixes.append(fix)
         
@@ -239,38 +417,108 @@ class ParallelFixProcessor:
         for fix in dependent_fixes:
             current_resume = await self._apply_fix(current_resume, fix)
         
-        # Process independent fixes in parallel
-        if independent_fixes:
-            # Create tasks for each independent fix
+        # Many independent fixes: one AI call that sees the whole resume beats
+        # a call per fix. Fall back to applying them separately if it fails
+        independent_fixes = [fix for section_fixes in scoped_fixes.values() for fix in section_fixes]
+        if len(independent_fixes) >= COMBINED_FIX_THRESHOLD:
+            try:
+                return await self._apply_fixes_combined(current_resume, independent_fixes)
+            except Exception as e:
+                print(f"Combined fix call failed, applying fixes separately: {e}")
+        
+        # Process independent fixes in parallel, each on a copy of its section only
+        if scoped_fixes:
             tasks = [
-                self._apply_fix(current_resume.copy(), fix)
-                for fix in independent_fixes
+                self._apply_scoped_fixes(scope, copy.deepcopy(current_resume.get(scope)), section_fixes)
+                for scope, section_fixes in scoped_fixes.items()
             ]
             
-            # Execute in parallel
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Merge results
-            for result in results:
-                if not isinstance(result, Exception):
-                    current_resume = self._merge_resume_changes(current_resume, result)
+            # Sections are disjoint, so each result replaces its section
+            # directly as soon as it completes
+            current_resume = dict(current_resume)
+            for next_result in asyncio.as_completed(tasks):
+                try:
+                    scope, section = await next_result
+                except Exception as e:
+                    print(f"Error applying fixes: {e}")
+                    continue
+                if section is not None:
+                    current_resume[scope] = section
         
         return current_resume
     
-    async def _apply_fix(
+    async def _apply_fixes_combined(
         self,
         resume: Dict[str, Any],
-        fix: Dict[str, Any]
+        fixes: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """
-        Apply a single fix to resume
+        Apply fixes with a single AI call using a combined prompt
         
         Args:
             resume: Resume data
+            fixes: Fixes to apply
+            
+        Returns:
+            Resume with all fixes applied
+            
+        Raises:
+            Exception: If AI generation fails or the response is not a JSON object
+        """
+        prompt = combine_fixes_for_single_ai_call(resume, fixes, [])
+        
+        response = await generate_text_async(
+            prompt=prompt,
+            model=GEMINI_MODEL,
+            max_tokens=2000,
+            temperature=0.3,
+            timeout=120,
+            response_mime_type='application/json'  # Force JSON output
+        )
+        
+        optimized = orjson.loads(response)
+        if not isinstance(optimized, dict):
+            raise ValueError("Combined fix response is not a JSON object")
+        
+        # Keep any fields the AI omitted
+        return {**resume, **optimized}
+    
+    async def _apply_scoped_fixes(
+        self,
+        scope: str,
+        section: Any,
+        fixes: List[Dict[str, Any]]
+    ) -> Tuple[str, Any]:
+        """
+        Apply fixes that all edit the same section, in order
+        
+        Args:
+            scope: Name of the resume section
+            section: Copy of the resume section
+            fixes: Fixes scoped to that section
+            
+        Returns:
+            Tuple of the section name and the section with all fixes applied
+        """
+        for fix in fixes:
+            section = await self._apply_fix(section, fix)
+        
+        return scope, section
+    
+    async def _apply_fix(
+        self,
+        target: Any,
+        fix: Dict[str, Any]
+    ) -> Any:
+        """
+        Apply a single fix to the resume or the section it is scoped to
+        
+        Args:
+            target: Resume data, or the section named in FIX_SCOPES for the fix type
             fix: Fix to apply
             
         Returns:
-            Resume with fix applied
+            Target with fix applied
         """
         # This is a placeholder - actual implementation would call
         # specific fix functions based on fix type
@@ -286,44 +534,26 @@ class ParallelFixProcessor:
             # Apply formatting fix
             pass
         
-        return resume
+        return target
+
+
+class _PendingRequest:
+    """A request waiting in BatchAIProcessor for its batch to be flushed"""
     
-    def _merge_resume_changes(
-        self,
-        base_resume: Dict[str, Any],
-        updated_resume: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """
-        Merge changes from updated resume into base resume
-        
-        Args:
-            base_resume: Base resume
-            updated_resume: Resume with updates
-            
-        Returns:
-            Merged resume
-        """
-        # Deep merge logic
-        merged = base_resume.copy()
-        
-        for key, value in updated_resume.items():
-            if key not in merged:
-                merged[key] = value
-            elif isinstance(value, dict) and isinstance(merged[key], dict):
-                merged[key] = self._merge_resume_changes(merged[key], value)
-            elif isinstance(value, list) and isinstance(merged[key], list):
-                # For lists, prefer the updated version if different
-                if value != merged[key]:
-                    merged[key] = value
-            else:
-                # Prefer updated value
-                merged[key] = value
-        
-        return merged
+    # Many requests can be pending under load, so skip the per-instance dict
+    __slots__ = ('type', 'data', 'processor', 'future')
     
-    def shutdown(self):
-        """Shutdown the processor"""
-        self.batch_processor.shutdown()
+    def __init__(
+        self,
+        request_type: str,
+        data: Dict[str, Any],
+        processor: Callable[[List[Dict[str, Any]]], Any],
+        future: asyncio.Future
+    ):
+        self.type = request_type
+        self.data = data
+        self.processor = processor
+        self.future = future
 
 
 class BatchAIProcessor:
@@ -332,11 +562,20 @@ class BatchAIProcessor:
     Combines multiple AI requests into single calls when possible
     """
     
-    def __init__(self):
-        """Initialize batch AI processor"""
-        self.pending_requests: List[Dict[str, Any]] = []
-        self.batch_delay = 0.1  # 100ms delay to collect requests
-        self.processing = False
+    def __init__(self, batch_size: int = 10, batch_delay: float = 0.1):
+        """
+        Initialize batch AI processor
+        
+        Args:
+            batch_size: Maximum requests per batch
+            batch_delay: Seconds to wait for more requests after the first
+        """
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.pending: List[_PendingRequest] = []
+        self.flush_event: Optional[asyncio.Event] = None
+        self.flush_timer: Optional[asyncio.TimerHandle] = None
+        self.worker: Optional[asyncio.Task] = None
     
     async def add_request(
         self,
@@ -347,6 +586,10 @@ class BatchAIProcessor:
         """
         Add a request to the batch
         
+        Requests arriving within batch_delay of the first pending one are
+        passed to processor in one call by a single worker task. A full
+        batch is flushed immediately.
+        
         Args:
             request_type: Type of request
             data: Request data
@@ -355,46 +598,72 @@ class BatchAIProcessor:
         Returns:
             Result for this specific request
         """
-        # Add to pending requests
-        request_id = f"{request_type}_{len(self.pending_requests)}"
-        request = {
-            'id': request_id,
-            'type': request_type,
-            'data': data,
-            'result': None
-        }
-        self.pending_requests.append(request)
-        
-        # Wait for batch delay
-        await asyncio.sleep(self.batch_delay)
-        
-        # Process batch if not already processing
-        if not self.processing and self.pending_requests:
-            self.processing = True
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        
+        future = loop.create_future()
+        self.pending.append(_PendingRequest(request_type, data, processor, future))
+        
+        if len(self.pending) >= self.batch_size:
+            self.flush_event.set()
+        elif self.flush_timer is None:
+            # One deadline per batch rather than a timer per request
+            self.flush_timer = loop.call_later(self.batch_delay, self.flush_event.set)
+        
+        return await future
+    
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start the batching worker on the running loop if it isn't running"""
+        if self.worker is None or self.worker.done() or self.worker.get_loop() is not loop:
+            self.pending = []
+            self.flush_event = asyncio.Event()
+            self.flush_timer = None
+            self.worker = loop.create_task(self._run())
+    
+    async def _run(self) -> None:
+        """Process pending requests in batches each time a flush is signalled"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            await self.flush_event.wait()
+            self.flush_event.clear()
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
             
-            # Get all pending requests
-            batch = self.pending_requests.copy()
-            self.pending_requests.clear()
+            batch = self.pending[:self.batch_size]
+            self.pending = self.pending[self.batch_size:]
             
-            # Process batch
-            try:
-                results = await asyncio.to_thread(processor, batch)
+            # Requests left over from a full batch start a new window
+            if len(self.pending) >= self.batch_size:
+                self.flush_event.set()
+            elif self.pending:
+                self.flush_timer = loop.call_later(self.batch_delay, self.flush_event.set)
+            
+            # Requests with different processors are batched separately
+            groups: Dict[Callable, List[_PendingRequest]] = {}
+            for entry in batch:
+                groups.setdefault(entry.processor, []).append(entry)
+            
+            for processor, entries in groups.items():
+                requests = [
+                    {'id': f"{entry.type}_{i}", 'type': entry.type, 'data': entry.data}
+                    for i, entry in enumerate(entries)
+                ]
+                
+                try:
+                    results = await asyncio.to_thread(processor, requests)
+                except Exception as e:
+                    print(f"Error processing batch: {e}")
+                    for entry in entries:
+                        if not entry.future.done():
+                            entry.future.set_exception(e)
+                    continue
                 
                 # Distribute results
-                for i, req in enumerate(batch):
-                    if i < len(results):
-                        req['result'] = results[i]
-            except Exception as e:
-                print(f"Error processing batch: {e}")
-            finally:
-                self.processing = False
-        
-        # Find and return result for this request
-        for req in self.pending_requests:
-            if req['id'] == request_id:
-                return req['result']
-        
-        return None
+                for i, entry in enumerate(entries):
+                    if not entry.future.done():
+                        entry.future.set_result(results[i] if i < len(results) else None)
     
     def can_batch(self, request_type: str) -> bool:
         """
@@ -417,11 +686,31 @@ class BatchAIProcessor:
 
 # Global instances
 batch_processor = BatchProcessor()
+async_batch_processor = AsyncBatchProcessor()
 debounced_processor = DebouncedProcessor()
 parallel_fix_processor = ParallelFixProcessor()
 batch_ai_processor = BatchAIProcessor()
 
 
+def get_shared_executor() -> ThreadPoolExecutor:
+    """Get the thread pool shared by all processors, creating it on first use"""
+    global _shared_executor
+    
+    if _shared_executor is None:
+        _shared_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='careerplus')
+    
+    return _shared_executor
+
+
+def shutdown_shared_executor() -> None:
+    """Stop the shared thread pool"""
+    global _shared_executor
+    
+    if _shared_executor is not None:
+        _shared_executor.shutdown(wait=False, cancel_futures=True)
+        _shared_executor = None
+
+
 def combine_fixes_for_single_ai_call(
     resume: Dict[str, Any],
     issues: List[Dict[str, Any]],
@@ -441,42 +730,48 @@ def combine_fixes_for_single_ai_call(
     Returns:
         Combined prompt for AI
     """
-    import json
-    
-    resume_json = json.dumps(resume, indent=2)
-    
     # Group fixes by type
-    grammar_issues = [i for i in issues if i.get('type') == 'grammar']
-    keyword_issues = [i for i in issues if i.get('type') == 'keyword']
-    format_issues = [i for i in issues if i.get('type') == 'format']
+    issues_by_type: Dict[str, List[Dict[str, Any]]] = {'grammar': [], 'keyword': [], 'format': []}
+    for issue in issues:
+        group = issues_by_type.get(issue.get('type'))
+        if group is not None:
+            group.append(issue)
     
-    prompt = f"""You are a comprehensive resume optimization expert. Apply ALL of the following improvements in a single pass:
-
-RESUME (JSON):
-{resume_json}
-
-GRAMMAR FIXES ({len(grammar_issues)} issues):
-{json.dumps(grammar_issues, indent=2)}
-
-KEYWORD OPTIMIZATIONS ({len(keyword_issues)} issues):
-{json.dumps(keyword_issues, indent=2)}
-
-FORMAT IMPROVEMENTS ({len(format_issues)} issues):
-{json.dumps(format_issues, indent=2)}
+    grammar_issues = issues_by_type['grammar']
+    keyword_issues = issues_by_type['keyword']
+    format_issues = issues_by_type['format']
+    
+    # Only the data sections vary between calls, so they are joined between
+    # the fixed header and instructions rather than rebuilding the whole text
+    return ''.join([
+        COMBINED_FIX_PROMPT_HEADER,
+        dumps_indented(resume),
+        f"\n\nGRAMMAR FIXES ({len(grammar_issues)} issues):\n",
+        dumps_indented(grammar_issues),
+        f"\n\nKEYWORD OPTIMIZATIONS ({len(keyword_issues)} issues):\n",
+        dumps_indented(keyword_issues),
+        f"\n\nFORMAT IMPROVEMENTS ({len(format_issues)} issues):\n",
+        dumps_indented(format_issues),
+        f"\n\nRECOMMENDATIONS ({len(recommendations)} items):\n",
+        dumps_indented(recommendations),
+        COMBINED_FIX_PROMPT_INSTRUCTIONS
+    ])
 
-RECOMMENDATIONS ({len(recommendations)} items):
-{json.dumps(recommendations, indent=2)}
 
-INSTRUCTIONS:
-1. Fix ALL grammar errors
-2. Inject ALL recommended keywords naturally
-3. Apply ALL formatting improvements
-4. Implement ALL recommendations
-5. Maintain factual accuracy and authentic voice
-
-Return the complete optimized resume as JSON with the same structure."""
+def dumps_indented(data: Any) -> str:
+    """
+    Serialize data as 2-space indented JSON for prompts
     
-    return prompt
+    Non-ASCII text is kept as-is rather than escaped, which also keeps
+    prompts shorter in tokens.
+    
+    Args:
+        data: JSON-serializable data
+        
+    Returns:
+        Indented JSON string
+    """
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
 
 
 async def process_fixes_in_parallel(
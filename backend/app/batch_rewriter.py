@@ -3,12 +3,46 @@ Batch Rewriter Service
 AI-powered batch rewriting of resume bullets using AI Gateway
 """
 
-import os
-from typing import List, Dict, Any
-from dotenv import load_dotenv
-from .gemini_client import generate_text, check_ai_available, GEMINI_MODEL
+import re
+import asyncio
+import hashlib
+from typing import List, Dict, Any, Optional
+from .gemini_client import (
+    generate_text_async, check_ai_available, GEMINI_MODEL,
+    submit_batch, get_batch_status, retrieve_batch_results
+)
+from .cache_manager import cache_manager
 
-load_dotenv()
+# Bullets sent to the model per prompt
+REWRITE_CHUNK_SIZE = 3
+
+# Bullet batches sent to the model concurrently per request
+REWRITE_CONCURRENCY = 4
+
+# Leading characters of the job description included in rewrite prompts
+REWRITE_JOB_CONTEXT_CHARS = 350
+
+# Strong action verbs a bullet should open with. Matched as a prefix in list
+# order, so one match call finds the same verb as checking each in turn
+ACTION_VERBS = ('led', 'managed', 'developed', 'created', 'implemented',
+                'designed', 'improved', 'increased', 'reduced', 'achieved',
+                'optimized', 'streamlined', 'spearheaded', 'orchestrated')
+ACTION_VERB_PATTERN = re.compile('|'.join(ACTION_VERBS))
+
+# Words that signal results and impact
+IMPACT_WORDS = ('increased', 'reduced', 'improved', 'enhanced', 'optimized',
+                'achieved', 'delivered', 'generated', 'saved')
+
+# Words that signal added specificity
+SPECIFIC_WORDS = ('specific', 'particular', 'detailed', 'comprehensive', 'extensive')
+
+# Numbered or bulleted line ("1. ", "- ", "• ") with more than 20 characters of
+# text in group 2. The lookahead and backreference take the whole marker run
+# without backtracking into it, like a possessive quantifier (Python 3.11+ only)
+BULLET_LINE_PATTERN = re.compile(r'^[^\S\n]*[0-9\-•](?=([0-9.\-•* ]*))\1[^\S\n]*(\S.{19,}\S)', re.M)
+
+# Runs of digits, counted as metrics
+NUMBER_PATTERN = re.compile(r'\d+')
 
 
 class BulletRewrite:
@@ -35,7 +69,7 @@ class BulletRewrite:
         }
 
 
-def rewrite_bullets_batch(
+async def rewrite_bullets_batch(
     bullets: List[str],
     job_description: str,
     tone: str = "professional"
@@ -51,44 +85,168 @@ def rewrite_bullets_batch(
     Returns:
         List of BulletRewrite objects
     """
-    results = []
+    # Reuse rewrites of bullets already seen for this job and tone
+    cache = cache_manager.get_rewrite_cache()
+    cache_keys = [rewrite_cache_key(bullet, job_description, tone) for bullet in bullets]
+    results: List[Optional[BulletRewrite]] = [cache.get(key) for key in cache_keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    
+    # Process remaining bullets in batches of 3 for better quality, with a
+    # few batches in flight at once
+    semaphore = asyncio.Semaphore(REWRITE_CONCURRENCY)
     
-    # Process bullets in batches of 3 for better quality
-    batch_size = 3
-    for i in range(0, len(bullets), batch_size):
-        batch = bullets[i:i + batch_size]
+    async def rewrite_chunk(chunk_number: int, indices: List[int]) -> None:
+        batch = [bullets[i] for i in indices]
         
         try:
-            rewritten_batch = rewrite_bullet_batch(batch, job_description, tone)
-            results.extend(rewritten_batch)
+            async with semaphore:
+                rewritten_batch = await rewrite_bullet_batch(batch, job_description, tone)
         except Exception as e:
-            print(f"Error rewriting batch {i//batch_size + 1}: {e}")
+            print(f"Error rewriting batch {chunk_number}: {e}")
             # Add original bullets as fallback
-            for bullet in batch:
-                results.append(BulletRewrite(
+            rewritten_batch = [
+                BulletRewrite(
                     original=bullet,
                     rewritten=bullet,
                     changes=["Error: Could not rewrite"],
                     confidence=0.0
-                ))
+                )
+                for bullet in batch
+            ]
+        else:
+            # Bullets the response didn't cover come back unchanged; retry those next time
+            for i, rewrite in zip(indices, rewritten_batch):
+                if rewrite.rewritten != rewrite.original:
+                    cache.set(cache_keys[i], rewrite)
+        
+        for i, rewrite in zip(indices, rewritten_batch):
+            results[i] = rewrite
+    
+    batch_size = REWRITE_CHUNK_SIZE
+    await asyncio.gather(*(
+        rewrite_chunk(start // batch_size + 1, missing[start:start + batch_size])
+        for start in range(0, len(missing), batch_size)
+    ))
     
     return results
 
 
-def rewrite_bullet_batch(
+def rewrite_cache_key(bullet: str, job_description: str, tone: str) -> str:
+    """
+    Build the rewrite cache key for one bullet
+    
+    Only the part of the job description that reaches the prompt is hashed,
+    so descriptions differing further down share cached rewrites.
+    
+    Args:
+        bullet: Original bullet point
+        job_description: Job description for context
+        tone: Desired tone
+    
+    Returns:
+        Cache key string
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (tone, job_description[:REWRITE_JOB_CONTEXT_CHARS], bullet):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    
+    return f"rewrite:{digest.hexdigest()}"
+
+
+def submit_rewrite_batch_job(
     bullets: List[str],
     job_description: str,
-    tone: str
-) -> List[BulletRewrite]:
-    """Rewrite a small batch of bullets"""
+    tone: str = "professional"
+) -> str:
+    """
+    Submit all bullets as a single Gemini Batch API job
+    
+    Each chunk of bullets becomes one request in the uploaded JSONL file.
+    
+    Args:
+        bullets: List of original bullet points
+        job_description: Job description for context
+        tone: Desired tone (professional, dynamic, technical)
+    
+    Returns:
+        Batch job name for polling with collect_rewrite_batch_job
+    """
+    prompts = [
+        build_rewrite_prompt(bullets[i:i + REWRITE_CHUNK_SIZE], job_description, tone)
+        for i in range(0, len(bullets), REWRITE_CHUNK_SIZE)
+    ]
+    
+    job_name = submit_batch(prompts, model=GEMINI_MODEL, max_tokens=300, temperature=0.7,
+                            display_name='rewrite-batch')
+    cache_manager.get_batch_job_cache().set(batch_job_cache_key(job_name), bullets)
+    
+    return job_name
+
+
+def collect_rewrite_batch_job(job_name: str) -> Optional[List[BulletRewrite]]:
+    """
+    Collect the results of a submitted rewrite batch job
     
-    # Create prompt
+    Args:
+        job_name: Batch job name returned by submit_rewrite_batch_job
+    
+    Returns:
+        List of BulletRewrite objects, or None if the job is still running
+    
+    Raises:
+        KeyError: If the job is unknown or has expired
+        Exception: If the batch job failed
+    """
+    jobs = cache_manager.get_batch_job_cache()
+    cache_key = batch_job_cache_key(job_name)
+    
+    bullets = jobs.get(cache_key)
+    if bullets is None:
+        raise KeyError(job_name)
+    
+    state = get_batch_status(job_name)
+    if state in ('JOB_STATE_PENDING', 'JOB_STATE_QUEUED', 'JOB_STATE_RUNNING'):
+        return None
+    
+    # Forget the job only once its results are in hand, so a failed download can be polled again
+    chunk_count = -(-len(bullets) // REWRITE_CHUNK_SIZE)
+    responses = retrieve_batch_results(job_name, chunk_count)
+    jobs.delete(cache_key)
+    
+    results = []
+    for index, i in enumerate(range(0, len(bullets), REWRITE_CHUNK_SIZE)):
+        batch = bullets[i:i + REWRITE_CHUNK_SIZE]
+        response = responses[index] if index < len(responses) else None
+        
+        if response:
+            results.extend(build_bullet_rewrites(batch, response))
+        else:
+            # Add original bullets as fallback
+            for bullet in batch:
+                results.append(BulletRewrite(
+                    original=bullet,
+                    rewritten=bullet,
+                    changes=["Error: Could not rewrite"],
+                    confidence=0.0
+                ))
+    
+    return results
+
+
+def batch_job_cache_key(job_name: str) -> str:
+    """Build the batch job cache key for a submitted rewrite job"""
+    return f"rewrite-job:{job_name}"
+
+
+def build_rewrite_prompt(bullets: List[str], job_description: str, tone: str) -> str:
+    """Build the rewrite prompt for a small batch of bullets"""
     bullets_text = "\n".join([f"{i+1}. {bullet}" for i, bullet in enumerate(bullets)])
     
-    prompt = f"""Rewrite these resume bullet points to be more impactful and {tone}.
+    return f"""Rewrite these resume bullet points to be more impactful and {tone}.
 
 Job Context:
-{job_description[:350]}
+{job_description[:REWRITE_JOB_CONTEXT_CHARS]}
 
 Original Bullets:
 {bullets_text}
@@ -102,33 +260,46 @@ Instructions:
 
 Rewrite each bullet on a new line, numbered 1., 2., 3., etc."""
 
+
+def build_bullet_rewrites(bullets: List[str], response: str) -> List[BulletRewrite]:
+    """Parse an AI response into BulletRewrite objects for the given bullets"""
+    rewritten_bullets = parse_rewritten_bullets(response, bullets)
+    
+    results = []
+    for original, rewritten in zip(bullets, rewritten_bullets):
+        changes = identify_changes(original, rewritten)
+        results.append(BulletRewrite(
+            original=original,
+            rewritten=rewritten,
+            changes=changes,
+            confidence=0.85
+        ))
+    
+    return results
+
+
+async def rewrite_bullet_batch(
+    bullets: List[str],
+    job_description: str,
+    tone: str
+) -> List[BulletRewrite]:
+    """Rewrite a small batch of bullets"""
+    
+    prompt = build_rewrite_prompt(bullets, job_description, tone)
+
     try:
-        response = call_ai_rewriter(prompt, max_tokens=300)
-        
-        # Parse response
-        rewritten_bullets = parse_rewritten_bullets(response, bullets)
-        
-        # Create BulletRewrite objects
-        results = []
-        for i, (original, rewritten) in enumerate(zip(bullets, rewritten_bullets)):
-            changes = identify_changes(original, rewritten)
-            results.append(BulletRewrite(
-                original=original,
-                rewritten=rewritten,
-                changes=changes,
-                confidence=0.85
-            ))
+        response = await call_ai_rewriter(prompt, max_tokens=300)
         
-        return results
+        return build_bullet_rewrites(bullets, response)
         
     except Exception as e:
         print(f"Error in rewrite_bullet_batch: {e}")
         raise
 
 
-def call_ai_rewriter(prompt: str, max_tokens: int = 300) -> str:
-    """Call AI service for bullet rewriting"""
-    return generate_text(
+async def call_ai_rewriter(prompt: str, max_tokens: int = 300) -> str:
+    """Call AI service for bullet rewriting without blocking the event loop"""
+    return await generate_text_async(
         prompt=prompt,
         model=GEMINI_MODEL,
         max_tokens=max_tokens,
@@ -139,17 +310,8 @@ def call_ai_rewriter(prompt: str, max_tokens: int = 300) -> str:
 
 def parse_rewritten_bullets(response: str, original_bullets: List[str]) -> List[str]:
     """Parse Ollama response into individual bullets"""
-    lines = response.split('\n')
-    rewritten = []
-    
-    for line in lines:
-        line = line.strip()
-        # Look for numbered bullets
-        if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
-            # Remove numbering and bullet markers
-            bullet = line.lstrip('0123456789.-•* ').strip()
-            if bullet and len(bullet) > 20:  # Minimum length check
-                rewritten.append(bullet)
+    # Numbered or bulleted lines, without their markers
+    rewritten = [match.group(2) for match in BULLET_LINE_PATTERN.finditer(response)]
     
     # If we didn't get enough bullets, pad with originals
     while len(rewritten) < len(original_bullets):
@@ -169,42 +331,28 @@ def identify_changes(original: str, rewritten: str) -> List[str]:
     rewritten_lower = rewritten.lower()
     
     # Check for action verb improvement
-    action_verbs = ['led', 'managed', 'developed', 'created', 'implemented', 
-                    'designed', 'improved', 'increased', 'reduced', 'achieved',
-                    'optimized', 'streamlined', 'spearheaded', 'orchestrated']
+    orig_verb_match = ACTION_VERB_PATTERN.match(original_lower)
+    new_verb_match = ACTION_VERB_PATTERN.match(rewritten_lower)
     
-    original_has_action = any(original_lower.startswith(verb) for verb in action_verbs)
-    rewritten_has_action = any(rewritten_lower.startswith(verb) for verb in action_verbs)
-    
-    if not original_has_action and rewritten_has_action:
+    if not orig_verb_match and new_verb_match:
         changes.append("Added strong action verb")
-    elif original_has_action and rewritten_has_action:
+    elif orig_verb_match and new_verb_match:
         # Check if verb changed
-        orig_verb = next((v for v in action_verbs if original_lower.startswith(v)), None)
-        new_verb = next((v for v in action_verbs if rewritten_lower.startswith(v)), None)
-        if orig_verb != new_verb:
+        if orig_verb_match.group() != new_verb_match.group():
             changes.append("Improved action verb")
     
     # Check for quantification
-    import re
-    original_has_numbers = bool(re.search(r'\d+', original))
-    rewritten_has_numbers = bool(re.search(r'\d+', rewritten))
+    orig_nums = len(NUMBER_PATTERN.findall(original))
+    new_nums = len(NUMBER_PATTERN.findall(rewritten))
     
-    if not original_has_numbers and rewritten_has_numbers:
+    if not orig_nums and new_nums:
         changes.append("Added quantifiable metrics")
-    elif rewritten_has_numbers and original_has_numbers:
-        # Count numbers
-        orig_nums = len(re.findall(r'\d+', original))
-        new_nums = len(re.findall(r'\d+', rewritten))
-        if new_nums > orig_nums:
-            changes.append("Added more metrics")
+    elif new_nums > orig_nums > 0:
+        changes.append("Added more metrics")
     
     # Check for impact words
-    impact_words = ['increased', 'reduced', 'improved', 'enhanced', 'optimized', 
-                    'achieved', 'delivered', 'generated', 'saved']
-    
-    original_has_impact = any(word in original_lower for word in impact_words)
-    rewritten_has_impact = any(word in rewritten_lower for word in impact_words)
+    original_has_impact = any(word in original_lower for word in IMPACT_WORDS)
+    rewritten_has_impact = any(word in rewritten_lower for word in IMPACT_WORDS)
     
     if not original_has_impact and rewritten_has_impact:
         changes.append("Emphasized results and impact")
@@ -216,8 +364,7 @@ def identify_changes(original: str, rewritten: str) -> List[str]:
         changes.append("Added more detail")
     
     # Check for specificity
-    specific_words = ['specific', 'particular', 'detailed', 'comprehensive', 'extensive']
-    if any(word in rewritten_lower for word in specific_words):
+    if any(word in rewritten_lower for word in SPECIFIC_WORDS):
         changes.append("Increased specificity")
     
     # Default if no specific changes detected
@@ -3,8 +3,10 @@ Bias detection module
 Identifies potentially biased language in resumes and suggests neutral alternatives
 """
 
-from typing import List, Dict
+from typing import Dict, Iterator, List, Tuple
+from functools import lru_cache
 import re
+from .cache_manager import cached
 
 # Enhanced bias dictionary with expanded categories
 BIAS_PATTERNS = {
@@ -98,8 +100,74 @@ BIAS_PATTERNS = {
     }
 }
 
+# Severity weight of each category in the bias score
+CATEGORY_WEIGHTS = {
+    "gender": 3.0,
+    "age": 2.5,
+    "race": 3.5,
+    "disability": 3.0,
+    "religion": 3.5,
+    "marital_status": 4.0,
+    "socioeconomic": 2.5,
+    "other": 2.0
+}
+
+# (category, suggestion, reason, confidence) for each phrase, keyed by the
+# lowercase phrase, flattened once so lookups need no nested dict access
+BIAS_PHRASE_INFO = {
+    phrase.lower(): (category, info["suggestion"], info["reason"], info.get("confidence", 0.8))
+    for category, patterns in BIAS_PATTERNS.items()
+    for phrase, info in patterns.items()
+}
+
+# All phrases as whole words in one pattern, so the text is scanned once
+# rather than once per phrase. Longer phrases come first so that the
+# longest phrase starting at a position wins
+BIAS_PHRASE_REGEX = r'\b(?:' + '|'.join(re.escape(phrase) for phrase in sorted(BIAS_PHRASE_INFO, key=len, reverse=True)) + r')\b'
+
+# For lowercased ASCII text, where case-sensitive matching is several
+# times faster than ignoring case
+BIAS_PHRASE_PATTERN = re.compile(BIAS_PHRASE_REGEX)
+
+# For other text, which can't be lowercased without shifting offsets
+BIAS_PHRASE_PATTERN_IGNORECASE = re.compile(BIAS_PHRASE_REGEX, re.IGNORECASE)
+
+# Texts shorter than this can't contain any phrase
+MIN_PHRASE_LENGTH = min(len(phrase) for phrase in BIAS_PHRASE_INFO)
+
+
+# Blank line(s) separating paragraphs
+PARAGRAPH_BREAK_PATTERN = re.compile(r'\n\s*\n')
+
 
-def detect_bias(text: str) -> List[Dict]:
+class BiasMatch:
+    """A biased phrase found in text, with its suggested replacement"""
+    
+    # Long resumes and batch analysis can produce many matches, so skip the
+    # per-instance dict until a match is returned from analyze_bias
+    __slots__ = ('original', 'suggestion', 'reason', 'category', 'confidence', 'context')
+    
+    def __init__(self, original: str, suggestion: str, reason: str, category: str, confidence: float, context: str):
+        self.original = original
+        self.suggestion = suggestion
+        self.reason = reason
+        self.category = category
+        self.confidence = confidence
+        self.context = context
+    
+    def to_dict(self) -> Dict:
+        """Convert to the dict returned by the API"""
+        return {
+            "original": self.original,
+            "suggestion": self.suggestion,
+            "reason": self.reason,
+            "category": self.category,
+            "confidence": self.confidence,
+            "context": self.context
+        }
+
+
+def detect_bias(text: str) -> List[BiasMatch]:
     """
     Detect biased language in text
     
@@ -109,53 +177,78 @@ def detect_bias(text: str) -> List[Dict]:
     Returns:
         List of detected biased phrases with suggestions
     """
-    text_lower = text.lower()
-    detected = []
-    
-    for category, patterns in BIAS_PATTERNS.items():
-        for phrase, info in patterns.items():
-            # Use word boundaries to avoid partial matches
-            pattern = r'\b' + re.escape(phrase) + r'\b'
-            matches = re.finditer(pattern, text_lower, re.IGNORECASE)
-            
-            for match in matches:
-                # Get the original case version
-                original_text = text[match.start():match.end()]
-                
-                # Get surrounding context for better detection
-                context_start = max(0, match.start() - 30)
-                context_end = min(len(text), match.end() + 30)
-                context = text[context_start:context_end]
-                
-                detected.append({
-                    "original": original_text,
-                    "suggestion": info["suggestion"],
-                    "reason": info["reason"],
-                    "category": category,
-                    "confidence": info.get("confidence", 0.8),
-                    "context": context.strip(),
-                    "position": match.start()
-                })
-    
-    # Remove duplicates and sort by position
-    seen = set()
-    unique_detected = []
-    for item in detected:
-        key = (item["original"].lower(), item["suggestion"])
-        if key not in seen:
-            seen.add(key)
-            unique_detected.append(item)
-    
-    unique_detected.sort(key=lambda x: x["position"])
-    
-    # Remove position from output, keep confidence and context
-    for item in unique_detected:
-        del item["position"]
-    
-    return unique_detected
-
-
-def calculate_bias_score(biased_phrases: List[Dict], text_length: int) -> float:
+    # First occurrence of each phrase. Matches arrive in text order, so
+    # insertion order keeps the results sorted by position. Each phrase has
+    # exactly one suggestion, so the lowercase phrase alone identifies a result
+    detected: Dict[str, BiasMatch] = {}
+    
+    for start, end, original_text in find_bias_phrases(text):
+        phrase = original_text.lower()
+        
+        # Case-insensitive matching also accepts a few Unicode look-alikes
+        # (e.g. dotless ı) that don't lowercase back to a known phrase
+        phrase_info = BIAS_PHRASE_INFO.get(phrase)
+        
+        # Skip duplicates before building their context
+        if phrase_info is None or phrase in detected:
+            continue
+        category, suggestion, reason, confidence = phrase_info
+        
+        # Get surrounding context for better detection
+        context_start = max(0, start - 30)
+        context_end = min(len(text), end + 30)
+        
+        detected[phrase] = BiasMatch(
+            original_text, suggestion, reason, category, confidence,
+            text[context_start:context_end].strip()
+        )
+    
+    return list(detected.values())
+
+
+def find_bias_phrases(text: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    Find bias phrase matches in text, one paragraph at a time
+    
+    Paragraph results are cached, so re-analyzing a lightly edited resume
+    only scans the paragraphs that changed.
+    
+    Args:
+        text: Text to search
+        
+    Yields:
+        (start, end, matched text) for each match, in text order
+    """
+    paragraph_start = 0
+    
+    for paragraph_break in PARAGRAPH_BREAK_PATTERN.finditer(text):
+        for start, end, matched in scan_paragraph(text[paragraph_start:paragraph_break.start()]):
+            yield paragraph_start + start, paragraph_start + end, matched
+        paragraph_start = paragraph_break.end()
+    
+    for start, end, matched in scan_paragraph(text[paragraph_start:]):
+        yield paragraph_start + start, paragraph_start + end, matched
+
+
+@lru_cache(maxsize=1024)
+def scan_paragraph(paragraph: str) -> Tuple[Tuple[int, int, str], ...]:
+    """Find bias phrase matches in one paragraph as (start, end, matched text)"""
+    # Match objects are reduced to plain tuples in one comprehension, so
+    # callers (and the cache) never touch them
+    if paragraph.isascii():
+        # ASCII lowercasing keeps every offset, so matches index the original
+        return tuple([
+            (match.start(), match.end(), paragraph[match.start():match.end()])
+            for match in BIAS_PHRASE_PATTERN.finditer(paragraph.lower())
+        ])
+    
+    return tuple([
+        (match.start(), match.end(), match.group())
+        for match in BIAS_PHRASE_PATTERN_IGNORECASE.finditer(paragraph)
+    ])
+
+
+def calculate_bias_score(biased_phrases: List[BiasMatch], text_length: int) -> float:
     """
     Calculate bias score based on number and severity of biased phrases
     
@@ -170,43 +263,43 @@ def calculate_bias_score(biased_phrases: List[Dict], text_length: int) -> float:
         return 0.0
     
     # Weight by category severity
-    category_weights = {
-        "gender": 3.0,
-        "age": 2.5,
-        "race": 3.5,
-        "disability": 3.0,
-        "religion": 3.5,
-        "marital_status": 4.0,
-        "socioeconomic": 2.5,
-        "other": 2.0
-    }
-    
     total_weight = sum(
-        category_weights.get(phrase["category"], 2.0)
+        CATEGORY_WEIGHTS.get(phrase.category, 2.0)
         for phrase in biased_phrases
     )
     
-    # Normalize by text length (per 1000 characters)
-    normalized_score = (total_weight / (text_length / 1000)) * 10
+    # Normalize by text length (per 1000 characters). Any match in a text
+    # under 100 characters already reaches the cap, so shorter lengths are
+    # treated as 100 rather than dividing by a tiny number
+    normalized_score = (total_weight / (max(text_length, 100) / 1000)) * 10
     
     # Cap at 100
     return min(100.0, normalized_score)
 
 
+@cached(cache_type='general', key_prefix='bias')
 def analyze_bias(text: str) -> Dict:
     """
     Analyze text for bias and return comprehensive results
     
+    Results are cached by text, since autosave and score refreshes send
+    the same resume text repeatedly. Callers must not modify the result.
+    
     Args:
         text: Text to analyze
         
     Returns:
         Dictionary with biased_phrases and bias_score
     """
+    # Empty input from an editor that was just opened, or a few typed
+    # characters, can't match anything
+    if len(text) < MIN_PHRASE_LENGTH or text.isspace():
+        return {"biased_phrases": [], "bias_score": 0.0}
+    
     biased_phrases = detect_bias(text)
     bias_score = calculate_bias_score(biased_phrases, len(text))
     
     return {
-        "biased_phrases": biased_phrases,
+        "biased_phrases": [phrase.to_dict() for phrase in biased_phrases],
         "bias_score": round(bias_score, 2)
     }
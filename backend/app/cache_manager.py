@@ -3,38 +3,137 @@ Cache Manager for Performance Optimization
 Provides in-memory caching for template rendering, AI prompts, and IndexedDB queries
 """
 
+import os
+import math
 import time
+import pickle
+import sqlite3
 import hashlib
-from typing import Any, Dict, Optional, Callable, TypeVar, Generic
+import heapq
+from typing import Any, Dict, Hashable, List, Optional, Callable, TypeVar, Generic, Union
 from functools import wraps
 from collections import OrderedDict
 import threading
+import numpy as np
+import orjson
+from .config import get_config
 
 
 T = TypeVar('T')
 
+# Directory for caches that persist across restarts (empty to keep all caches in memory)
+CACHE_DISK_DIR = get_config().cache_disk_dir
+
+
+class DiskStore:
+    """
+    SQLite-backed store that keeps cache entries across process restarts
+    
+    Values are pickled, so only point this at a directory the app owns.
+    The table is capped at max_size rows, dropping the least recently
+    written, and expired rows are pruned every PRUNE_INTERVAL writes.
+    """
+    
+    # Writes between deletions of expired rows
+    PRUNE_INTERVAL = 100
+    
+    def __init__(self, path: str, max_size: int):
+        """
+        Open (or create) the store
+        
+        Args:
+            path: SQLite database file
+            max_size: Maximum number of rows to keep
+        """
+        self.max_size = max_size
+        self.writes = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_expiry ON entries (expires_at)')
+        self.lock = threading.Lock()
+        self.prune()
+    
+    def get(self, key: str) -> Optional[tuple[Any, float]]:
+        """Get a (value, expires_at) pair, or None if the key is not stored"""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT value, expires_at FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        return pickle.loads(row[0]), row[1]
+    
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """Store a value until expires_at (Unix time)"""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            # REPLACE re-inserts the row, so rowid order is write order
+            self.connection.execute(
+                'INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, data, expires_at)
+            )
+            self.connection.execute(
+                'DELETE FROM entries WHERE rowid <= '
+                '(SELECT rowid FROM entries ORDER BY rowid DESC LIMIT 1 OFFSET ?)',
+                (self.max_size,)
+            )
+            self.writes += 1
+        
+        if self.writes % self.PRUNE_INTERVAL == 0:
+            self.prune()
+    
+    def delete(self, key: str) -> bool:
+        """Delete a key, returning True if it was stored"""
+        with self.lock:
+            return self.connection.execute('DELETE FROM entries WHERE key = ?', (key,)).rowcount > 0
+    
+    def prune(self) -> None:
+        """Delete expired entries"""
+        with self.lock:
+            self.connection.execute('DELETE FROM entries WHERE expires_at < ?', (time.time(),))
+    
+    def clear(self) -> None:
+        """Delete all entries"""
+        with self.lock:
+            self.connection.execute('DELETE FROM entries')
+
 
 class LRUCache(Generic[T]):
     """
     Thread-safe LRU (Least Recently Used) cache implementation
     """
     
-    def __init__(self, max_size: int = 100, ttl: Optional[int] = None):
+    def __init__(self, max_size: int = 100, ttl: Optional[int] = None, disk_path: Optional[str] = None):
         """
         Initialize LRU cache
         
         Args:
             max_size: Maximum number of items to store
             ttl: Time-to-live in seconds (None for no expiration)
+            disk_path: SQLite file to also write entries to, so they survive
+                restarts (None to keep entries in memory only)
         """
         self.max_size = max_size
         self.ttl = ttl
-        self.cache: OrderedDict[str, tuple[T, float]] = OrderedDict()
+        # Each value is stored with the time it expires, so a lookup is a
+        # single dict access and one comparison
+        self.cache: OrderedDict[Hashable, tuple[T, float]] = OrderedDict()
         self.lock = threading.Lock()
         self.hits = 0
         self.misses = 0
+        # Only string keys are written to disk; other keys are process-local
+        self.disk = DiskStore(disk_path, max_size) if disk_path else None
+        # Expiry times on disk must mean the same thing after a restart, so
+        # persistent caches use wall-clock time and the rest the faster
+        # monotonic clock
+        self.clock: Callable[[], float] = time.time if self.disk is not None else time.monotonic
     
-    def get(self, key: str) -> Optional[T]:
+    def get(self, key: Hashable) -> Optional[T]:
         """
         Get value from cache
         
@@ -45,24 +144,37 @@ class LRUCache(Generic[T]):
             Cached value or None if not found/expired
         """
         with self.lock:
-            if key not in self.cache:
+            entry = self.cache.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                
+                # Check if expired
+                if self.clock() <= expires_at:
+                    # Move to end (most recently used)
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+                    return value
+                
+                del self.cache[key]
+            
+            if self.disk is None or not isinstance(key, str):
                 self.misses += 1
                 return None
-            
-            value, timestamp = self.cache[key]
-            
-            # Check if expired
-            if self.ttl and (time.time() - timestamp) > self.ttl:
-                del self.cache[key]
+        
+        # Fall back to entries written by this or an earlier process,
+        # reading the disk without holding the lock
+        entry = self.disk.get(key)
+        
+        with self.lock:
+            if entry is None or self.clock() > entry[1]:
                 self.misses += 1
                 return None
             
-            # Move to end (most recently used)
-            self.cache.move_to_end(key)
+            self._store(key, *entry)
             self.hits += 1
-            return value
+            return entry[0]
     
-    def set(self, key: str, value: T) -> None:
+    def set(self, key: Hashable, value: T) -> None:
         """
         Set value in cache
         
@@ -70,16 +182,25 @@ class LRUCache(Generic[T]):
             key: Cache key
             value: Value to cache
         """
+        expires_at = self.clock() + self.ttl if self.ttl else math.inf
+        
         with self.lock:
-            # Remove oldest item if at capacity
-            if key not in self.cache and len(self.cache) >= self.max_size:
-                self.cache.popitem(last=False)
-            
-            # Add/update value with current timestamp
-            self.cache[key] = (value, time.time())
+            self._store(key, value, expires_at)
+        
+        if self.disk is not None and isinstance(key, str):
+            self.disk.set(key, value, expires_at)
+    
+    def _store(self, key: Hashable, value: T, expires_at: float) -> None:
+        """Add or update an entry in memory (caller must hold the lock)"""
+        if key in self.cache:
             self.cache.move_to_end(key)
+        elif len(self.cache) >= self.max_size:
+            # Remove oldest item if at capacity
+            self.cache.popitem(last=False)
+        
+        self.cache[key] = (value, expires_at)
     
-    def delete(self, key: str) -> bool:
+    def delete(self, key: Hashable) -> bool:
         """
         Delete value from cache
         
@@ -90,10 +211,12 @@ class LRUCache(Generic[T]):
             True if key was found and deleted
         """
         with self.lock:
-            if key in self.cache:
-                del self.cache[key]
-                return True
-            return False
+            deleted = self.cache.pop(key, None) is not None
+        
+        if self.disk is not None and isinstance(key, str):
+            deleted = self.disk.delete(key) or deleted
+        
+        return deleted
     
     def clear(self) -> None:
         """Clear all cached values"""
@@ -101,6 +224,9 @@ class LRUCache(Generic[T]):
             self.cache.clear()
             self.hits = 0
             self.misses = 0
+        
+        if self.disk is not None:
+            self.disk.clear()
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -109,18 +235,333 @@ class LRUCache(Generic[T]):
         Returns:
             Dictionary with cache stats
         """
+        # Read without the lock so polling stats never stalls lookups; the
+        # counters may be one request apart, which is fine for reporting
+        hits = self.hits
+        misses = self.misses
+        size = len(self.cache)
+        
+        total_requests = hits + misses
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            'size': size,
+            'max_size': self.max_size,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': f"{hit_rate:.2f}%",
+            'ttl': self.ttl
+        }
+
+
+class ShardedLRUCache(Generic[T]):
+    """
+    Thread-safe LRU cache split into independently locked shards
+    
+    Each key belongs to one shard by hash, so concurrent requests only
+    contend when their keys land in the same shard. Eviction is LRU within
+    a shard, so the least recently used entry overall may outlive a newer
+    one in a fuller shard.
+    """
+    
+    def __init__(self, max_size: int = 100, ttl: Optional[int] = None, shards: int = 8):
+        """
+        Initialize sharded LRU cache
+        
+        Args:
+            max_size: Maximum number of items to store across all shards
+            ttl: Time-to-live in seconds (None for no expiration)
+            shards: Number of shards (must be a power of two)
+        """
+        if shards < 1 or shards & (shards - 1):
+            raise ValueError("shards must be a power of two")
+        
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shards: List[LRUCache[T]] = [
+            LRUCache[T](max_size=max(1, max_size // shards), ttl=ttl) for _ in range(shards)
+        ]
+        self._mask = shards - 1
+    
+    def _shard(self, key: Hashable) -> LRUCache[T]:
+        """Get the shard that holds a key"""
+        return self.shards[hash(key) & self._mask]
+    
+    def get(self, key: Hashable) -> Optional[T]:
+        """
+        Get value from cache
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            Cached value or None if not found/expired
+        """
+        return self._shard(key).get(key)
+    
+    def set(self, key: Hashable, value: T) -> None:
+        """
+        Set value in cache
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        self._shard(key).set(key, value)
+    
+    def delete(self, key: Hashable) -> bool:
+        """
+        Delete value from cache
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            True if key was found and deleted
+        """
+        return self._shard(key).delete(key)
+    
+    def clear(self) -> None:
+        """Clear all cached values"""
+        for shard in self.shards:
+            shard.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with cache stats, summed over shards
+        """
+        hits = sum(shard.hits for shard in self.shards)
+        misses = sum(shard.misses for shard in self.shards)
+        size = sum(len(shard.cache) for shard in self.shards)
+        
+        total_requests = hits + misses
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            'size': size,
+            'max_size': self.max_size,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': f"{hit_rate:.2f}%",
+            'ttl': self.ttl,
+            'shards': len(self.shards)
+        }
+
+
+class SemanticCache(Generic[T]):
+    """
+    Thread-safe cache that matches entries by embedding similarity
+    
+    Lookups first try the exact key, then return the value of the most
+    similar stored embedding if its cosine similarity reaches the threshold.
+    Entries hit at least `promote_after` times are promoted to long-term
+    and are only evicted once no short-term entries remain.
+    
+    Embeddings live in one preallocated float32 matrix (one row per slot),
+    so a lookup is a single matrix-vector product instead of a Python loop.
+    """
+    
+    def __init__(
+        self,
+        max_size: int = 512,
+        threshold: float = 0.87,
+        ttl: Optional[int] = None,
+        promote_after: int = 3
+    ):
+        """
+        Initialize semantic cache
+        
+        Args:
+            max_size: Maximum number of items to store
+            threshold: Minimum cosine similarity for a semantic hit
+            ttl: Time-to-live in seconds (None for no expiration)
+            promote_after: Hits needed to promote an entry to long-term
+        """
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.promote_after = promote_after
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._reset()
+    
+    def _reset(self) -> None:
+        """Drop all entries and release slot storage"""
+        # Embedding rows, allocated on the first insert once the dimension is known
+        self._mat: Optional[np.ndarray] = None
+        # Per-slot records, parallel to the matrix rows
+        self._keys: List[Optional[str]] = [None] * self.max_size
+        self._values: List[Optional[T]] = [None] * self.max_size
+        self._hit_counts: List[int] = [0] * self.max_size
+        self._versions: List[int] = [0] * self.max_size
+        self._created = np.zeros(self.max_size, dtype=np.float64)
+        self._slots: Dict[str, int] = {}
+        # Slots below the write cursor that were freed by eviction or expiry
+        self._free: List[int] = []
+        self._n = 0
+        # Min-heap of (tier, rank, version, slot); stale entries are skipped lazily
+        self._heap: List[tuple] = []
+        self._tick = 0
+    
+    def get(self, key: str, vector: Optional[np.ndarray] = None) -> Optional[T]:
+        """
+        Get value by exact key or by nearest embedding
+        
+        Args:
+            key: Exact cache key
+            vector: Unit-length query embedding (None to match by key only)
+            
+        Returns:
+            Cached value or None if no entry is close enough
+        """
+        with self.lock:
+            self._expire()
+            
+            slot = self._slots.get(key)
+            
+            if slot is None and vector is not None and self._usable(vector) and self._slots:
+                scores = self._mat[:self._n] @ vector
+                best = int(scores.argmax())
+                if scores[best] >= self.threshold and self._keys[best] is not None:
+                    slot = best
+                    self.semantic_hits += 1
+            
+            if slot is None:
+                self.misses += 1
+                return None
+            
+            self._hit_counts[slot] += 1
+            self._touch(slot)
+            self.hits += 1
+            return self._values[slot]
+    
+    def set(self, key: str, vector: Optional[np.ndarray], value: T) -> None:
+        """
+        Set value in cache
+        
+        Args:
+            key: Exact cache key
+            vector: Unit-length embedding for the value (None to store by key only)
+            value: Value to cache
+        """
         with self.lock:
-            total_requests = self.hits + self.misses
-            hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+            if self._mat is None and vector is not None:
+                self._mat = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
             
-            return {
-                'size': len(self.cache),
-                'max_size': self.max_size,
-                'hits': self.hits,
-                'misses': self.misses,
-                'hit_rate': f"{hit_rate:.2f}%",
-                'ttl': self.ttl
-            }
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._allocate()
+                self._keys[slot] = key
+                self._hit_counts[slot] = 0
+                self._slots[key] = slot
+            
+            if self._mat is not None:
+                # Rows without an embedding stay zero and can never reach the threshold
+                self._mat[slot] = vector if self._usable(vector) else 0.0
+            
+            self._values[slot] = value
+            self._created[slot] = time.monotonic()
+            self._touch(slot)
+    
+    def _usable(self, vector: Optional[np.ndarray]) -> bool:
+        """Check that a vector matches the matrix dimension"""
+        return vector is not None and self._mat is not None and vector.shape == self._mat.shape[1:]
+    
+    def _allocate(self) -> int:
+        """Get a free slot, evicting if full (caller must hold the lock)"""
+        if self._free:
+            return self._free.pop()
+        if self._n < self.max_size:
+            self._n += 1
+            return self._n - 1
+        self._evict()
+        return self._free.pop()
+    
+    def _touch(self, slot: int) -> None:
+        """Record an access in the eviction heap (caller must hold the lock)"""
+        self._tick += 1
+        self._versions[slot] += 1
+        
+        if self._hit_counts[slot] >= self.promote_after:
+            # Long-term entries are ranked by hit count (least frequently used first)
+            entry = (1, self._hit_counts[slot], self._versions[slot], slot)
+        else:
+            # Short-term entries are ranked by recency (least recently used first)
+            entry = (0, self._tick, self._versions[slot], slot)
+        heapq.heappush(self._heap, entry)
+        
+        # Compact once stale entries dominate the heap
+        if len(self._heap) > 4 * self.max_size:
+            self._heap = [e for e in self._heap if self._versions[e[3]] == e[2] and self._keys[e[3]] is not None]
+            heapq.heapify(self._heap)
+    
+    def _release(self, slot: int) -> None:
+        """Free a slot (caller must hold the lock)"""
+        del self._slots[self._keys[slot]]
+        self._keys[slot] = None
+        self._values[slot] = None
+        self._versions[slot] += 1
+        if self._mat is not None:
+            self._mat[slot] = 0.0
+        self._free.append(slot)
+    
+    def _expire(self) -> None:
+        """Drop expired entries (caller must hold the lock)"""
+        if not self.ttl or not self._slots:
+            return
+        
+        expired = np.nonzero(self._created[:self._n] < time.monotonic() - self.ttl)[0]
+        for slot in expired:
+            if self._keys[slot] is not None:
+                self._release(int(slot))
+    
+    def _evict(self) -> None:
+        """Evict the lowest-ranked live entry (caller must hold the lock)"""
+        while self._heap:
+            _, _, version, slot = heapq.heappop(self._heap)
+            if self._versions[slot] == version and self._keys[slot] is not None:
+                self._release(slot)
+                return
+    
+    def clear(self) -> None:
+        """Clear all cached values"""
+        with self.lock:
+            self._reset()
+            self.hits = 0
+            self.semantic_hits = 0
+            self.misses = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with cache stats
+        """
+        # Read without the lock, as in LRUCache.get_stats
+        hits = self.hits
+        semantic_hits = self.semantic_hits
+        misses = self.misses
+        size = len(self._slots)
+        
+        total_requests = hits + misses
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            'size': size,
+            'max_size': self.max_size,
+            'hits': hits,
+            'semantic_hits': semantic_hits,
+            'misses': misses,
+            'hit_rate': f"{hit_rate:.2f}%",
+            'threshold': self.threshold,
+            'ttl': self.ttl
+        }
 
 
 class CacheManager:
@@ -134,23 +575,43 @@ class CacheManager:
         # Template rendering cache (larger, longer TTL)
         self.template_cache = LRUCache[str](max_size=50, ttl=3600)  # 1 hour
         
-        # AI prompt cache (medium size, medium TTL)
-        self.prompt_cache = LRUCache[str](max_size=100, ttl=1800)  # 30 minutes
+        # AI prompt cache (medium size, medium TTL), sharded as it is hit on
+        # every optimization and grammar request
+        self.prompt_cache = ShardedLRUCache[str](max_size=128, ttl=1800)  # 30 minutes
         
-        # AI response cache (smaller, shorter TTL)
-        self.ai_response_cache = LRUCache[Dict[str, Any]](max_size=50, ttl=900)  # 15 minutes
+        # AI response cache (smaller, shorter TTL), kept on disk when configured
+        self.ai_response_cache = LRUCache[Dict[str, Any]](
+            max_size=50, ttl=900, disk_path=self._disk_path('ai_response')
+        )  # 15 minutes
         
-        # PDF generation cache (smaller, longer TTL)
-        self.pdf_cache = LRUCache[bytes](max_size=20, ttl=3600)  # 1 hour
+        # PDF generation cache (smaller, longer TTL), kept on disk when configured
+        self.pdf_cache = LRUCache[bytes](max_size=20, ttl=3600, disk_path=self._disk_path('pdf'))  # 1 hour
         
-        # General purpose cache
-        self.general_cache = LRUCache[Any](max_size=100, ttl=600)  # 10 minutes
+        # General purpose cache, sharded as most cached functions share it
+        self.general_cache = ShardedLRUCache[Any](max_size=128, ttl=600)  # 10 minutes
+        
+        # Rewritten bullets, one entry per bullet/job/tone
+        self.rewrite_cache = ShardedLRUCache[Any](max_size=4096, ttl=3600)  # 1 hour
+        
+        # Bullets of submitted Gemini batch rewrite jobs, by job name. Kept on
+        # disk when configured so any worker can collect a job; batch jobs
+        # take up to a day, and expire after two
+        self.batch_job_cache = LRUCache[List[str]](
+            max_size=1024, ttl=172800, disk_path=self._disk_path('batch_jobs')
+        )  # 48 hours
+        
+        # AI insights cache matched by resume/job embedding similarity
+        self.insights_cache = SemanticCache[Dict[str, Any]](max_size=512, threshold=0.87, ttl=3600)  # 1 hour
+    
+    def _disk_path(self, name: str) -> Optional[str]:
+        """Get the file a persistent cache is stored in, or None if CACHE_DISK_DIR is unset"""
+        return os.path.join(CACHE_DISK_DIR, f'{name}.sqlite3') if CACHE_DISK_DIR else None
     
     def get_template_cache(self) -> LRUCache[str]:
         """Get template rendering cache"""
         return self.template_cache
     
-    def get_prompt_cache(self) -> LRUCache[str]:
+    def get_prompt_cache(self) -> ShardedLRUCache[str]:
         """Get AI prompt cache"""
         return self.prompt_cache
     
@@ -162,17 +623,31 @@ class CacheManager:
         """Get PDF generation cache"""
         return self.pdf_cache
     
-    def get_general_cache(self) -> LRUCache[Any]:
+    def get_general_cache(self) -> ShardedLRUCache[Any]:
         """Get general purpose cache"""
         return self.general_cache
     
+    def get_rewrite_cache(self) -> ShardedLRUCache[Any]:
+        """Get rewritten bullet cache"""
+        return self.rewrite_cache
+    
+    def get_batch_job_cache(self) -> LRUCache[List[str]]:
+        """Get submitted batch rewrite job cache"""
+        return self.batch_job_cache
+    
+    def get_insights_cache(self) -> SemanticCache[Dict[str, Any]]:
+        """Get semantic AI insights cache"""
+        return self.insights_cache
+    
     def clear_all(self) -> None:
-        """Clear all caches"""
+        """Clear all caches, keeping submitted batch jobs so they can still be collected"""
         self.template_cache.clear()
         self.prompt_cache.clear()
         self.ai_response_cache.clear()
         self.pdf_cache.clear()
         self.general_cache.clear()
+        self.rewrite_cache.clear()
+        self.insights_cache.clear()
     
     def get_all_stats(self) -> Dict[str, Dict[str, Any]]:
         """
@@ -186,18 +661,33 @@ class CacheManager:
             'prompt_cache': self.prompt_cache.get_stats(),
             'ai_response_cache': self.ai_response_cache.get_stats(),
             'pdf_cache': self.pdf_cache.get_stats(),
-            'general_cache': self.general_cache.get_stats()
+            'general_cache': self.general_cache.get_stats(),
+            'rewrite_cache': self.rewrite_cache.get_stats(),
+            'batch_job_cache': self.batch_job_cache.get_stats(),
+            'insights_cache': self.insights_cache.get_stats()
         }
 
 
 # Global cache manager instance
 cache_manager = CacheManager()
 
+# Caches used by the cached decorator, by cache_type. Other types use the general cache
+CACHES_BY_TYPE: Dict[str, Union[LRUCache, ShardedLRUCache]] = {
+    'template': cache_manager.template_cache,
+    'prompt': cache_manager.prompt_cache,
+    'ai_response': cache_manager.ai_response_cache,
+    'pdf': cache_manager.pdf_cache,
+    'general': cache_manager.general_cache
+}
+
 
 def generate_cache_key(*args, **kwargs) -> str:
     """
     Generate a cache key from arguments
     
+    Keys only need to be stable, not secure, so they use BLAKE2b rather
+    than MD5, which is slower on 64-bit hosts.
+    
     Args:
         *args: Positional arguments
         **kwargs: Keyword arguments
@@ -205,26 +695,74 @@ def generate_cache_key(*args, **kwargs) -> str:
     Returns:
         Hash string to use as cache key
     """
-    # Convert args and kwargs to a stable string representation
+    # Convert args and kwargs to a stable byte representation
     key_parts = []
     
     for arg in args:
-        if isinstance(arg, (dict, list)):
-            import json
-            key_parts.append(json.dumps(arg, sort_keys=True))
-        else:
-            key_parts.append(str(arg))
+        key_parts.append(_key_part(arg))
     
     for k, v in sorted(kwargs.items()):
-        if isinstance(v, (dict, list)):
-            import json
-            key_parts.append(f"{k}={json.dumps(v, sort_keys=True)}")
-        else:
-            key_parts.append(f"{k}={v}")
+        key_parts.append(k.encode() + b"=" + _key_part(v))
     
     # Generate hash
-    key_string = "|".join(key_parts)
-    return hashlib.md5(key_string.encode()).hexdigest()
+    return hashlib.blake2b(b"|".join(key_parts), digest_size=16).hexdigest()
+
+
+def _key_part(value: Any) -> bytes:
+    """Serialize one cache key argument, with dict keys in sorted order"""
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return str(value).encode()
+
+
+def make_cache_key(*args, **kwargs) -> tuple:
+    """
+    Build an in-process cache key from arguments without hashing them
+    
+    Like functools.lru_cache, the arguments themselves form the key, so
+    distinct arguments never collide. Dicts, lists and sets are converted
+    to hashable equivalents, with dicts compared regardless of key order.
+    Keys depend on Python's per-process hashing, so use generate_cache_key
+    for keys that must stay stable across processes.
+    
+    Args:
+        *args: Positional arguments
+        **kwargs: Keyword arguments
+        
+    Returns:
+        Hashable tuple to use as cache key
+    """
+    frozen_args = tuple(_freeze(arg) for arg in args)
+    if not kwargs:
+        return frozen_args
+    return frozen_args + (_KWARGS_MARK,) + tuple((k, _freeze(v)) for k, v in sorted(kwargs.items()))
+
+
+# Separates positional from keyword arguments in make_cache_key keys
+_KWARGS_MARK = object()
+
+
+def _freeze(value: Any) -> Hashable:
+    """Convert dicts, lists and sets, including nested ones, into hashable values"""
+    # Containers are tagged with their type so e.g. a list never matches a tuple
+    if isinstance(value, dict):
+        return (dict, frozenset((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (type(value),) + tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return (set, frozenset(value))
+    return value
+
+
+def _decorated_cache_key(cache_type: str, key_prefix: str, args: tuple, kwargs: Dict[str, Any]) -> Hashable:
+    """Get the key a cached function call is stored under"""
+    # Caches that can persist keep a digest key so they can be looked up
+    # from other processes
+    if cache_type in ('pdf', 'ai_response'):
+        return f"{key_prefix}:{generate_cache_key(*args, **kwargs)}"
+    return (key_prefix, make_cache_key(*args, **kwargs))
 
 
 def cached(cache_type: str = 'general', key_prefix: str = ''):
@@ -238,23 +776,14 @@ def cached(cache_type: str = 'general', key_prefix: str = ''):
     Returns:
         Decorated function
     """
+    # Resolved once here rather than on every call
+    cache = CACHES_BY_TYPE.get(cache_type, cache_manager.general_cache)
+    
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Get appropriate cache
-            if cache_type == 'template':
-                cache = cache_manager.get_template_cache()
-            elif cache_type == 'prompt':
-                cache = cache_manager.get_prompt_cache()
-            elif cache_type == 'ai_response':
-                cache = cache_manager.get_ai_response_cache()
-            elif cache_type == 'pdf':
-                cache = cache_manager.get_pdf_cache()
-            else:
-                cache = cache_manager.get_general_cache()
-            
             # Generate cache key
-            cache_key = f"{key_prefix}:{generate_cache_key(*args, **kwargs)}"
+            cache_key = _decorated_cache_key(cache_type, key_prefix, args, kwargs)
             
             # Try to get from cache
             cached_value = cache.get(cache_key)
@@ -285,19 +814,10 @@ def invalidate_cache(cache_type: str = 'general', key_prefix: str = '', *args, *
         True if cache entry was found and deleted
     """
     # Get appropriate cache
-    if cache_type == 'template':
-        cache = cache_manager.get_template_cache()
-    elif cache_type == 'prompt':
-        cache = cache_manager.get_prompt_cache()
-    elif cache_type == 'ai_response':
-        cache = cache_manager.get_ai_response_cache()
-    elif cache_type == 'pdf':
-        cache = cache_manager.get_pdf_cache()
-    else:
-        cache = cache_manager.get_general_cache()
+    cache = CACHES_BY_TYPE.get(cache_type, cache_manager.general_cache)
     
     # Generate cache key
-    cache_key = f"{key_prefix}:{generate_cache_key(*args, **kwargs)}"
+    cache_key = _decorated_cache_key(cache_type, key_prefix, args, kwargs)
     
     # Delete from cache
     return cache.delete(cache_key)
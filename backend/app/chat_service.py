@@ -3,15 +3,19 @@ Chat Service with Guardrails and Enhanced Context
 Provides AI-powered resume assistance with comprehensive context awareness
 """
 
-import os
-from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
-from .gemini_client import gemini_client
+from typing import AsyncIterator, List, Dict, Any, Optional
+from .gemini_client import (
+    gemini_client, GEMINI_MODEL, GEMINI_CONTEXT_CACHE_ENABLED, GeminiTimeoutError, GeminiUnavailableError
+)
+from .token_budget import truncate_to_tokens
 
-load_dotenv()
+# Conversation history is sent in windows that start every HISTORY_WINDOW
+# messages, so between 5 and 9 of the latest messages are included
+HISTORY_WINDOW = 5
 
-# Gemini model configuration
-GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash-lite')
+# Context token budgets for the job description and resume summary
+JOB_DESCRIPTION_TOKENS = 400
+RESUME_SUMMARY_TOKENS = 50
 
 # Comprehensive system prompt with guardrails
 SYSTEM_PROMPT = """You are a professional resume optimization assistant. Your role is to help users improve their resumes and job applications.
@@ -43,8 +47,26 @@ When providing recommendations:
 - Cite specific qualifications or skills mentioned in the job posting
 - When job description is not available, focus on general resume best practices"""
 
+# SYSTEM_PROMPT with the separator that follows it, joined once at import
+SYSTEM_PROMPT_PREFIX = SYSTEM_PROMPT + "\n\n"
 
-def generate_chat_response(
+# Added to the context when there is analysis data but no job description
+NO_JOB_DESCRIPTION_NOTE = "\nNote: No job description available. Recommendations are based on resume content and general best practices.\n"
+
+# Returned for a context with none of CONTEXT_KEYS
+NO_CONTEXT_MESSAGE = "No analysis context available"
+
+# Context keys build_enhanced_context reads
+CONTEXT_KEYS = frozenset({
+    'job_title', 'job_company', 'job_description', 'scores', 'gaps', 'strengths',
+    'missing_keywords', 'ats_issues', 'resume_summary', 'recommendations'
+})
+
+# Score keys and their labels, in the order they are listed
+SCORE_LABELS = (('total', 'Overall'), ('keyword', 'Keyword'), ('semantic', 'Semantic'), ('ats', 'ATS'))
+
+
+async def generate_chat_response(
     message: str,
     context: Dict[str, Any],
     conversation_history: Optional[List[Dict[str, str]]] = None
@@ -64,51 +86,136 @@ def generate_chat_response(
         Exception: If AI service fails or times out
     """
     try:
-        # Build comprehensive context prompt
-        context_prompt = build_enhanced_context(context)
-        
-        # Format conversation history
-        history_prompt = format_conversation_history(conversation_history or [])
-        
-        # Construct full prompt with guardrails
-        full_prompt = f"""{SYSTEM_PROMPT}
-
-ANALYSIS CONTEXT:
-{context_prompt}
-
-CONVERSATION HISTORY:
-{history_prompt}
-
-USER MESSAGE:
-{message}
-
-ASSISTANT RESPONSE:"""
+        cached_content = await get_system_prompt_cache()
+        full_prompt = build_chat_prompt(
+            message, context, conversation_history, include_system_prompt=cached_content is None
+        )
         
         # Call Gemini API with chat-specific configuration
-        response = gemini_client.generate(
+        response = await gemini_client.generate_async(
             prompt=full_prompt,
             model=GEMINI_MODEL,
             max_tokens=800,  # Longer responses for chat
             temperature=0.7,
-            timeout=90
+            timeout=90,
+            cached_content=cached_content,
+            # The prompt holds the whole conversation, so a repeat is a re-send
+            cache_response=True
         )
         
         return response
         
     except Exception as e:
-        # User-friendly fallback error messages
-        error_msg = str(e).lower()
+        return chat_error_message(e)
+
+
+async def stream_chat_response(
+    message: str,
+    context: Dict[str, Any],
+    conversation_history: Optional[List[Dict[str, str]]] = None
+) -> AsyncIterator[str]:
+    """
+    Stream an AI chat response chunk by chunk as it is generated
+    
+    Args:
+        message: User's message
+        context: Analysis context including scores, gaps, strengths, etc.
+        conversation_history: Previous messages in the conversation
         
-        if 'timeout' in error_msg:
-            return ("I apologize, but I'm taking longer than expected to respond. "
-                   "This might be due to high demand. Please try asking a simpler question, "
-                   "or try again in a moment.")
-        elif 'connection' in error_msg or 'unavailable' in error_msg:
-            return ("I apologize, but I'm having trouble connecting to the AI service right now. "
-                   "Please try again in a moment. If the issue persists, check your internet connection.")
-        else:
-            return ("I apologize, but I encountered an error while processing your request. "
-                   "Please try rephrasing your question or try again shortly.")
+    Yields:
+        Response text chunks; a user-friendly error message if generation fails
+    """
+    try:
+        cached_content = await get_system_prompt_cache()
+        full_prompt = build_chat_prompt(
+            message, context, conversation_history, include_system_prompt=cached_content is None
+        )
+        
+        async for chunk in gemini_client.generate_stream(
+            prompt=full_prompt,
+            model=GEMINI_MODEL,
+            max_tokens=800,
+            temperature=0.7,
+            timeout=90,
+            cached_content=cached_content
+        ):
+            yield chunk
+            
+    except Exception as e:
+        yield chat_error_message(e)
+
+
+async def get_system_prompt_cache() -> Optional[str]:
+    """
+    Get the Gemini context cache holding SYSTEM_PROMPT
+    
+    Returns:
+        Cache name, or None when context caching is disabled or unavailable
+        and the system prompt must be sent inline
+    """
+    if not GEMINI_CONTEXT_CACHE_ENABLED:
+        return None
+    return await gemini_client.get_context_cache(SYSTEM_PROMPT, GEMINI_MODEL)
+
+
+def build_chat_prompt(
+    message: str,
+    context: Dict[str, Any],
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    include_system_prompt: bool = True
+) -> str:
+    """
+    Build the full chat prompt with guardrails, context and history
+    
+    Args:
+        message: User's message
+        context: Analysis context including scores, gaps, strengths, etc.
+        conversation_history: Previous messages in the conversation
+        include_system_prompt: Whether to start with SYSTEM_PROMPT (False
+            when it is supplied from a context cache)
+        
+    Returns:
+        Prompt text
+    """
+    # Build comprehensive context prompt
+    context_prompt = build_enhanced_context(context)
+    
+    # Format conversation history
+    history_prompt = format_conversation_history(conversation_history or [])
+    
+    # Ordered from least to most volatile (analysis context, history, then
+    # the new message) so consecutive turns share as long a prefix as
+    # possible, and joined in one copy. The guardrails lead unless the model
+    # already has them cached
+    return "".join((
+        SYSTEM_PROMPT_PREFIX if include_system_prompt else "",
+        "ANALYSIS CONTEXT:\n", context_prompt,
+        "\n\nCONVERSATION HISTORY:\n", history_prompt,
+        "\n\nUSER MESSAGE:\n", message,
+        "\n\nASSISTANT RESPONSE:"
+    ))
+
+
+def chat_error_message(error: Exception) -> str:
+    """
+    Map a generation failure to a user-friendly chat reply
+    
+    Args:
+        error: Exception raised while generating
+        
+    Returns:
+        Fallback message text
+    """
+    if isinstance(error, GeminiTimeoutError):
+        return ("I apologize, but I'm taking longer than expected to respond. "
+               "This might be due to high demand. Please try asking a simpler question, "
+               "or try again in a moment.")
+    elif isinstance(error, GeminiUnavailableError):
+        return ("I apologize, but I'm having trouble connecting to the AI service right now. "
+               "Please try again in a moment. If the issue persists, check your internet connection.")
+    else:
+        return ("I apologize, but I encountered an error while processing your request. "
+               "Please try rephrasing your question or try again shortly.")
 
 
 def build_enhanced_context(context: Dict[str, Any]) -> str:
@@ -129,104 +236,113 @@ def build_enhanced_context(context: Dict[str, Any]) -> str:
     Returns:
         Formatted context string for AI prompt
     """
+    if not context or CONTEXT_KEYS.isdisjoint(context):
+        return NO_CONTEXT_MESSAGE
+    
     parts = []
     
     # Job information
-    if context.get('job_title'):
-        parts.append(f"Target Job: {context['job_title']}")
-    if context.get('job_company'):
-        parts.append(f"Company: {context['job_company']}")
+    job_title = context.get('job_title')
+    if job_title:
+        parts.append(f"Target Job: {job_title}")
+    job_company = context.get('job_company')
+    if job_company:
+        parts.append(f"Company: {job_company}")
     
     # Job description (truncated if too long)
-    if context.get('job_description'):
-        job_desc = str(context['job_description']).strip()
-        # Truncate to 1500 characters to avoid token limits
-        if len(job_desc) > 1500:
-            job_desc = job_desc[:1500] + "..."
+    job_description = context.get('job_description')
+    if job_description:
+        job_desc = truncate_with_ellipsis(str(job_description).strip(), JOB_DESCRIPTION_TOKENS)
         parts.append(f"\nJob Description:\n{job_desc}\n")
-    elif context:  # Only add notice if context has other data
+    else:
         # Add notice when job description is missing but other context exists
-        parts.append("\nNote: No job description available. Recommendations are based on resume content and general best practices.\n")
+        parts.append(NO_JOB_DESCRIPTION_NOTE)
     
     # Match scores
-    if context.get('scores'):
-        scores = context['scores']
-        score_parts = []
-        if isinstance(scores, dict):
-            if 'total' in scores:
-                score_parts.append(f"Overall: {scores['total']}%")
-            if 'keyword' in scores:
-                score_parts.append(f"Keyword: {scores['keyword']}%")
-            if 'semantic' in scores:
-                score_parts.append(f"Semantic: {scores['semantic']}%")
-            if 'ats' in scores:
-                score_parts.append(f"ATS: {scores['ats']}%")
-            if score_parts:
-                parts.append(f"Match Scores - {', '.join(score_parts)}")
+    scores = context.get('scores')
+    if scores and isinstance(scores, dict):
+        score_parts = [f"{label}: {scores[key]}%" for key, label in SCORE_LABELS if key in scores]
+        if score_parts:
+            parts.append(f"Match Scores - {', '.join(score_parts)}")
     
     # Key gaps (top 5)
-    if context.get('gaps'):
-        gaps = context['gaps']
-        if isinstance(gaps, list) and gaps:
-            gap_list = gaps[:5]
-            parts.append(f"Key Gaps: {', '.join(str(g) for g in gap_list)}")
+    gaps = context.get('gaps')
+    if gaps and isinstance(gaps, list):
+        parts.append(f"Key Gaps: {', '.join(str(g) for g in gaps[:5])}")
     
     # Strengths (top 5)
-    if context.get('strengths'):
-        strengths = context['strengths']
-        if isinstance(strengths, list) and strengths:
-            strength_list = strengths[:5]
-            parts.append(f"Strengths: {', '.join(str(s) for s in strength_list)}")
+    strengths = context.get('strengths')
+    if strengths and isinstance(strengths, list):
+        parts.append(f"Strengths: {', '.join(str(s) for s in strengths[:5])}")
     
     # Missing keywords (top 10)
-    if context.get('missing_keywords'):
-        keywords = context['missing_keywords']
-        if isinstance(keywords, list) and keywords:
-            keyword_list = keywords[:10]
-            parts.append(f"Missing Keywords: {', '.join(str(k) for k in keyword_list)}")
+    keywords = context.get('missing_keywords')
+    if keywords and isinstance(keywords, list):
+        parts.append(f"Missing Keywords: {', '.join(str(k) for k in keywords[:10])}")
     
     # Critical ATS issues (top 3)
-    if context.get('ats_issues'):
-        issues = context['ats_issues']
-        if isinstance(issues, list):
-            critical = []
-            for issue in issues:
-                if isinstance(issue, dict) and issue.get('severity') == 'critical':
-                    msg = issue.get('message') or issue.get('description', '')
-                    if msg:
-                        critical.append(msg)
-                if len(critical) >= 3:
-                    break
-            if critical:
-                parts.append(f"Critical ATS Issues: {'; '.join(critical)}")
+    issues = context.get('ats_issues')
+    if issues and isinstance(issues, list):
+        critical = []
+        for issue in issues:
+            if isinstance(issue, dict) and issue.get('severity') == 'critical':
+                msg = issue.get('message') or issue.get('description', '')
+                if msg:
+                    critical.append(msg)
+            if len(critical) >= 3:
+                break
+        if critical:
+            parts.append(f"Critical ATS Issues: {'; '.join(critical)}")
     
     # Resume summary (truncated if too long)
-    if context.get('resume_summary'):
-        summary = str(context['resume_summary'])
-        if len(summary) > 200:
-            summary = summary[:200] + "..."
+    resume_summary = context.get('resume_summary')
+    if resume_summary:
+        summary = truncate_with_ellipsis(str(resume_summary), RESUME_SUMMARY_TOKENS)
         parts.append(f"Resume Summary: {summary}")
     
     # Recommendations (top 3)
-    if context.get('recommendations'):
-        recommendations = context['recommendations']
-        if isinstance(recommendations, list):
-            rec_list = []
-            for rec in recommendations[:3]:
-                if isinstance(rec, dict):
-                    rec_type = rec.get('type', '')
-                    explanation = rec.get('explanation', '')
-                    if rec_type:
-                        rec_list.append(f"{rec_type}: {explanation}" if explanation else rec_type)
-            if rec_list:
-                parts.append(f"Top Recommendations: {'; '.join(rec_list)}")
+    recommendations = context.get('recommendations')
+    if recommendations and isinstance(recommendations, list):
+        rec_list = []
+        for rec in recommendations[:3]:
+            if isinstance(rec, dict):
+                rec_type = rec.get('type', '')
+                explanation = rec.get('explanation', '')
+                if rec_type:
+                    rec_list.append(f"{rec_type}: {explanation}" if explanation else rec_type)
+        if rec_list:
+            parts.append(f"Top Recommendations: {'; '.join(rec_list)}")
+    
+    return "\n".join(parts)
+
+
+def truncate_with_ellipsis(text: str, max_tokens: int) -> str:
+    """
+    Truncate text to a token budget, marking cut text with "..."
     
-    return "\n".join(parts) if parts else "No analysis context available"
+    Budgeting by tokens rather than characters keeps the prompt cost the
+    same whatever the language of the text.
+    
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget
+        
+    Returns:
+        text, or its leading portion followed by "..."
+    """
+    truncated = truncate_to_tokens(text, max_tokens)
+    return truncated if truncated == text else truncated + "..."
 
 
 def format_conversation_history(history: List[Dict[str, str]]) -> str:
     """
-    Format last 5 messages for conversation context
+    Format recent messages for conversation context
+    
+    Rather than the last 5 messages, which changes the first message sent
+    on every turn, the window starts at a multiple of HISTORY_WINDOW (while
+    keeping at least the last 5). Consecutive prompts then share a
+    byte-identical prefix through the history for several turns, so the
+    provider's prefix caching can reuse it.
     
     Args:
         history: List of message dictionaries with 'role' and 'content' keys
@@ -238,8 +354,8 @@ def format_conversation_history(history: List[Dict[str, str]]) -> str:
         return "No previous conversation"
     
     formatted = []
-    # Take only last 5 messages for context
-    recent_history = history[-5:]
+    window_start = max(0, (len(history) - HISTORY_WINDOW) // HISTORY_WINDOW * HISTORY_WINDOW)
+    recent_history = history[window_start:]
     
     for msg in recent_history:
         if not isinstance(msg, dict):
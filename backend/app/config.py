@@ -8,6 +8,7 @@ import sys
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
+# The only place .env is read; other modules take their settings from get_config()
 load_dotenv()
 
 
@@ -27,21 +28,33 @@ class AppConfig:
         # Gemini Configuration
         self.gemini_api_key = os.getenv('GEMINI_API_KEY', '')
         self.gemini_model = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash-lite')
+        self.gemini_batch_enabled = os.getenv('GEMINI_BATCH_ENABLED', 'false').lower() == 'true'
+        self.gemini_context_cache_enabled = os.getenv('GEMINI_CONTEXT_CACHE_ENABLED', 'false').lower() == 'true'
         
         # Hugging Face Configuration (optional)
         self.hf_token = os.getenv('HF_TOKEN', '')
         self.hf_embedding_model = os.getenv('HF_EMBEDDING_MODEL', 'sentence-transformers/all-mpnet-base-v2')
+        
+        # Local Embedding Model Configuration
+        self.embeddings_provider = os.getenv('EMBEDDINGS_PROVIDER', 'local').lower()
+        self.gemini_embedding_model = os.getenv('GEMINI_EMBEDDING_MODEL', 'gemini-embedding-001')
+        self.embedding_backend = os.getenv('EMBEDDING_BACKEND', 'onnx').lower()
+        self.embedding_precision = os.getenv('EMBEDDING_PRECISION', 'int8').lower()
+        self.embedding_onnx_file = os.getenv('EMBEDDING_ONNX_FILE', '')
+        self.embedding_threads = int(os.getenv('EMBEDDING_THREADS', '0'))
         self.hf_generation_model = os.getenv('HF_GENERATION_MODEL', 'mistralai/Mistral-7B-Instruct-v0.2')
         
         # Rate Limiting
         self.rate_limit_enabled = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
         self.max_requests_per_minute = int(os.getenv('MAX_REQUESTS_PER_MINUTE', '10'))
+        self.redis_url = os.getenv('REDIS_URL', '')
         
         # WeasyPrint and PDF Generation Configuration
         self.weasyprint_cache_dir = os.getenv('WEASYPRINT_CACHE_DIR', './cache/weasyprint')
         self.template_dir = os.getenv('TEMPLATE_DIR', './app/templates')
         self.max_pdf_size_mb = int(os.getenv('MAX_PDF_SIZE_MB', '10'))
         self.pdf_generation_timeout = int(os.getenv('PDF_GENERATION_TIMEOUT', '30'))
+        self.cache_disk_dir = os.getenv('CACHE_DISK_DIR', '')
         
         # Ensure cache directory exists
         self._ensure_cache_directory()
@@ -126,9 +139,13 @@ class AppConfig:
         print('\n✓ Backend Configuration:')
         print(f'   - Gemini Model: {self.gemini_model}')
         print(f'   - Gemini API Key: {"✓ Set" if self.gemini_api_key else "✗ Not set"}')
+        print(f'   - Gemini Batch API: {"Enabled" if self.gemini_batch_enabled else "Disabled"}')
         print(f'   - HF Token: {"✓ Set" if self.hf_token else "✗ Not set"}')
+        print(f'   - Embeddings Provider: {self.embeddings_provider}')
+        print(f'   - Embedding Backend: {self.embedding_backend} ({self.embedding_precision})')
         print(f'   - Rate Limiting: {"Enabled" if self.rate_limit_enabled else "Disabled"}')
         print(f'   - Max Requests/Min: {self.max_requests_per_minute}')
+        print(f'   - Rate Limit Store: {"Redis" if self.redis_url else "In-memory"}')
         print(f'   - CORS Origins: {self.cors_origins}')
         print('\n✓ PDF Generation Configuration:')
         print(f'   - Template Directory: {self.template_dir}')
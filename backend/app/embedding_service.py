@@ -0,0 +1,320 @@
+"""
+Embedding Service
+Process-wide sentence-transformers model for text embeddings
+"""
+
+import base64
+import platform
+import asyncio
+import threading
+from typing import List, Optional, Any, Tuple
+import numpy as np
+from .config import get_config
+from .gemini_client import embed_texts_async, GEMINI_EMBEDDING_MODEL
+
+# Sentence-transformers model used for embeddings
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Provider behind the /embeddings endpoint: 'local' (sentence-transformers) or 'gemini'
+EMBEDDINGS_PROVIDER = get_config().embeddings_provider
+
+# Inference backend: 'onnx' (onnxruntime) or 'torch'
+EMBEDDING_BACKEND = get_config().embedding_backend
+
+# Weight precision for the onnx backend: 'int8' (dynamically quantized) or 'fp32'
+EMBEDDING_PRECISION = get_config().embedding_precision
+
+# ONNX export to load when using the onnx backend. When unset, the export is
+# chosen from EMBEDDING_PRECISION and the CPU (see get_onnx_file_name)
+EMBEDDING_ONNX_FILE = get_config().embedding_onnx_file
+
+# Intra-op threads for inference; 0 keeps the runtime default (all cores)
+EMBEDDING_THREADS = get_config().embedding_threads
+
+# Maximum tokens per text (all-MiniLM-L6-v2 was trained on 256-token inputs)
+EMBEDDING_MAX_SEQ_LENGTH = 256
+
+# Texts per forward pass inside model.encode. encode already sorts texts by
+# length before batching (and restores the input order), so each batch is
+# padded only to its own longest text. Larger batches buy little on CPU and
+# the attention scores grow with batch * seq_length^2
+EMBEDDING_BATCH_SIZE = 64
+
+# Concurrent /embeddings requests arriving within this window (seconds) are
+# merged into one encode call, up to EMBEDDING_MICRO_BATCH_TEXTS texts
+EMBEDDING_BATCH_WINDOW = 0.005
+EMBEDDING_MICRO_BATCH_TEXTS = 256
+
+# Loaded lazily on first use and reused for the lifetime of the process
+_embedding_model: Optional[Any] = None
+_embedding_model_lock = threading.Lock()
+
+# Pending (texts, future) requests and the task that batches them, bound to
+# the running event loop on first use
+_embedding_queue: Optional[asyncio.Queue] = None
+_embedding_batcher: Optional[asyncio.Task] = None
+
+
+def get_embedding_model() -> Any:
+    """
+    Get the shared embedding model, loading it on first use
+    
+    Returns:
+        SentenceTransformer model instance
+    
+    Raises:
+        ImportError: If sentence-transformers is not installed
+    """
+    global _embedding_model
+    
+    if _embedding_model is None:
+        # Concurrent first requests on worker threads load the model only once
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                model = load_embedding_model()
+                model.max_seq_length = EMBEDDING_MAX_SEQ_LENGTH
+                model.eval()
+                _embedding_model = model
+    
+    return _embedding_model
+
+
+def get_onnx_file_name() -> str:
+    """
+    Get the ONNX export to load for the configured precision and this CPU
+    
+    INT8 exports published with the model are quantized for a specific
+    instruction set; the VNNI build runs int8 dot products in a single
+    instruction, and the others cover CPUs without it.
+    
+    Returns:
+        Path of the ONNX file inside the model repository
+    """
+    if EMBEDDING_ONNX_FILE:
+        return EMBEDDING_ONNX_FILE
+    
+    if EMBEDDING_PRECISION == 'fp32':
+        return 'onnx/model.onnx'
+    
+    if platform.machine().lower() in ('arm64', 'aarch64'):
+        return 'onnx/model_qint8_arm64.onnx'
+    
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            flags = next((line for line in cpuinfo if line.startswith('flags')), '').split()
+    except OSError:
+        flags = []
+    
+    if 'avx512_vnni' in flags:
+        return 'onnx/model_qint8_avx512_vnni.onnx'
+    if 'avx512f' in flags:
+        return 'onnx/model_qint8_avx512.onnx'
+    
+    return 'onnx/model_quint8_avx2.onnx'
+
+
+def load_embedding_model() -> Any:
+    """
+    Load the embedding model on the configured backend
+    
+    Falls back to PyTorch if the ONNX backend cannot be loaded
+    (e.g. onnxruntime or optimum is not installed).
+    
+    Returns:
+        SentenceTransformer model instance
+    
+    Raises:
+        ImportError: If sentence-transformers is not installed
+    """
+    from sentence_transformers import SentenceTransformer
+    
+    if EMBEDDING_BACKEND == 'onnx':
+        try:
+            import onnxruntime
+            
+            session_options = onnxruntime.SessionOptions()
+            if EMBEDDING_THREADS > 0:
+                session_options.intra_op_num_threads = EMBEDDING_THREADS
+            
+            return SentenceTransformer(
+                EMBEDDING_MODEL_NAME,
+                backend='onnx',
+                model_kwargs={
+                    'file_name': get_onnx_file_name(),
+                    'provider': 'CPUExecutionProvider',
+                    'session_options': session_options
+                }
+            )
+        except Exception as e:
+            print(f"⚠ Warning: Failed to load ONNX embedding model, using PyTorch: {e}")
+    
+    if EMBEDDING_THREADS > 0:
+        import torch
+        
+        torch.set_num_threads(EMBEDDING_THREADS)
+    
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def encode_texts(texts: List[str]) -> Any:
+    """
+    Encode texts into unit-length embeddings
+    
+    Args:
+        texts: Texts to embed
+    
+    Returns:
+        NumPy array of shape (len(texts), dimension)
+    
+    Raises:
+        ImportError: If sentence-transformers is not installed
+    """
+    model = get_embedding_model()
+    
+    return model.encode(
+        texts,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+
+
+async def encode_texts_for_api(texts: List[str]) -> Any:
+    """
+    Encode texts for the /embeddings endpoint without blocking the event loop
+    
+    Uses Gemini when EMBEDDINGS_PROVIDER is 'gemini'. Otherwise the texts join
+    the next micro-batch for the local model, which runs on a worker thread.
+    
+    Args:
+        texts: Texts to embed
+    
+    Returns:
+        NumPy array of shape (len(texts), dimension)
+    
+    Raises:
+        ImportError: If the local provider is used and sentence-transformers is not installed
+    """
+    if EMBEDDINGS_PROVIDER == 'gemini':
+        embeddings = np.asarray(await embed_texts_async(texts), dtype=np.float32)
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    
+    future = asyncio.get_running_loop().create_future()
+    get_embedding_queue().put_nowait((texts, future))
+    
+    return await future
+
+
+def get_embedding_queue() -> asyncio.Queue:
+    """
+    Get the micro-batching queue, starting its batcher task on first use
+    
+    Returns:
+        Queue of (texts, future) requests for the running event loop
+    """
+    global _embedding_queue, _embedding_batcher
+    
+    loop = asyncio.get_running_loop()
+    if _embedding_batcher is None or _embedding_batcher.done() or _embedding_batcher.get_loop() is not loop:
+        _embedding_queue = asyncio.Queue()
+        _embedding_batcher = loop.create_task(run_embedding_batches(_embedding_queue))
+    
+    return _embedding_queue
+
+
+async def run_embedding_batches(queue: asyncio.Queue) -> None:
+    """
+    Merge queued requests into micro-batches and encode each with one call
+    
+    Args:
+        queue: Queue of (texts, future) requests
+    """
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        batch: List[Tuple[List[str], asyncio.Future]] = [await queue.get()]
+        batch_texts = len(batch[0][0])
+        deadline = loop.time() + EMBEDDING_BATCH_WINDOW
+        
+        # Collect requests that arrive within the window
+        while batch_texts < EMBEDDING_MICRO_BATCH_TEXTS:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(request)
+            batch_texts += len(request[0])
+        
+        merged = [text for texts, _ in batch for text in texts]
+        try:
+            embeddings = await asyncio.to_thread(encode_texts, merged)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        
+        # Hand each request its slice of the merged result
+        offset = 0
+        for texts, future in batch:
+            if not future.done():
+                future.set_result(embeddings[offset:offset + len(texts)])
+            offset += len(texts)
+
+
+def get_api_embedding_model_name() -> str:
+    """Get the name of the model behind the /embeddings endpoint"""
+    return GEMINI_EMBEDDING_MODEL if EMBEDDINGS_PROVIDER == 'gemini' else EMBEDDING_MODEL_NAME
+
+
+def encode_embeddings_base64(embeddings: Any) -> List[str]:
+    """
+    Pack embeddings as base64-encoded little-endian float16 bytes
+    
+    Halves the response size compared to float32 while keeping enough
+    precision for cosine similarity on unit-length vectors.
+    
+    Args:
+        embeddings: NumPy array of shape (n, dimension)
+    
+    Returns:
+        One base64 string per embedding
+    """
+    packed = embeddings.astype('<f2')
+    
+    return [base64.b64encode(row.tobytes()).decode('ascii') for row in packed]
+
+
+def encode_embeddings_binary(embeddings: Any) -> bytes:
+    """
+    Pack embeddings as one row-major block of little-endian float16 values
+    
+    Args:
+        embeddings: NumPy array of shape (n, dimension)
+    
+    Returns:
+        n * dimension * 2 bytes
+    """
+    return np.ascontiguousarray(embeddings, dtype='<f2').tobytes()
+
+
+def warm_up_embedding_model() -> bool:
+    """
+    Load the embedding model ahead of the first request
+    
+    Also runs one encode so the inference session allocates its buffers
+    and selects kernels at startup rather than on the first request.
+    
+    Returns:
+        True if the model was loaded, False otherwise
+    """
+    try:
+        encode_texts(['warm up'])
+        return True
+    except Exception as e:
+        print(f"⚠ Warning: Failed to load embedding model: {e}")
+        return False
@@ -3,17 +3,109 @@ Gemini Client
 Unified client for accessing Google's Gemini API
 """
 
-import os
-from typing import Optional
-from dotenv import load_dotenv
+import io
+import json
+import time
+import random
+import asyncio
+import itertools
+import httpx
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 from google import genai
-from google.genai import types
-
-load_dotenv()
+from google.genai import errors, types
+from .config import get_config
+from .cache_manager import LRUCache, generate_cache_key
 
 # Gemini configuration
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
-GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash-lite')
+GEMINI_API_KEY = get_config().gemini_api_key
+GEMINI_MODEL = get_config().gemini_model
+
+# Route background-tolerable generations through the Gemini Batch API
+GEMINI_BATCH_ENABLED = get_config().gemini_batch_enabled
+
+# Keep long, static prompt prefixes in Gemini context caches so they are
+# billed at the cached-input rate instead of being re-sent on every call
+GEMINI_CONTEXT_CACHE_ENABLED = get_config().gemini_context_cache_enabled
+
+# Lifetime of a context cache in seconds. It is extended when a request
+# arrives with less than a quarter of it left
+GEMINI_CONTEXT_CACHE_TTL = 3600
+
+# Identical low-temperature requests (retries, re-submitted forms) are
+# answered from a per-client cache for a few minutes. Higher temperatures
+# are meant to vary between calls, so they are only cached when the caller
+# asks (cache_response), as chat does: its prompt carries the whole
+# conversation, so an identical one is a re-send rather than a new question
+GEMINI_RESPONSE_CACHE_SIZE = 512
+GEMINI_RESPONSE_CACHE_TTL = 600
+GEMINI_RESPONSE_CACHE_MAX_TEMPERATURE = 0.3
+
+# Transient failures (rate limits, 5xx, timeouts, dropped connections) are
+# retried with exponential backoff and full jitter, within the request's
+# timeout. Each attempt is limited to GEMINI_ATTEMPT_TIMEOUT seconds so a
+# stalled connection leaves time to retry
+GEMINI_MAX_ATTEMPTS = 4
+GEMINI_RETRY_INITIAL_DELAY = 0.5
+GEMINI_RETRY_MAX_DELAY = 8.0
+GEMINI_ATTEMPT_TIMEOUT = 30
+
+# Gemini embedding model
+GEMINI_EMBEDDING_MODEL = get_config().gemini_embedding_model
+
+# Gemini accepts at most 100 texts per embedding request
+GEMINI_EMBED_BATCH_SIZE = 100
+
+# Embedding requests in flight at once, to stay under Gemini's 429 threshold
+GEMINI_EMBED_CONCURRENCY = 5
+
+# Connection pool for Gemini HTTP requests. Idle connections are kept open
+# long enough to be reused across back-to-back calls (e.g. bullet rewrite
+# batches) instead of paying a TCP + TLS handshake each time
+GEMINI_HTTP_CLIENT_ARGS = {
+    'http2': True,
+    'limits': httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60)
+}
+
+
+T = TypeVar('T')
+
+
+class GeminiError(Exception):
+    """Raised when a Gemini request fails"""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        # Seconds the server asked to wait before retrying, if it said
+        self.retry_after = retry_after
+
+
+class GeminiAuthError(GeminiError):
+    """Raised when the API key is missing, invalid or not permitted"""
+    pass
+
+
+class GeminiRateLimitError(GeminiError):
+    """Raised when the request quota or rate limit is exceeded"""
+    pass
+
+
+class GeminiTimeoutError(GeminiError):
+    """Raised when a request times out"""
+    pass
+
+
+class GeminiUnavailableError(GeminiError):
+    """Raised when the API can't be reached or is temporarily down"""
+    pass
+
+
+class GeminiContentFilterError(GeminiError):
+    """Raised when the prompt or response is blocked by safety settings"""
+    pass
+
+
+# Failures that may succeed if the request is sent again
+RETRYABLE_ERRORS = (GeminiRateLimitError, GeminiTimeoutError, GeminiUnavailableError)
 
 
 class GeminiClient:
@@ -31,8 +123,19 @@ class GeminiClient:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable is not set")
         
-        # Initialize the Gemini client
-        self.client = genai.Client(api_key=self.api_key)
+        # Initialize the Gemini client, reusing pooled keep-alive connections
+        self.client = genai.Client(
+            api_key=self.api_key,
+            http_options=types.HttpOptions(
+                client_args=GEMINI_HTTP_CLIENT_ARGS,
+                async_client_args=GEMINI_HTTP_CLIENT_ARGS
+            )
+        )
+        
+        self.response_cache = LRUCache[str](max_size=GEMINI_RESPONSE_CACHE_SIZE, ttl=GEMINI_RESPONSE_CACHE_TTL)
+        
+        # (cache name or None, expiry on the monotonic clock) per (model, instruction)
+        self._context_caches: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
         
         print(f"✓ Using Google Gemini API with model: {GEMINI_MODEL}")
     
@@ -43,7 +146,11 @@ class GeminiClient:
         max_tokens: int = 500,
         temperature: float = 0.7,
         timeout: int = 90,
-        response_mime_type: Optional[str] = None
+        response_mime_type: Optional[str] = None,
+        top_p: Optional[float] = None,
+        stop_sequences: Optional[List[str]] = None,
+        cached_content: Optional[str] = None,
+        cache_response: bool = False
     ) -> str:
         """
         Generate text using Gemini model
@@ -53,8 +160,12 @@ class GeminiClient:
             model: Model name to use (defaults to gemini-2.5-flash-lite)
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature (0-1)
-            timeout: Request timeout in seconds
+            timeout: Total seconds allowed, including retries of transient failures
             response_mime_type: Optional MIME type for response (e.g., 'application/json')
+            top_p: Optional nucleus sampling cutoff (0-1)
+            stop_sequences: Optional sequences that end generation early
+            cached_content: Optional context cache name from get_context_cache
+            cache_response: Cache the response whatever the temperature
             
         Returns:
             Generated text response
@@ -62,38 +173,468 @@ class GeminiClient:
         Raises:
             Exception: If API call fails
         """
-        try:
-            # Configure generation parameters
-            config = types.GenerateContentConfig(
-                temperature=temperature,
-                max_output_tokens=max_tokens,
-                response_mime_type=response_mime_type
-            )
-            
+        cache_key = self._response_cache_key(
+            prompt, model, max_tokens, temperature, cache_response,
+            response_mime_type, top_p, stop_sequences, cached_content
+        )
+        if cache_key is not None:
+            cached_text = self.response_cache.get(cache_key)
+            if cached_text is not None:
+                return cached_text
+        
+        def attempt(attempt_timeout: float) -> str:
             # Make the API call
             response = self.client.models.generate_content(
                 model=model,
                 contents=prompt,
-                config=config
+                config=self._generation_config(
+                    max_tokens, temperature, response_mime_type, top_p, stop_sequences, cached_content,
+                    attempt_timeout
+                )
             )
             
             # Extract and return the text
-            return response.text.strip()
+            return self._response_text(response)
+        
+        text = self._with_retries(attempt, timeout)
+        
+        if cache_key is not None:
+            self.response_cache.set(cache_key, text)
+        return text
+    
+    def _response_cache_key(
+        self, prompt: str, model: str, max_tokens: int, temperature: float, cache_response: bool, *params
+    ) -> Optional[str]:
+        """Get the response cache key for a request, or None if it shouldn't be cached"""
+        if temperature > GEMINI_RESPONSE_CACHE_MAX_TEMPERATURE and not cache_response:
+            return None
+        return generate_cache_key(prompt, model, max_tokens, temperature, *params)
+    
+    def _generation_config(
+        self,
+        max_tokens: int,
+        temperature: float,
+        response_mime_type: Optional[str],
+        top_p: Optional[float],
+        stop_sequences: Optional[List[str]],
+        cached_content: Optional[str] = None,
+        attempt_timeout: Optional[float] = None
+    ) -> types.GenerateContentConfig:
+        """Build the generation parameters shared by generate, generate_async and generate_stream"""
+        return types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+            response_mime_type=response_mime_type,
+            top_p=top_p,
+            stop_sequences=stop_sequences,
+            cached_content=cached_content,
+            # The SDK takes the timeout in milliseconds
+            http_options=types.HttpOptions(timeout=int(attempt_timeout * 1000)) if attempt_timeout else None
+        )
+    
+    def _with_retries(self, attempt: Callable[[float], T], timeout: float) -> T:
+        """
+        Run a request, retrying transient failures until timeout seconds have passed
+        
+        Args:
+            attempt: Makes one request, given its timeout in seconds
+            timeout: Total seconds allowed for all attempts and the waits between them
             
-        except Exception as e:
-            error_msg = str(e).lower()
-            
-            # Handle specific error types
-            if 'api key' in error_msg or 'authentication' in error_msg or 'unauthorized' in error_msg:
-                raise Exception("Gemini API authentication failed. Please check your API key.")
-            elif 'quota' in error_msg or 'rate limit' in error_msg:
-                raise Exception("Gemini API rate limit exceeded. Please try again later.")
-            elif 'timeout' in error_msg:
-                raise Exception("Gemini API request timeout")
-            elif 'content' in error_msg and 'filter' in error_msg:
-                raise Exception("Content was filtered by safety settings")
+        Returns:
+            The result of the first successful attempt
+            
+        Raises:
+            GeminiError: If the last attempt fails or the failure isn't transient
+        """
+        deadline = time.monotonic() + timeout
+        
+        for attempt_number in range(GEMINI_MAX_ATTEMPTS):
+            try:
+                return attempt(self._attempt_timeout(deadline))
+            except Exception as e:
+                error = self._api_error(e)
+                delay = self._retry_delay(error, attempt_number, deadline)
+                if delay is None:
+                    raise error
+            time.sleep(delay)
+    
+    async def _with_retries_async(self, attempt: Callable[[float], Awaitable[T]], timeout: float) -> T:
+        """Async version of _with_retries, waiting between attempts without blocking the event loop"""
+        deadline = time.monotonic() + timeout
+        
+        for attempt_number in range(GEMINI_MAX_ATTEMPTS):
+            try:
+                return await attempt(self._attempt_timeout(deadline))
+            except Exception as e:
+                error = self._api_error(e)
+                delay = self._retry_delay(error, attempt_number, deadline)
+                if delay is None:
+                    raise error
+            await asyncio.sleep(delay)
+    
+    def _attempt_timeout(self, deadline: float) -> float:
+        """Get the timeout for the next attempt, at most GEMINI_ATTEMPT_TIMEOUT and never past the deadline"""
+        return max(1.0, min(GEMINI_ATTEMPT_TIMEOUT, deadline - time.monotonic()))
+    
+    def _retry_delay(self, error: GeminiError, attempt_number: int, deadline: float) -> Optional[float]:
+        """Get how long to wait before retrying a failed attempt, or None to give up"""
+        if not isinstance(error, RETRYABLE_ERRORS) or attempt_number + 1 >= GEMINI_MAX_ATTEMPTS:
+            return None
+        
+        # Full jitter, so clients that failed together don't retry together
+        delay = random.uniform(0, min(GEMINI_RETRY_MAX_DELAY, GEMINI_RETRY_INITIAL_DELAY * 2 ** attempt_number))
+        if error.retry_after is not None:
+            delay = max(delay, error.retry_after)
+        
+        # Give up now rather than wait past the point where a retry could finish
+        if time.monotonic() + delay + 1.0 > deadline:
+            return None
+        return delay
+    
+    async def get_context_cache(self, system_instruction: str, model: str = GEMINI_MODEL) -> Optional[str]:
+        """
+        Get a Gemini context cache holding a system instruction
+        
+        The cache is created on first use and its TTL extended once it is
+        close to expiring. If it can't be created (e.g. the instruction is
+        below the model's minimum cacheable size) None is returned, and
+        creation is not retried until a TTL has passed.
+        
+        Args:
+            system_instruction: Static instruction to cache
+            model: Model the cache is used with
+            
+        Returns:
+            Cache name to pass as cached_content, or None to send the
+            instruction inline
+        """
+        key = (model, system_instruction)
+        name, expires_at = self._context_caches.get(key, (None, 0.0))
+        now = time.monotonic()
+        
+        if now < expires_at - GEMINI_CONTEXT_CACHE_TTL / 4:
+            return name
+        
+        ttl = f'{GEMINI_CONTEXT_CACHE_TTL}s'
+        try:
+            if name is None or now >= expires_at:
+                cache = await self.client.aio.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(system_instruction=system_instruction, ttl=ttl)
+                )
+                name = cache.name
             else:
-                raise Exception(f"Gemini API error: {e}")
+                await self.client.aio.caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=ttl))
+        except Exception:
+            name = None
+        
+        self._context_caches[key] = (name, now + GEMINI_CONTEXT_CACHE_TTL)
+        return name
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        model: str = GEMINI_MODEL,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        cached_content: Optional[str] = None,
+        timeout: int = 90
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text chunks as the model produces them
+        
+        Args:
+            prompt: The prompt to send to the model
+            model: Model name to use
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature (0-1)
+            cached_content: Optional context cache name from get_context_cache
+            timeout: Total seconds allowed for the whole stream
+            
+        Yields:
+            Text chunks in generation order
+            
+        Raises:
+            GeminiTimeoutError: If the stream stalls or outlasts timeout
+            GeminiError: If API call fails
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        
+        try:
+            # The HTTP timeout catches a stalled connection; the deadline, checked
+            # per chunk rather than around the yields, bounds a slow but live stream
+            stream = await asyncio.wait_for(
+                self.client.aio.models.generate_content_stream(
+                    model=model,
+                    contents=prompt,
+                    config=self._generation_config(
+                        max_tokens, temperature, None, None, None, cached_content, attempt_timeout=timeout
+                    )
+                ),
+                timeout
+            )
+            
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline - loop.time()))
+                except StopAsyncIteration:
+                    break
+                
+                if chunk.text:
+                    yield chunk.text
+                    
+        except asyncio.TimeoutError:
+            raise GeminiTimeoutError("Gemini API request timeout")
+        except Exception as e:
+            raise self._api_error(e)
+    
+    def _response_text(self, response: types.GenerateContentResponse) -> str:
+        """Get the generated text of a response, which has none when it was blocked"""
+        if response.text is None:
+            raise GeminiContentFilterError("Content was filtered by safety settings")
+        return response.text.strip()
+    
+    def _api_error(self, error: Exception) -> GeminiError:
+        """Translate an SDK or transport error into a user-facing exception by its type"""
+        if isinstance(error, GeminiError):
+            return error
+        
+        if isinstance(error, httpx.TimeoutException):
+            return GeminiTimeoutError("Gemini API request timeout")
+        if isinstance(error, httpx.TransportError):
+            return GeminiUnavailableError("Could not connect to the Gemini API")
+        
+        if isinstance(error, errors.APIError):
+            # Gemini rejects a bad key with 400 INVALID_ARGUMENT, so also check the reason
+            if error.code in (401, 403) or 'API_KEY_INVALID' in _error_reasons(error):
+                return GeminiAuthError("Gemini API authentication failed. Please check your API key.")
+            if error.code == 429:
+                return GeminiRateLimitError(
+                    "Gemini API rate limit exceeded. Please try again later.", _retry_after(error)
+                )
+            if error.code == 504:
+                return GeminiTimeoutError("Gemini API request timeout")
+            if isinstance(error, errors.ServerError):
+                return GeminiUnavailableError("Gemini API is temporarily unavailable", _retry_after(error))
+        
+        return GeminiError(f"Gemini API error: {error}")
+    
+    def submit_batch(
+        self,
+        prompts: List[str],
+        model: str = GEMINI_MODEL,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        display_name: Optional[str] = None
+    ) -> str:
+        """
+        Submit several prompts as a single Gemini Batch API job
+        
+        The prompts are serialized into one JSONL file, uploaded, and
+        referenced by the batch job, so N generations cost one submission.
+        
+        Args:
+            prompts: Prompts to generate responses for
+            model: Model name to use
+            max_tokens: Maximum tokens to generate per prompt
+            temperature: Sampling temperature (0-1)
+            display_name: Optional human-readable job name
+            
+        Returns:
+            Batch job name, used to poll status and retrieve results
+            
+        Raises:
+            Exception: If the upload or job creation fails
+        """
+        lines = [
+            json.dumps({
+                'key': f'request-{index}',
+                'request': {
+                    'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+                    'generation_config': {
+                        'temperature': temperature,
+                        'max_output_tokens': max_tokens
+                    }
+                }
+            })
+            for index, prompt in enumerate(prompts)
+        ]
+        
+        try:
+            uploaded_file = self.client.files.upload(
+                file=io.BytesIO('\n'.join(lines).encode('utf-8')),
+                config=types.UploadFileConfig(
+                    display_name=display_name or 'career-plus-batch',
+                    mime_type='jsonl'
+                )
+            )
+            
+            batch_job = self.client.batches.create(
+                model=model,
+                src=uploaded_file.name,
+                config=types.CreateBatchJobConfig(display_name=display_name or 'career-plus-batch')
+            )
+            
+            return batch_job.name
+            
+        except Exception as e:
+            raise Exception(f"Gemini batch submission failed: {e}")
+    
+    def get_batch_status(self, job_name: str) -> str:
+        """
+        Get the state of a batch job
+        
+        Args:
+            job_name: Batch job name returned by submit_batch
+            
+        Returns:
+            Job state name (e.g., 'JOB_STATE_RUNNING', 'JOB_STATE_SUCCEEDED')
+        """
+        batch_job = self.client.batches.get(name=job_name)
+        return batch_job.state.name
+    
+    def retrieve_batch_results(self, job_name: str, count: int) -> List[Optional[str]]:
+        """
+        Retrieve the generated texts of a finished batch job
+        
+        Args:
+            job_name: Batch job name returned by submit_batch
+            count: Number of prompts that were submitted
+            
+        Returns:
+            count generated texts in submission order (None for failed or
+            missing requests)
+            
+        Raises:
+            Exception: If the job has not succeeded
+        """
+        batch_job = self.client.batches.get(name=job_name)
+        
+        if batch_job.state.name != 'JOB_STATE_SUCCEEDED':
+            raise Exception(f"Gemini batch job is not complete (state: {batch_job.state.name})")
+        
+        content = self.client.files.download(file=batch_job.dest.file_name)
+        
+        results = {}
+        for line in content.decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            try:
+                parts = item['response']['candidates'][0]['content']['parts']
+                results[item['key']] = ''.join(part.get('text', '') for part in parts).strip()
+            except (KeyError, IndexError):
+                results[item.get('key')] = None
+        
+        # Sized by what was submitted, so a line missing from the output
+        # leaves a gap rather than dropping every later result
+        return [results.get(f'request-{index}') for index in range(count)]
+    
+    async def embed_async(
+        self,
+        texts: List[str],
+        model: str = GEMINI_EMBEDDING_MODEL
+    ) -> List[List[float]]:
+        """
+        Embed texts, splitting them into requests of at most 100 texts
+        
+        Requests are sent concurrently, at most GEMINI_EMBED_CONCURRENCY at a time.
+        
+        Args:
+            texts: Texts to embed
+            model: Embedding model name
+            
+        Returns:
+            One embedding per text, in input order
+            
+        Raises:
+            Exception: If API call fails
+        """
+        semaphore = asyncio.Semaphore(GEMINI_EMBED_CONCURRENCY)
+        
+        async def embed_chunk(chunk: List[str]) -> List[List[float]]:
+            async with semaphore:
+                response = await self.client.aio.models.embed_content(model=model, contents=chunk)
+                return [embedding.values for embedding in response.embeddings]
+        
+        chunks = [texts[i:i + GEMINI_EMBED_BATCH_SIZE] for i in range(0, len(texts), GEMINI_EMBED_BATCH_SIZE)]
+        
+        try:
+            results = await asyncio.gather(*[embed_chunk(chunk) for chunk in chunks])
+        except Exception as e:
+            raise self._api_error(e)
+        
+        return list(itertools.chain.from_iterable(results))
+    
+    async def generate_async(
+        self,
+        prompt: str,
+        model: str = GEMINI_MODEL,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        timeout: int = 90,
+        response_mime_type: Optional[str] = None,
+        top_p: Optional[float] = None,
+        stop_sequences: Optional[List[str]] = None,
+        cached_content: Optional[str] = None,
+        cache_response: bool = False
+    ) -> str:
+        """
+        Generate text with the SDK's async client so the event loop is not blocked
+        
+        The request is awaited on the event loop itself, so no worker
+        thread is tied up for the duration of the HTTP call.
+        
+        Args:
+            prompt: The prompt to send to the model
+            model: Model name to use
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature (0-1)
+            timeout: Total seconds allowed, including retries of transient failures
+            response_mime_type: Optional MIME type for response (e.g., 'application/json')
+            top_p: Optional nucleus sampling cutoff (0-1)
+            stop_sequences: Optional sequences that end generation early
+            cached_content: Optional context cache name from get_context_cache
+            cache_response: Cache the response whatever the temperature
+            
+        Returns:
+            Generated text response
+            
+        Raises:
+            Exception: If API call fails
+        """
+        cache_key = self._response_cache_key(
+            prompt, model, max_tokens, temperature, cache_response,
+            response_mime_type, top_p, stop_sequences, cached_content
+        )
+        if cache_key is not None:
+            cached_text = self.response_cache.get(cache_key)
+            if cached_text is not None:
+                return cached_text
+        
+        async def attempt(attempt_timeout: float) -> str:
+            response = await self.client.aio.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=self._generation_config(
+                    max_tokens, temperature, response_mime_type, top_p, stop_sequences, cached_content,
+                    attempt_timeout
+                )
+            )
+            
+            return self._response_text(response)
+        
+        text = await self._with_retries_async(attempt, timeout)
+        
+        if cache_key is not None:
+            self.response_cache.set(cache_key, text)
+        return text
+    
+    async def aclose(self) -> None:
+        """Close the pooled sync and async connections"""
+        self.client.close()
+        await self.client.aio.aclose()
     
     def check_availability(self) -> bool:
         """
@@ -111,6 +652,52 @@ class GeminiClient:
             return bool(response.text)
         except Exception:
             return False
+    
+    async def check_availability_async(self) -> bool:
+        """
+        Check if Gemini API is accessible without blocking the event loop
+        
+        Returns:
+            True if API is available, False otherwise
+        """
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents="test"
+            )
+            return bool(response.text)
+        except Exception:
+            return False
+
+
+def _error_details(error: errors.APIError) -> List[dict]:
+    """Get the structured details listed in an API error's body"""
+    try:
+        return [detail for detail in error.details['error']['details'] if isinstance(detail, dict)]
+    except (KeyError, TypeError):
+        return []
+
+
+def _error_reasons(error: errors.APIError) -> set:
+    """Get the machine-readable reasons listed in an API error's details"""
+    return {detail.get('reason') for detail in _error_details(error)}
+
+
+def _retry_after(error: errors.APIError) -> Optional[float]:
+    """Get the delay in seconds a response asked for, from Retry-After or a RetryInfo detail"""
+    headers = getattr(error.response, 'headers', None)
+    value = headers.get('retry-after') if headers is not None else None
+    
+    if value is None:
+        for detail in _error_details(error):
+            if str(detail.get('@type', '')).endswith('RetryInfo'):
+                value = str(detail.get('retryDelay', '')).rstrip('s')
+    
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        # Retry-After can also be an HTTP date, which Gemini doesn't send
+        return None
 
 
 # Global client instance
@@ -127,7 +714,9 @@ def generate_text(
     max_tokens: int = 500,
     temperature: float = 0.7,
     timeout: int = 90,
-    response_mime_type: Optional[str] = None
+    response_mime_type: Optional[str] = None,
+    top_p: Optional[float] = None,
+    stop_sequences: Optional[List[str]] = None
 ) -> str:
     """
     Convenience function to generate text using the Gemini client
@@ -139,6 +728,8 @@ def generate_text(
         temperature: Sampling temperature
         timeout: Request timeout
         response_mime_type: Optional MIME type for response (e.g., 'application/json')
+        top_p: Optional nucleus sampling cutoff (0-1)
+        stop_sequences: Optional sequences that end generation early
         
     Returns:
         Generated text
@@ -149,7 +740,104 @@ def generate_text(
     if gemini_client is None:
         raise Exception("Gemini client is not initialized")
     
-    return gemini_client.generate(prompt, model, max_tokens, temperature, timeout, response_mime_type)
+    return gemini_client.generate(prompt, model, max_tokens, temperature, timeout, response_mime_type, top_p, stop_sequences)
+
+
+async def generate_text_async(
+    prompt: str,
+    model: str = GEMINI_MODEL,
+    max_tokens: int = 500,
+    temperature: float = 0.7,
+    timeout: int = 90,
+    response_mime_type: Optional[str] = None,
+    top_p: Optional[float] = None,
+    stop_sequences: Optional[List[str]] = None
+) -> str:
+    """
+    Async convenience function to generate text without blocking the event loop
+    
+    Args:
+        prompt: The prompt to send
+        model: Model to use
+        max_tokens: Maximum tokens to generate
+        temperature: Sampling temperature
+        timeout: Request timeout
+        response_mime_type: Optional MIME type for response (e.g., 'application/json')
+        top_p: Optional nucleus sampling cutoff (0-1)
+        stop_sequences: Optional sequences that end generation early
+        
+    Returns:
+        Generated text
+        
+    Raises:
+        Exception: If client is not initialized or generation fails
+    """
+    if gemini_client is None:
+        raise Exception("Gemini client is not initialized")
+    
+    return await gemini_client.generate_async(
+        prompt=prompt,
+        model=model,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        timeout=timeout,
+        response_mime_type=response_mime_type,
+        top_p=top_p,
+        stop_sequences=stop_sequences
+    )
+
+
+def submit_batch(
+    prompts: List[str],
+    model: str = GEMINI_MODEL,
+    max_tokens: int = 500,
+    temperature: float = 0.7,
+    display_name: Optional[str] = None
+) -> str:
+    """
+    Convenience function to submit a Gemini Batch API job
+    
+    Args:
+        prompts: Prompts to generate responses for
+        model: Model to use
+        max_tokens: Maximum tokens to generate per prompt
+        temperature: Sampling temperature
+        display_name: Optional human-readable job name
+        
+    Returns:
+        Batch job name
+        
+    Raises:
+        Exception: If client is not initialized or submission fails
+    """
+    if gemini_client is None:
+        raise Exception("Gemini client is not initialized")
+    
+    return gemini_client.submit_batch(prompts, model, max_tokens, temperature, display_name)
+
+
+def get_batch_status(job_name: str) -> str:
+    """Get the state of a Gemini batch job"""
+    if gemini_client is None:
+        raise Exception("Gemini client is not initialized")
+    
+    return gemini_client.get_batch_status(job_name)
+
+
+def retrieve_batch_results(job_name: str, count: int) -> List[Optional[str]]:
+    """Retrieve the count generated texts of a finished Gemini batch job"""
+    if gemini_client is None:
+        raise Exception("Gemini client is not initialized")
+    
+    return gemini_client.retrieve_batch_results(job_name, count)
+
+
+async def embed_texts_async(texts: List[str], model: str = GEMINI_EMBEDDING_MODEL) -> List[List[float]]:
+    """Embed texts with Gemini, partitioned to the per-request limit"""
+    if gemini_client is None:
+        raise Exception("Gemini client is not initialized")
+    
+    return await gemini_client.embed_async(texts, model)
 
 
 def check_ai_available() -> bool:
@@ -157,3 +845,16 @@ def check_ai_available() -> bool:
     if gemini_client is None:
         return False
     return gemini_client.check_availability()
+
+
+async def close_gemini_client() -> None:
+    """Close the global client's pooled connections on shutdown"""
+    if gemini_client is not None:
+        await gemini_client.aclose()
+
+
+async def check_ai_available_async() -> bool:
+    """Check if Gemini API is available, awaiting the async client"""
+    if gemini_client is None:
+        return False
+    return await gemini_client.check_availability_async()
@@ -5,7 +5,7 @@ Uses Gemini AI to fix grammar errors and improve ATS-friendly phrasing
 
 import json
 from typing import Dict, Any, List
-from .gemini_client import generate_text, GEMINI_MODEL
+from .gemini_client import generate_text_async, GEMINI_MODEL
 from .cache_manager import cache_manager, generate_cache_key
 
 
@@ -32,7 +32,7 @@ async def fix_grammar_and_ats(resume: Dict[str, Any]) -> Dict[str, Any]:
     prompt = build_grammar_prompt(resume)
     
     # Use lower temperature (0.3) for consistent grammar fixes
-    response = generate_text(
+    response = await generate_text_async(
         prompt=prompt,
         model=GEMINI_MODEL,
         max_tokens=2000,
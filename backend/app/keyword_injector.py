@@ -5,7 +5,7 @@ Uses Gemini AI to intelligently inject missing keywords into resume content
 
 import json
 from typing import Dict, Any, List, Set
-from .gemini_client import generate_text, GEMINI_MODEL
+from .gemini_client import generate_text_async, GEMINI_MODEL
 
 
 async def inject_keywords_intelligently(
@@ -48,7 +48,7 @@ async def inject_keywords_intelligently(
     prompt = build_keyword_injection_prompt(resume, keyword_placements, job_description)
     
     # Use Gemini API with moderate temperature for natural integration
-    response = generate_text(
+    response = await generate_text_async(
         prompt=prompt,
         model=GEMINI_MODEL,
         max_tokens=2000,
@@ -108,6 +108,30 @@ def extract_missing_keywords(recommendations: List[Dict[str, Any]]) -> List[str]
     return [k for k in keywords if k]
 
 
+def plan_keyword_placements(
+    resume: Dict[str, Any],
+    recommendations: List[Dict[str, Any]],
+    job_description: str
+) -> Dict[str, List[str]]:
+    """
+    Determine which sections keyword injection would change, without calling the AI
+    
+    Args:
+        resume: Resume data dictionary
+        recommendations: List of smart recommendations
+        job_description: Target job description
+        
+    Returns:
+        Dictionary mapping section names to lists of keywords (empty if none)
+    """
+    missing_keywords = extract_missing_keywords(recommendations)
+    
+    if not missing_keywords:
+        return {}
+    
+    return determine_keyword_placements(missing_keywords, resume, job_description)
+
+
 def determine_keyword_placements(
     keywords: List[str],
     resume: Dict[str, Any],
@@ -431,6 +455,34 @@ def merge_missing_fields(keyword_injected: Dict[str, Any], original: Dict[str, A
     return result
 
 
+def merge_injected_skills(resume: Dict[str, Any], keywords: List[str]) -> Dict[str, Any]:
+    """
+    Add planned skills keywords to another version of a resume
+    
+    Used when keyword injection only targets the skills section, so the
+    keywords can be appended to the grammar-fixed skills list rather than
+    replacing it with a list that missed the grammar fixes.
+    
+    Args:
+        resume: Resume data to update (e.g. grammar-fixed)
+        keywords: Keywords planned for the skills section
+        
+    Returns:
+        Copy of resume with keywords it doesn't already list appended to its skills
+    """
+    result = resume.copy()
+    skills = list(result.get('skills') or [])
+    existing = {skill.lower() for skill in skills if isinstance(skill, str)}
+    
+    for keyword in keywords:
+        if keyword.lower() not in existing:
+            skills.append(keyword)
+            existing.add(keyword.lower())
+    
+    result['skills'] = skills
+    return result
+
+
 def validate_keyword_integration(
     keyword_injected: Dict[str, Any],
     original: Dict[str, Any],
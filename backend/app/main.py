@@ -1,7 +1,14 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api import router as api_router
 from .config import validate_config, get_config
+from .embedding_service import warm_up_embedding_model
+from .ai_insights import shutdown_rule_based_pool
+from .template_engine import shutdown_pdf_pool
+from .batch_processor import get_shared_executor, shutdown_shared_executor
+from .gemini_client import close_gemini_client
+from .rate_limiter import load_sliding_window_script
 
 # Validate configuration on startup
 validate_config()
@@ -23,11 +30,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Shape of binary /embeddings responses
+    expose_headers=["X-Embedding-Count", "X-Embedding-Dimension", "X-Embedding-Dtype", "X-Embedding-Model"],
 )
 
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def use_shared_thread_pool():
+    # Run asyncio.to_thread work on the same threads as the batch processors
+    asyncio.get_running_loop().set_default_executor(get_shared_executor())
+
+@app.on_event("startup")
+async def load_embedding_model():
+    # Load the embedding model once so the first /embeddings request doesn't pay for it
+    if warm_up_embedding_model():
+        print("✓ Embedding model loaded")
+
+@app.on_event("startup")
+async def load_rate_limit_script():
+    # Preload the Redis rate limit script so each check is a single EVALSHA
+    if await load_sliding_window_script():
+        print("✓ Redis rate limiting enabled")
+
+@app.on_event("shutdown")
+async def stop_worker_pools():
+    shutdown_rule_based_pool()
+    shutdown_pdf_pool()
+    shutdown_shared_executor()
+
+@app.on_event("shutdown")
+async def close_gemini_connections():
+    # Close the keep-alive connection pools shared by all Gemini calls
+    await close_gemini_client()
+
 @app.get("/")
 async def root():
     return {
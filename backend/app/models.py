@@ -11,6 +11,8 @@ class ParseRequest(BaseModel):
 class EmbedRequest(BaseModel):
     """Request model for generating embeddings"""
     texts: List[str] = Field(..., min_items=1, max_items=100)
+    # "base64" returns each embedding as base64-encoded little-endian float16 bytes
+    encoding: Literal["float", "base64"] = "float"
 
 
 class ScoreRequest(BaseModel):
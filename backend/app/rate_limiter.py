@@ -6,13 +6,49 @@ Prevents API abuse by limiting requests per IP address
 from fastapi import HTTPException, Request
 from functools import wraps
 import time
+import uuid
 from collections import defaultdict, deque
-from typing import Dict, Deque
+from typing import Dict, Deque, Optional, Tuple, Any
+from .config import get_config
 
-# In-memory storage for rate limiting
-# In production, use Redis for distributed rate limiting
+# Redis connection URL; when set, limits are shared across all workers
+REDIS_URL = get_config().redis_url
+
+# Seconds to wait when connecting to or reading from Redis. A host that
+# drops packets fails this fast and falls back to the in-memory window
+# instead of holding every request for the TCP timeout
+REDIS_SOCKET_TIMEOUT = 0.2
+
+# Prefix for per-IP sorted sets in Redis
+RATE_LIMIT_KEY_PREFIX = 'ratelimit:'
+
+# Atomically trim the window, check the count and record the request.
+# Returns {allowed, oldest_timestamp_ms}.
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+
+if redis.call('ZCARD', key) >= limit then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    return {0, tonumber(oldest[2])}
+end
+
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, window)
+return {1, 0}
+"""
+
+# In-memory fallback used when Redis is not configured or unreachable
 request_history: Dict[str, Deque[float]] = defaultdict(deque)
 
+# Created lazily on first use
+_redis_client: Optional[Any] = None
+_sliding_window: Optional[Any] = None
+
 
 def get_client_ip(request: Request) -> str:
     """
@@ -38,10 +74,125 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
+def get_sliding_window() -> Optional[Any]:
+    """
+    Get the Redis sliding-window script, connecting on first use
+    
+    Returns:
+        Registered Lua script, or None if Redis is not configured
+    """
+    global _redis_client, _sliding_window
+    
+    if not REDIS_URL:
+        return None
+    
+    if _sliding_window is None:
+        import redis.asyncio as redis
+        
+        _redis_client = redis.Redis.from_url(
+            REDIS_URL,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT
+        )
+        _sliding_window = _redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+    
+    return _sliding_window
+
+
+async def load_sliding_window_script() -> bool:
+    """
+    Load the sliding-window script into Redis ahead of the first request
+    
+    Later checks then run with a single EVALSHA round trip.
+    
+    Returns:
+        True if the script was loaded, False if Redis is not configured or unreachable
+    """
+    if get_sliding_window() is None:
+        return False
+    
+    try:
+        await _redis_client.script_load(SLIDING_WINDOW_SCRIPT)
+        return True
+    except Exception as e:
+        print(f"⚠ Warning: Failed to load rate limit script into Redis: {e}")
+        return False
+
+
+async def check_redis_limit(
+    script: Any,
+    bucket: str,
+    max_requests: int,
+    window_seconds: int
+) -> Tuple[bool, int]:
+    """
+    Check and record a request against the shared Redis window
+    
+    Args:
+        script: Registered sliding-window Lua script
+        bucket: Rate limit bucket (client IP and endpoint)
+        max_requests: Maximum number of requests allowed
+        window_seconds: Time window in seconds
+        
+    Returns:
+        Tuple of (allowed, retry_after_seconds)
+    """
+    now_ms = int(time.time() * 1000)
+    window_ms = window_seconds * 1000
+    
+    allowed, oldest_ms = await script(
+        keys=[f"{RATE_LIMIT_KEY_PREFIX}{bucket}"],
+        args=[now_ms, window_ms, max_requests, f"{now_ms}-{uuid.uuid4().hex}"]
+    )
+    
+    if allowed:
+        return True, 0
+    
+    retry_after = int((window_ms - (now_ms - int(oldest_ms))) / 1000) + 1
+    return False, retry_after
+
+
+def check_local_limit(bucket: str, max_requests: int, window_seconds: int) -> Tuple[bool, int]:
+    """
+    Check and record a request against this process's in-memory window
+    
+    Args:
+        bucket: Rate limit bucket (client IP and endpoint)
+        max_requests: Maximum number of requests allowed
+        window_seconds: Time window in seconds
+        
+    Returns:
+        Tuple of (allowed, retry_after_seconds)
+    """
+    current_time = time.time()
+    
+    # Get request history for this bucket
+    history = request_history[bucket]
+    
+    # Remove requests outside the time window
+    while history and history[0] < current_time - window_seconds:
+        history.popleft()
+    
+    # Check if rate limit exceeded
+    if len(history) >= max_requests:
+        # Calculate retry-after time
+        oldest_request = history[0]
+        retry_after = int(window_seconds - (current_time - oldest_request)) + 1
+        return False, retry_after
+    
+    # Add current request to history
+    history.append(current_time)
+    return True, 0
+
+
 def rate_limit(max_requests: int = 10, window_seconds: int = 60):
     """
     Rate limiting decorator
     
+    Limits are tracked per client IP and endpoint. Uses a Redis sliding
+    window shared by all workers when REDIS_URL is set, otherwise a
+    per-process in-memory window.
+    
     Args:
         max_requests: Maximum number of requests allowed
         window_seconds: Time window in seconds
@@ -52,33 +203,32 @@ def rate_limit(max_requests: int = 10, window_seconds: int = 60):
             ...
     """
     def decorator(func):
+        endpoint = func.__name__
+        
         @wraps(func)
         async def wrapper(request: Request, *args, **kwargs):
-            client_ip = get_client_ip(request)
-            current_time = time.time()
-            
-            # Get request history for this IP
-            history = request_history[client_ip]
+            bucket = f"{get_client_ip(request)}:{endpoint}"
+            script = get_sliding_window()
             
-            # Remove requests outside the time window
-            while history and history[0] < current_time - window_seconds:
-                history.popleft()
+            if script is not None:
+                try:
+                    allowed, retry_after = await check_redis_limit(
+                        script, bucket, max_requests, window_seconds
+                    )
+                except Exception as e:
+                    # Connection errors and timeouts alike
+                    print(f"⚠ Redis rate limit check failed, using in-memory limit: {e}")
+                    allowed, retry_after = check_local_limit(bucket, max_requests, window_seconds)
+            else:
+                allowed, retry_after = check_local_limit(bucket, max_requests, window_seconds)
             
-            # Check if rate limit exceeded
-            if len(history) >= max_requests:
-                # Calculate retry-after time
-                oldest_request = history[0]
-                retry_after = int(window_seconds - (current_time - oldest_request)) + 1
-                
+            if not allowed:
                 raise HTTPException(
                     status_code=429,
                     detail=f"Rate limit exceeded. Try again in {retry_after} seconds.",
                     headers={"Retry-After": str(retry_after)}
                 )
             
-            # Add current request to history
-            history.append(current_time)
-            
             # Call the actual endpoint
             return await func(request, *args, **kwargs)
         
@@ -88,7 +238,7 @@ def rate_limit(max_requests: int = 10, window_seconds: int = 60):
 
 def cleanup_old_entries(max_age_seconds: int = 3600):
     """
-    Clean up old entries from request history
+    Clean up old entries from the in-memory request history
     Should be called periodically (e.g., every hour)
     
     Args:
@@ -97,19 +247,19 @@ def cleanup_old_entries(max_age_seconds: int = 3600):
     current_time = time.time()
     cutoff_time = current_time - max_age_seconds
     
-    # Remove IPs with no recent requests
-    ips_to_remove = []
-    for ip, history in request_history.items():
+    # Remove buckets with no recent requests
+    buckets_to_remove = []
+    for bucket, history in request_history.items():
         # Remove old requests
         while history and history[0] < cutoff_time:
             history.popleft()
         
-        # Mark IP for removal if no recent requests
+        # Mark bucket for removal if no recent requests
         if not history:
-            ips_to_remove.append(ip)
+            buckets_to_remove.append(bucket)
     
-    # Remove empty IP entries
-    for ip in ips_to_remove:
-        del request_history[ip]
+    # Remove empty bucket entries
+    for bucket in buckets_to_remove:
+        del request_history[bucket]
     
-    return len(ips_to_remove)
+    return len(buckets_to_remove)
@@ -5,7 +5,7 @@ Uses Gemini AI to optimize resume content based on ATS issues and recommendation
 
 import json
 from typing import List, Dict, Any
-from .gemini_client import generate_text, GEMINI_MODEL
+from .gemini_client import generate_text_async, GEMINI_MODEL
 from .cache_manager import cache_manager, generate_cache_key
 
 
@@ -34,7 +34,7 @@ async def optimize_resume_content(
     prompt = build_optimization_prompt(resume, issues, recommendations, job_description)
     
     # Call Gemini API with appropriate settings and JSON mode
-    response = generate_text(
+    response = await generate_text_async(
         prompt=prompt,
         model=GEMINI_MODEL,
         max_tokens=2000,
@@ -0,0 +1,233 @@
+"""
+Rule-Based Insights
+Strengths, gaps and recommendations derived from keyword matches and scores
+alone, used when the AI service is unavailable or a section's generation fails.
+
+Kept free of Gemini and embedding imports so worker processes can import it
+cheaply.
+"""
+
+import re
+from typing import List, Dict, Any
+
+# Matches any digit; used to spot quantified achievements
+DIGIT_PATTERN = re.compile(r'\d')
+
+# Words that are never worth suggesting as missing keywords
+KEYWORD_STOPWORDS = frozenset({
+    'with', 'and', 'the', 'for', 'from', 'that', 'this', 'work', 'using',
+    'experience', 'including', 'turing', 'memory'
+})
+
+# Role keywords in a job description, tagged by role type
+ROLE_TYPE_PATTERN = re.compile(
+    r'(?P<technical>developer|engineer|programmer|software|technical)'
+    r'|(?P<management>manager|lead|director|supervisor)',
+    re.IGNORECASE
+)
+
+
+def keyword_strings(keywords: List[Any]) -> List[str]:
+    """Normalize keyword entries ({'keyword': ...} dicts or plain values) to strings"""
+    return [kw.get('keyword', '') if type(kw) is dict else str(kw) for kw in keywords]
+
+
+def rule_based_strengths(matched_keywords: List[str], scores: Dict) -> List[str]:
+    """Rule-based strengths from matched keywords and scores"""
+    
+    strengths = []
+    
+    if len(matched_keywords) >= 5:
+        top_skills = matched_keywords[:3]
+        strengths.append(f"Strong match in key areas: {', '.join(top_skills)}")
+    
+    keyword_score = scores.get('keyword', 0)
+    if keyword_score > 70:
+        strengths.append(f"Excellent keyword alignment ({keyword_score}% match with job requirements)")
+    elif keyword_score > 50:
+        strengths.append(f"Good keyword coverage ({keyword_score}% match with job requirements)")
+    
+    format_score = scores.get('format', 0)
+    if format_score > 80:
+        strengths.append("Well-structured, ATS-optimized resume format")
+    
+    return strengths[:5] if strengths else ["Relevant experience for the role"]
+
+
+def rule_based_gaps(missing_keywords: List[str], scores: Dict) -> List[str]:
+    """Rule-based gaps from missing keywords and scores"""
+    
+    gaps = []
+    
+    if missing_keywords:
+        top_missing = missing_keywords[:5]
+        meaningful_missing = [kw for kw in top_missing if len(kw) > 3 and kw.lower() not in KEYWORD_STOPWORDS]
+        if meaningful_missing:
+            gaps.append(f"Missing key skills: {', '.join(meaningful_missing)}")
+    
+    keyword_score = scores.get('keyword', 0)
+    if keyword_score < 50:
+        gaps.append("Resume lacks many keywords from the job description")
+    
+    return gaps[:5] if gaps else ["Consider tailoring resume more specifically to this job description"]
+
+
+def rule_based_recommendations(
+    resume_text: str,
+    job_description: str,
+    keyword_analysis: Dict,
+    scores: Dict
+) -> List[Dict[str, Any]]:
+    """Rule-based recommendations from keywords, scores and the resume/job text"""
+    
+    recommendations = []
+    rec_id = 1
+    
+    try:
+        missing_keywords = keyword_strings(keyword_analysis.get('missing_keywords', [])[:10])
+    except Exception as e:
+        print(f"Error getting missing keywords: {e}")
+        missing_keywords = []
+    
+    # Recommendation 1: Add missing keywords (filtered)
+    if missing_keywords:
+        meaningful_missing = [kw for kw in missing_keywords if len(kw) > 3 and kw.lower() not in KEYWORD_STOPWORDS]
+        
+        if meaningful_missing:
+            recommendations.append({
+                "id": f"rec-{rec_id}",
+                "type": "keyword",
+                "priority": "high",
+                "suggestedText": f"Add these important keywords to your resume: {', '.join(meaningful_missing[:5])}",
+                "explanation": "These keywords appear frequently in the job description but are missing from your resume.",
+                "impact": 20,
+                "applied": False
+            })
+            rec_id += 1
+    
+    # Recommendation 2: Improve semantic alignment
+    semantic_score = scores.get('semantic', 0)
+    if semantic_score < 70:
+        recommendations.append({
+            "id": f"rec-{rec_id}",
+            "type": "content",
+            "priority": "high",
+            "suggestedText": "Rephrase your experience using terminology from the job description",
+            "explanation": "Your resume uses different language than the job posting. Mirror the job description's phrasing to improve relevance.",
+            "impact": 15,
+            "applied": False
+        })
+        rec_id += 1
+    
+    # Recommendation 3: Add quantifiable achievements (context-aware)
+    has_numbers = DIGIT_PATTERN.search(resume_text, 0, 1000) is not None
+    if not has_numbers or resume_text.count('%') < 2:
+        # Detect role type from job description
+        role_types = {match.lastgroup for match in ROLE_TYPE_PATTERN.finditer(job_description)}
+        
+        if 'technical' in role_types:
+            example = "e.g., 'Reduced API response time by 40%', 'Improved code coverage to 85%', 'Optimized database queries reducing load time by 50%'"
+        elif 'management' in role_types:
+            example = "e.g., 'Led team of 8 engineers', 'Increased team velocity by 35%', 'Reduced sprint cycle time by 2 days'"
+        else:
+            example = "e.g., 'Improved process efficiency by 30%', 'Reduced costs by $50K annually', 'Managed portfolio of 15+ projects'"
+        
+        recommendations.append({
+            "id": f"rec-{rec_id}",
+            "type": "content",
+            "priority": "medium",
+            "suggestedText": f"Add quantifiable metrics to your achievements {example}",
+            "explanation": "Numbers and metrics make your accomplishments more concrete and measurable.",
+            "impact": 12,
+            "applied": False
+        })
+        rec_id += 1
+    
+    # Recommendation 4: Format improvements
+    format_score = scores.get('format', 0)
+    if format_score < 80:
+        recommendations.append({
+            "id": f"rec-{rec_id}",
+            "type": "format",
+            "priority": "medium",
+            "suggestedText": "Improve resume formatting for better ATS compatibility",
+            "explanation": "Use standard section headers (Experience, Education, Skills), avoid tables/columns, and use simple formatting.",
+            "impact": 10,
+            "applied": False
+        })
+        rec_id += 1
+    
+    # Recommendation 5: Tailor experience descriptions
+    if len(missing_keywords) > 5:
+        recommendations.append({
+            "id": f"rec-{rec_id}",
+            "type": "content",
+            "priority": "medium",
+            "suggestedText": "Tailor your experience bullet points to highlight skills mentioned in the job description",
+            "explanation": "Review each bullet point and add relevant keywords where they naturally fit your actual experience.",
+            "impact": 15,
+            "applied": False
+        })
+        rec_id += 1
+    
+    return recommendations[:5]
+
+
+def generate_offline_insights(
+    resume_text: str,
+    job_description: str,
+    keyword_analysis: Dict,
+    scores: Dict
+) -> Dict[str, Any]:
+    """
+    Generate insights from rules only, matching the AI path's fallback output
+    
+    Synchronous and picklable so it can run in a worker process.
+    
+    Returns:
+        Dictionary with strengths, gaps, and recommendations
+    """
+    matched_keywords = keyword_strings(keyword_analysis.get('matched_keywords', [])[:10])
+    missing_keywords = keyword_strings(keyword_analysis.get('missing_keywords', [])[:15])
+    
+    return {
+        "strengths": rule_based_strengths(matched_keywords, scores),
+        "gaps": rule_based_gaps(missing_keywords, scores),
+        "recommendations": rule_based_recommendations(resume_text, job_description, keyword_analysis, scores)
+    }
+
+
+def generate_rule_based_insights(
+    resume_text: str,
+    job_description: str,
+    keyword_analysis: Dict,
+    scores: Dict
+) -> Dict[str, Any]:
+    """Fallback rule-based insights when AI is not available"""
+    
+    matched_keywords = keyword_analysis.get('matched_keywords', [])
+    missing_keywords = keyword_analysis.get('missing_keywords', [])
+    
+    strengths = []
+    gaps = []
+    
+    # Analyze strengths
+    if len(matched_keywords) > 10:
+        strengths.append(f"Strong keyword match with {len(matched_keywords)} relevant skills")
+    
+    if scores.get('format', 0) > 80:
+        strengths.append("Well-formatted, ATS-friendly resume")
+    
+    # Analyze gaps
+    if missing_keywords:
+        top_missing = keyword_strings(missing_keywords[:5])
+        gaps.append(f"Missing key skills: {', '.join(top_missing)}")
+    
+    if scores.get('semantic', 0) < 60:
+        gaps.append("Resume language doesn't closely match job description terminology")
+    
+    return {
+        "strengths": strengths[:5],
+        "gaps": gaps[:5],
+        "recommendations": []
+    }
@@ -3,12 +3,21 @@ Template Engine for Resume PDF Generation
 Manages resume templates and renders them to HTML for PDF generation
 """
 
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Dict, Any, Optional
 from jinja2 import Environment, FileSystemLoader, Template
 from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
 from io import BytesIO
-from .cache_manager import cache_template, cache_pdf, generate_cache_key
+from .cache_manager import cache_manager, cache_template, cache_pdf, generate_cache_key
+
+# Worker processes for PDF rendering, created on first use
+_pdf_pool: Optional[ProcessPoolExecutor] = None
 
 
 class TemplateEngine:
@@ -37,6 +46,11 @@ class TemplateEngine:
         
         # Load available templates
         self.templates = self._load_templates()
+        
+        # Parsed stylesheets per template, sharing one font configuration so
+        # @font-face rules are loaded once rather than on every PDF
+        self.font_config = FontConfiguration()
+        self.stylesheets: Dict[str, CSS] = {}
     
     def get_template(self, template_id: str) -> Dict[str, Any]:
         """
@@ -118,6 +132,27 @@ class TemplateEngine:
         template_info = self.get_template(template_id)
         return template_info['css']
     
+    def get_stylesheet(self, template_id: str) -> CSS:
+        """
+        Get the parsed WeasyPrint stylesheet for a template, parsing it on first use
+        
+        Args:
+            template_id: Template identifier
+            
+        Returns:
+            WeasyPrint CSS object
+            
+        Raises:
+            ValueError: If template not found
+        """
+        stylesheet = self.stylesheets.get(template_id)
+        
+        if stylesheet is None:
+            stylesheet = CSS(string=self.get_css(template_id), font_config=self.font_config)
+            self.stylesheets[template_id] = stylesheet
+        
+        return stylesheet
+    
     def list_templates(self) -> Dict[str, str]:
         """
         List available templates
@@ -164,9 +199,31 @@ class TemplateEngine:
         if cached_pdf is not None:
             return cached_pdf
         
+        pdf_bytes = self.render_pdf(template_id, resume_data)
+        
+        # Cache the result
+        cache_manager.get_pdf_cache().set(cache_key, pdf_bytes)
+        
+        return pdf_bytes
+    
+    def render_pdf(self, template_id: str, resume_data: Dict[str, Any]) -> bytes:
+        """
+        Render resume data to PDF with WeasyPrint, bypassing the PDF cache
+        
+        Args:
+            template_id: Template identifier
+            resume_data: Resume data dictionary
+            
+        Returns:
+            PDF file as bytes
+            
+        Raises:
+            ValueError: If template not found
+            Exception: If PDF generation fails
+        """
         # Render HTML (this will use template cache)
         html_content = self.render(template_id, resume_data)
-        css_content = self.get_css(template_id)
+        css = self.get_stylesheet(template_id)
         
         # Configure WeasyPrint settings for ATS compatibility
         # - No tables (templates already avoid tables)
@@ -178,12 +235,10 @@ class TemplateEngine:
             # Create HTML object
             html = HTML(string=html_content)
             
-            # Create CSS object
-            css = CSS(string=css_content)
-            
             # Generate PDF with proper settings
             pdf_bytes = html.write_pdf(
                 stylesheets=[css],
+                font_config=self.font_config,
                 # Optimize for text extraction (ATS compatibility)
                 optimize_size=('fonts',),
                 # Enable proper text rendering
@@ -192,9 +247,6 @@ class TemplateEngine:
                 pdf_forms=False
             )
             
-            # Cache the result
-            cache_manager.get_pdf_cache().set(cache_key, pdf_bytes)
-            
             return pdf_bytes
             
         except Exception as e:
@@ -433,3 +485,85 @@ li {
 
 # Global template engine instance
 template_engine = TemplateEngine()
+
+
+async def generate_pdf_async(
+    template_id: str,
+    resume_data: Dict[str, Any],
+    options: Optional[Dict[str, Any]] = None
+) -> bytes:
+    """
+    Generate PDF without blocking the event loop (with caching)
+    
+    WeasyPrint layout is CPU-bound and holds the GIL, so cache misses are
+    rendered in a worker process where several PDFs can render in parallel.
+    
+    Args:
+        template_id: Template identifier
+        resume_data: Resume data dictionary
+        options: Optional PDF generation options
+        
+    Returns:
+        PDF file as bytes
+        
+    Raises:
+        ValueError: If template not found
+        Exception: If PDF generation fails
+    """
+    if options is None:
+        options = {}
+    
+    cache_key = f"pdf:{template_id}:{generate_cache_key(resume_data, options)}"
+    
+    cached_pdf = cache_manager.get_pdf_cache().get(cache_key)
+    if cached_pdf is not None:
+        return cached_pdf
+    
+    loop = asyncio.get_running_loop()
+    try:
+        pdf_bytes = await loop.run_in_executor(get_pdf_pool(), render_pdf_in_worker, template_id, resume_data)
+    except BrokenProcessPool:
+        # A worker died mid-render; start a fresh pool for the next request
+        shutdown_pdf_pool()
+        raise
+    
+    cache_manager.get_pdf_cache().set(cache_key, pdf_bytes)
+    
+    return pdf_bytes
+
+
+def render_pdf_in_worker(template_id: str, resume_data: Dict[str, Any]) -> bytes:
+    """Render a PDF with the worker process's template engine"""
+    return template_engine.render_pdf(template_id, resume_data)
+
+
+def warm_up_pdf_worker() -> None:
+    """Parse every template stylesheet so fonts are loaded before the first render"""
+    for template_id in template_engine.templates:
+        template_engine.get_stylesheet(template_id)
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Get the process pool for PDF rendering, creating it on first use"""
+    global _pdf_pool
+    
+    if _pdf_pool is None:
+        # Spawned rather than forked: by now the app runs threads (executor,
+        # HTTP pools, ONNX), and forking a threaded process can deadlock the
+        # child. Workers only need this module
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=max(2, (os.cpu_count() or 1) // 2),
+            initializer=warm_up_pdf_worker,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    
+    return _pdf_pool
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the PDF rendering worker processes"""
+    global _pdf_pool
+    
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
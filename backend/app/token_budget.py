@@ -0,0 +1,65 @@
+"""
+Token Budget
+Truncate prompt inputs by token count rather than character count
+"""
+
+from functools import lru_cache
+from typing import Optional, Any
+
+# BPE encoding used to budget prompt tokens (close enough to Gemini's tokenizer)
+TOKEN_ENCODING_NAME = 'cl100k_base'
+
+# Average characters per token, used when the tokenizer is unavailable
+FALLBACK_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def get_token_encoding() -> Optional[Any]:
+    """
+    Get the shared tiktoken encoding, loading it on first use
+    
+    Returns:
+        tiktoken Encoding, or None if tiktoken or its BPE file is unavailable
+    """
+    try:
+        import tiktoken
+        
+        return tiktoken.get_encoding(TOKEN_ENCODING_NAME)
+    except Exception as e:
+        print(f"⚠ Warning: Token encoding unavailable, budgeting by characters: {e}")
+        return None
+
+
+@lru_cache(maxsize=256)
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Truncate text to at most max_tokens tokens
+    
+    Results are cached, so the same resume or job description is only
+    tokenized once across the prompts built for a request.
+    
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget
+    
+    Returns:
+        Leading portion of text that fits in the budget
+    """
+    encoding = get_token_encoding()
+    
+    if encoding is None:
+        max_chars = max_tokens * FALLBACK_CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        
+        # Cut at the last word boundary inside the budget
+        truncated = text[:max_chars]
+        boundary = truncated.rfind(' ')
+        return truncated[:boundary] if boundary > 0 else truncated
+    
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    
+    # A cut inside a multi-byte character decodes to a replacement character
+    return encoding.decode(tokens[:max_tokens]).rstrip('�')
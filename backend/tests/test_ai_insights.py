@@ -0,0 +1,250 @@
+"""
+Unit tests for AI insights generation
+Tests call ordering, concurrency, and rule-based fallbacks
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock, patch
+from app import ai_insights
+from app.ai_insights import generate_ai_insights
+from app.cache_manager import SemanticCache
+from app.gemini_client import GeminiUnavailableError
+
+
+SAMPLE_KEYWORDS = {
+    'matched_keywords': [{'keyword': 'python'}, {'keyword': 'fastapi'}],
+    'missing_keywords': [{'keyword': 'kubernetes'}, {'keyword': 'terraform'}]
+}
+SAMPLE_SCORES = {'keyword': 55, 'semantic': 60, 'format': 85}
+
+
+def fake_ai_response(prompt: str) -> str:
+    """Return a canned response shaped like the prompt that was sent"""
+    if 'recommendations' in prompt:
+        return "1. Add a Kubernetes deployment project to your experience section\n2. Mention Terraform usage in infrastructure work"
+    if 'gaps' in prompt:
+        return "- No evidence of Kubernetes orchestration experience\n- Terraform is not mentioned anywhere"
+    return "- Strong Python backend development background\n- Hands-on FastAPI service experience"
+
+
+class TestGenerateAIInsights:
+    """Test insights generation with mocked AI calls"""
+
+    def test_returns_all_sections(self):
+        """Test that strengths, gaps and recommendations are all returned"""
+        async def mock_call_ai(prompt, max_tokens=500):
+            return fake_ai_response(prompt)
+
+        with patch.object(ai_insights, 'AI_AVAILABLE', True), \
+             patch.object(ai_insights, 'call_ai', side_effect=mock_call_ai):
+            result = asyncio.run(generate_ai_insights(
+                "Python developer resume", "Platform engineer job", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+
+        assert len(result['strengths']) == 2
+        assert len(result['gaps']) == 2
+        assert len(result['recommendations']) == 2
+
+    def test_strengths_and_gaps_run_concurrently(self):
+        """Test that strengths and gaps are generated in parallel"""
+        async def slow_call_ai(prompt, max_tokens=500):
+            await asyncio.sleep(0.2)
+            return fake_ai_response(prompt)
+
+        with patch.object(ai_insights, 'AI_AVAILABLE', True), \
+             patch.object(ai_insights, 'call_ai', side_effect=slow_call_ai):
+            start = time.perf_counter()
+            asyncio.run(generate_ai_insights(
+                "Python developer resume", "Platform engineer job", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+            elapsed = time.perf_counter() - start
+
+        # Two stages of 0.2s each rather than three sequential calls
+        assert elapsed < 0.55
+
+    def test_recommendations_receive_generated_gaps(self):
+        """Test that recommendations are built from the generated gaps"""
+        prompts = []
+
+        async def mock_call_ai(prompt, max_tokens=500):
+            prompts.append(prompt)
+            return fake_ai_response(prompt)
+
+        with patch.object(ai_insights, 'AI_AVAILABLE', True), \
+             patch.object(ai_insights, 'call_ai', side_effect=mock_call_ai):
+            asyncio.run(generate_ai_insights(
+                "Python developer resume", "Platform engineer job", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+
+        assert 'No evidence of Kubernetes orchestration experience' in prompts[-1]
+
+    def test_rule_based_fallback_when_ai_unavailable(self):
+        """Test rule-based output when the AI service is unavailable"""
+        with patch.object(ai_insights, 'AI_AVAILABLE', False):
+            result = asyncio.run(generate_ai_insights(
+                "Python developer resume", "Senior software engineer", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+
+        assert result['strengths']
+        assert any('kubernetes' in gap for gap in result['gaps'])
+        assert result['recommendations'][0]['type'] == 'keyword'
+    
+    def test_parses_bullets_and_numbered_lines(self):
+        """Test that only bullet or numbered lines with enough text are kept"""
+        async def mock_call_ai(prompt, max_tokens=500):
+            if 'recommendations' in prompt:
+                return "Here you go:\n\n1. Add a Kubernetes deployment project to experience\n2. Too short\n  3. **Mention** Terraform usage in infrastructure work  \r\n"
+            return "Summary line without a bullet marker\n  - Strong Python backend development background\n• tiny\n* Hands-on FastAPI service experience"
+        
+        with patch.object(ai_insights, 'AI_AVAILABLE', True), \
+             patch.object(ai_insights, 'call_ai', side_effect=mock_call_ai):
+            result = asyncio.run(generate_ai_insights(
+                "Python developer resume", "Platform engineer job", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+        
+        assert result['strengths'] == [
+            'Strong Python backend development background',
+            'Hands-on FastAPI service experience'
+        ]
+        assert [rec['suggestedText'] for rec in result['recommendations']] == [
+            'Add a Kubernetes deployment project to experience',
+            'Mention** Terraform usage in infrastructure work'
+        ]
+        assert result['recommendations'][0]['priority'] == 'high'
+    
+    def test_markers_and_padding_not_counted_as_text(self):
+        """Test that short lines padded with spaces or extra markers are rejected"""
+        def texts(pattern, response):
+            return [match.group(2) for match in pattern.finditer(response)]
+        
+        assert texts(ai_insights.BULLET_PATTERN, '- Python, FastAPI      ') == []
+        assert texts(ai_insights.BULLET_PATTERN, '-- abcdefghijklmn') == []
+        assert texts(ai_insights.NUMBERED_PATTERN, '3. Quantify impact       ') == []
+        assert texts(ai_insights.NUMBERED_PATTERN, '1. 2. abcdefghijklmnopqrst') == []
+        assert texts(ai_insights.BULLET_PATTERN, '-- abcdefghijklmnop  ') == ['abcdefghijklmnop']
+        assert texts(ai_insights.NUMBERED_PATTERN, '1. 2. abcdefghijklmnopqrstu ') == ['abcdefghijklmnopqrstu']
+    
+    def test_quantify_example_matches_role_type(self):
+        """Test that the metrics example follows the job's role type"""
+        resume = "Handled various tasks for the team"
+        
+        with patch.object(ai_insights, 'AI_AVAILABLE', False):
+            technical = asyncio.run(generate_ai_insights(
+                resume, "Senior SOFTWARE Engineer", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+            management = asyncio.run(generate_ai_insights(
+                resume, "Team Leadership role", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+        
+        def metrics_text(result):
+            return next(rec['suggestedText'] for rec in result['recommendations']
+                        if rec['suggestedText'].startswith('Add quantifiable metrics'))
+        
+        assert 'API response time' in metrics_text(technical)
+        assert 'Led team of 8 engineers' in metrics_text(management)
+    
+    def test_prompts_share_context_prefix(self):
+        """Test that every prompt starts with the same context block"""
+        prompts = []
+        
+        async def mock_call_ai(prompt, max_tokens=500):
+            prompts.append(prompt)
+            return fake_ai_response(prompt)
+        
+        with patch.object(ai_insights, 'AI_AVAILABLE', True), \
+             patch.object(ai_insights, 'call_ai', side_effect=mock_call_ai):
+            asyncio.run(generate_ai_insights(
+                "Python developer resume", "Platform engineer job", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+        
+        context = ai_insights.build_insights_context(
+            "Python developer resume", "Platform engineer job", SAMPLE_KEYWORDS, SAMPLE_SCORES
+        )
+        assert len(prompts) == 3
+        assert all(prompt.startswith(context + "\n\n") for prompt in prompts)
+    
+    def test_plain_string_keywords_accepted(self):
+        """Test that keyword lists of plain strings work like keyword dicts"""
+        keywords = {
+            'matched_keywords': ['python', 'fastapi'],
+            'missing_keywords': ['kubernetes', 'terraform']
+        }
+        
+        with patch.object(ai_insights, 'AI_AVAILABLE', False):
+            result = ai_insights.generate_rule_based_insights(
+                "Python developer resume", "Platform engineer job", keywords, SAMPLE_SCORES
+            )
+        
+        assert result['gaps'][0] == "Missing key skills: kubernetes, terraform"
+    
+    def test_offline_insights_run_in_worker_process(self):
+        """Test that the cached entry point matches the fallback output when AI is unavailable"""
+        with patch.object(ai_insights, 'AI_AVAILABLE', False):
+            expected = asyncio.run(generate_ai_insights(
+                "Python developer resume", "Senior software engineer", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+            try:
+                result = asyncio.run(ai_insights.generate_ai_insights_cached(
+                    "Python developer resume", "Senior software engineer", SAMPLE_KEYWORDS, SAMPLE_SCORES
+                ))
+            finally:
+                ai_insights.shutdown_rule_based_pool()
+        
+        assert result == expected
+    
+    def test_worker_pool_spawns_processes(self):
+        """Test that rule-based workers are spawned rather than forked from the threaded app"""
+        try:
+            pool = ai_insights.get_rule_based_pool()
+            assert pool._mp_context.get_start_method() == 'spawn'
+        finally:
+            ai_insights.shutdown_rule_based_pool()
+
+
+class TestGenerateAIInsightsCached:
+    """Test the insights cache around AI generation"""
+    
+    def run_cached(self, cache, call_ai, embed):
+        """Run the cached entry point against a private cache"""
+        with patch.object(ai_insights, 'AI_AVAILABLE', True), \
+             patch.object(ai_insights.cache_manager, 'get_insights_cache', return_value=cache), \
+             patch.object(ai_insights, 'embed_insights_query', side_effect=embed), \
+             patch.object(ai_insights, 'call_ai', side_effect=call_ai):
+            return asyncio.run(ai_insights.generate_ai_insights_cached(
+                "Python developer resume", "Platform engineer job", SAMPLE_KEYWORDS, SAMPLE_SCORES
+            ))
+    
+    def test_exact_hit_skips_embedding(self):
+        """Test that a resubmitted resume/job pair is served without embedding it again"""
+        cache = SemanticCache[dict](max_size=4)
+        embed = Mock(return_value=None)
+        
+        async def mock_call_ai(prompt, max_tokens=500):
+            return fake_ai_response(prompt)
+        
+        first = self.run_cached(cache, mock_call_ai, embed)
+        second = self.run_cached(cache, mock_call_ai, embed)
+        
+        assert second == first
+        assert embed.call_count == 1
+    
+    def test_rule_based_fallback_not_cached(self):
+        """Test that insights with a rule-based section are regenerated on the next request"""
+        cache = SemanticCache[dict](max_size=4)
+        
+        async def failing_call_ai(prompt, max_tokens=500):
+            raise GeminiUnavailableError("Gemini API unavailable")
+        
+        async def mock_call_ai(prompt, max_tokens=500):
+            return fake_ai_response(prompt)
+        
+        fallback = self.run_cached(cache, failing_call_ai, Mock(return_value=None))
+        result = self.run_cached(cache, mock_call_ai, Mock(return_value=None))
+        
+        assert result != fallback
+        assert result['strengths'] == [
+            'Strong Python backend development background',
+            'Hands-on FastAPI service experience'
+        ]
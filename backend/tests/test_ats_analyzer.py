@@ -0,0 +1,130 @@
+"""
+Unit tests for ATS analyzer
+Tests individual detection checks and overall scoring
+"""
+
+import time
+from unittest.mock import patch
+from app import ats_analyzer
+from app.cache_manager import cache_manager
+from app.ats_analyzer import (
+    analyze_ats_compatibility,
+    detect_table_usage,
+    detect_formatting_issues,
+    detect_keyword_optimization,
+    scan_resume,
+)
+
+
+SAMPLE_RESUME = """Jane Doe
+jane@example.com | 555-123-4567
+
+Summary
+Backend engineer with 6 years of experience.
+
+Experience
+- Led migration to FastAPI, cutting latency by 40%
+- Managed a $200K cloud budget
+
+Education
+B.S. Computer Science
+
+Skills:
+- Python
+- PostgreSQL
+"""
+
+
+class TestDetectTableUsage:
+    """Test table and column detection"""
+    
+    def test_markdown_table(self):
+        """Test that pipe-delimited rows are flagged"""
+        assert detect_table_usage(scan_resume("| Skill | Years | Level |"))
+    
+    def test_column_spacing(self):
+        """Test that wide spacing within a line is flagged"""
+        assert detect_table_usage(scan_resume("Python          5 years"))
+    
+    def test_blank_lines_are_not_columns(self):
+        """Test that whitespace spanning several lines is not treated as a column"""
+        assert not detect_table_usage(scan_resume("Python\n\n\n\n\n\n\n\n\n\n\nGo"))
+
+
+class TestDetectFormattingIssues:
+    """Test date and line-break checks"""
+    
+    def test_mixed_date_formats(self):
+        """Test that more than one date format is flagged"""
+        issues = detect_formatting_issues(scan_resume("Started 01/02/2020, left 2021-03-04"))
+        
+        assert [issue.id for issue in issues] == ["ats-inconsistent-dates"]
+    
+    def test_excessive_line_breaks(self):
+        """Test that runs of blank lines are flagged"""
+        issues = detect_formatting_issues(scan_resume("Summary\n\n\n\nExperience"))
+        
+        assert [issue.id for issue in issues] == ["ats-excessive-breaks"]
+
+
+class TestDetectKeywordOptimization:
+    """Test skills section and metrics checks"""
+    
+    def test_well_formed_resume(self):
+        """Test that a bulleted skills list with metrics raises no issues"""
+        assert detect_keyword_optimization(scan_resume(SAMPLE_RESUME)) == []
+    
+    def test_missing_metrics(self):
+        """Test that a resume without numbers is flagged"""
+        text = SAMPLE_RESUME.replace("40%", "a lot").replace("$200K", "large")
+        issues = detect_keyword_optimization(scan_resume(text))
+        
+        assert "ats-quantifiable-achievements" in [issue.id for issue in issues]
+
+
+def test_scan_collects_terms_once_for_all_detectors():
+    """Test that the scan records section keywords, verbs and the skills body"""
+    scan = scan_resume(SAMPLE_RESUME)
+    
+    assert {'experience', 'education', 'skills', 'led', 'managed'} <= scan.terms
+    assert scan.skills_text.strip() == "- Python\n- PostgreSQL"
+    assert scan.has_contact
+
+
+def test_contact_only_counts_in_first_five_lines():
+    """Test that contact details below the header are not treated as contact info"""
+    header = "Jane Doe\nSummary\nExperience\nEducation\n"
+    
+    assert scan_resume(header + "555-123-4567\nSkills").has_contact
+    assert not scan_resume(header + "Skills\njane@example.com").has_contact
+    assert not scan_resume("Jane Doe").has_contact
+
+
+def test_pathological_input_scans_quickly():
+    """Test that long runs of digits, pipes or tabs do not trigger backtracking"""
+    start = time.perf_counter()
+    for text in ("1" * 50000, "|" + "x" * 50000, ("\t" + "a" * 50) * 2000):
+        scan_resume(text)
+    elapsed = time.perf_counter() - start
+    
+    assert elapsed < 0.5
+
+
+def test_analyze_ats_compatibility():
+    """Test that the full analysis returns a bounded score and serialized issues"""
+    result = analyze_ats_compatibility(SAMPLE_RESUME)
+    
+    assert 0 <= result["ats_score"] <= 100
+    assert all("severity" in issue for issue in result["issues"])
+
+
+def test_repeated_analysis_is_cached():
+    """Test that identical resume text reuses the cached analysis"""
+    cache_manager.get_general_cache().clear()
+    first = analyze_ats_compatibility(SAMPLE_RESUME)
+    
+    with patch.object(ats_analyzer, 'scan_resume') as mock_scan:
+        second = analyze_ats_compatibility(SAMPLE_RESUME)
+    
+    assert second == first
+    mock_scan.assert_not_called()
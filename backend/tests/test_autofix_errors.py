@@ -13,6 +13,7 @@ mock_weasyprint = MagicMock()
 sys.modules['weasyprint'] = mock_weasyprint
 sys.modules['weasyprint.text'] = MagicMock()
 sys.modules['weasyprint.text.ffi'] = MagicMock()
+sys.modules['weasyprint.text.fonts'] = MagicMock()
 
 from app.main import app
 
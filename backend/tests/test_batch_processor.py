@@ -0,0 +1,318 @@
+"""
+Unit tests for batch processor
+Tests coalescing of concurrent AI requests into batches
+"""
+
+import asyncio
+import json
+import pytest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from app import batch_processor
+from app.batch_processor import (
+    AsyncBatchProcessor, BatchAIProcessor, BatchProcessor, DebouncedProcessor, ParallelFixProcessor,
+    combine_fixes_for_single_ai_call
+)
+
+
+def upper_batch(requests):
+    """Process a batch by upper-casing each request's text"""
+    return [request['data']['text'].upper() for request in requests]
+
+
+class TestBatchAIProcessor:
+    """Test batching of concurrent requests"""
+    
+    def test_concurrent_requests_share_one_call(self):
+        """Test that concurrent requests are processed in one call with their own results"""
+        calls = []
+        
+        def processor(requests):
+            calls.append(len(requests))
+            return upper_batch(requests)
+        
+        async def run():
+            batcher = BatchAIProcessor(batch_delay=0.05)
+            return await asyncio.gather(*[
+                batcher.add_request('grammar_fix', {'text': text}, processor)
+                for text in ('led team', 'built api', 'cut costs')
+            ])
+        
+        assert asyncio.run(run()) == ['LED TEAM', 'BUILT API', 'CUT COSTS']
+        assert calls == [3]
+    
+    def test_batches_limited_to_batch_size(self):
+        """Test that requests beyond the batch size go into the next batch"""
+        calls = []
+        
+        def processor(requests):
+            calls.append(len(requests))
+            return upper_batch(requests)
+        
+        async def run():
+            batcher = BatchAIProcessor(batch_size=2, batch_delay=0.05)
+            return await asyncio.gather(*[
+                batcher.add_request('grammar_fix', {'text': str(i)}, processor)
+                for i in range(5)
+            ])
+        
+        assert asyncio.run(run()) == ['0', '1', '2', '3', '4']
+        assert calls == [2, 2, 1]
+    
+    def test_processor_error_reaches_every_caller(self):
+        """Test that a failed batch raises in each waiting caller"""
+        def processor(requests):
+            raise RuntimeError("AI service unavailable")
+        
+        async def run():
+            batcher = BatchAIProcessor(batch_delay=0.01)
+            return await asyncio.gather(*[
+                batcher.add_request('grammar_fix', {'text': text}, processor)
+                for text in ('a', 'b')
+            ], return_exceptions=True)
+        
+        results = asyncio.run(run())
+        
+        assert all(isinstance(result, RuntimeError) for result in results)
+    
+    def test_processor_receives_request_records(self):
+        """Test that the processor gets id, type and data for each batched request"""
+        received = []
+        
+        def processor(requests):
+            received.extend(requests)
+            return upper_batch(requests)
+        
+        async def run():
+            batcher = BatchAIProcessor(batch_delay=0.01)
+            return await asyncio.gather(*[
+                batcher.add_request('grammar_fix', {'text': text}, processor)
+                for text in ('a', 'b')
+            ])
+        
+        asyncio.run(run())
+        
+        assert received == [
+            {'id': 'grammar_fix_0', 'type': 'grammar_fix', 'data': {'text': 'a'}},
+            {'id': 'grammar_fix_1', 'type': 'grammar_fix', 'data': {'text': 'b'}}
+        ]
+    
+    def test_full_batch_flushes_without_waiting(self):
+        """Test that a full batch is processed before the batch delay expires"""
+        async def run():
+            batcher = BatchAIProcessor(batch_size=2, batch_delay=5)
+            return await asyncio.wait_for(asyncio.gather(*[
+                batcher.add_request('grammar_fix', {'text': text}, upper_batch)
+                for text in ('a', 'b')
+            ]), timeout=1)
+        
+        assert asyncio.run(run()) == ['A', 'B']
+
+
+class TestBatchProcessor:
+    """Test parallel processing of items"""
+    
+    def test_process_batch_bounds_submitted_items(self):
+        """Test that at most two items per worker are handed to the executor at once"""
+        processor = BatchProcessor(max_workers=2, executor=ThreadPoolExecutor(max_workers=2))
+        submitted = []
+        original_submit = processor.executor.submit
+        
+        def tracking_submit(*args, **kwargs):
+            submitted.append(processor.executor._work_queue.qsize())
+            return original_submit(*args, **kwargs)
+        
+        processor.executor.submit = tracking_submit
+        
+        def slow_double(item):
+            time.sleep(0.01)
+            return item * 2
+        
+        results = asyncio.run(processor.process_batch(list(range(20)), slow_double))
+        
+        assert results == [item * 2 for item in range(20)]
+        assert max(submitted) <= 4
+    
+    def test_processors_share_one_executor(self):
+        """Test that processors without their own executor use the shared pool"""
+        assert BatchProcessor().executor is batch_processor.get_shared_executor()
+        assert ParallelFixProcessor().batch_processor.executor is batch_processor.get_shared_executor()
+    
+    def test_iter_batch_yields_in_completion_order(self):
+        """Test that fast results arrive before slow ones and failures are skipped"""
+        def processor(delay):
+            if delay is None:
+                raise ValueError("bad item")
+            time.sleep(delay)
+            return delay
+        
+        async def run():
+            return [result async for result in BatchProcessor().iter_batch([0.2, None, 0.0], processor)]
+        
+        assert asyncio.run(run()) == [0.0, 0.2]
+
+
+class TestAsyncBatchProcessor:
+    """Test concurrent processing with async processors"""
+    
+    def test_items_run_concurrently_without_threads(self):
+        """Test that async items overlap, stay in order and drop failures"""
+        async def processor(item):
+            await asyncio.sleep(0.1)
+            if item == 'bad':
+                raise ValueError("bad item")
+            return item.upper()
+        
+        start = time.perf_counter()
+        results = asyncio.run(AsyncBatchProcessor(max_concurrency=10).process_batch(
+            ['a', 'bad', 'b', 'c'] * 5, processor
+        ))
+        elapsed = time.perf_counter() - start
+        
+        assert results == ['A', 'B', 'C'] * 5
+        # 20 items at 10 at a time take two rounds rather than 20 sequential sleeps
+        assert elapsed < 0.5
+
+
+class TestDebouncedProcessor:
+    """Test coalescing and stale-while-revalidate caching"""
+    
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that callers for a missing key wait on the same execution"""
+        calls = []
+        
+        def processor():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'result'
+        
+        async def run():
+            debouncer = DebouncedProcessor()
+            return await asyncio.gather(*[debouncer.process('key', processor) for _ in range(5)])
+        
+        assert asyncio.run(run()) == ['result'] * 5
+        assert len(calls) == 1
+    
+    def test_cancelled_caller_does_not_cancel_shared_execution(self):
+        """Test that other callers still get the result when one waiter is cancelled"""
+        calls = []
+        
+        def processor():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'result'
+        
+        async def run():
+            debouncer = DebouncedProcessor()
+            impatient = asyncio.create_task(debouncer.process('key', processor))
+            patient = asyncio.create_task(debouncer.process('key', processor))
+            await asyncio.sleep(0.01)
+            impatient.cancel()
+            return await patient, debouncer.pending_tasks
+        
+        result, pending_tasks = asyncio.run(run())
+        
+        assert result == 'result'
+        assert len(calls) == 1
+        assert pending_tasks == {}
+    
+    def test_stale_result_returned_while_refreshing(self):
+        """Test that an expired result is returned at once and refreshed in the background"""
+        versions = iter(['v1', 'v2'])
+        
+        async def run():
+            debouncer = DebouncedProcessor(ttl=0)
+            first = await debouncer.process('key', lambda: next(versions))
+            stale = await debouncer.process('key', lambda: next(versions))
+            await debouncer.pending_tasks['key']
+            return first, stale, debouncer.results_cache.get('key')[0]
+        
+        assert asyncio.run(run()) == ('v1', 'v1', 'v2')
+    
+    def test_results_cache_is_bounded(self):
+        """Test that the least recently used results are evicted beyond max_size"""
+        async def run():
+            debouncer = DebouncedProcessor(max_size=2)
+            for key in ('a', 'b', 'c'):
+                await debouncer.process(key, lambda: key)
+            return debouncer.results_cache
+        
+        results_cache = asyncio.run(run())
+        
+        assert results_cache.get('a') is None
+        assert results_cache.get('c')[0] == 'c'
+
+
+class TestParallelFixProcessor:
+    """Test scoping of independent fixes to resume sections"""
+    
+    def test_fixes_receive_only_their_section(self):
+        """Test that scoped fixes get a copy of their section and results replace it"""
+        resume = {
+            'summary': 'Engineer',
+            'experience': [{'title': 'Engineer', 'bullets': ['built apis']}],
+            'skills': ['Python']
+        }
+        targets = []
+        
+        async def fake_apply_fix(target, fix):
+            targets.append((fix['type'], target))
+            if fix['type'] == 'keyword':
+                return target + [fix['keyword']]
+            return target
+        
+        processor = ParallelFixProcessor()
+        processor._apply_fix = fake_apply_fix
+        with patch.object(batch_processor, 'COMBINED_FIX_THRESHOLD', 10):
+            result = asyncio.run(processor.process_fixes_parallel(resume, [
+                {'type': 'grammar'},
+                {'type': 'keyword', 'keyword': 'Docker'},
+                {'type': 'keyword', 'keyword': 'Kubernetes'}
+            ]))
+        
+        assert dict(targets)['grammar'] == resume['experience']
+        assert dict(targets)['grammar'] is not resume['experience']
+        assert result['skills'] == ['Python', 'Docker', 'Kubernetes']
+        assert result['summary'] == 'Engineer'
+        assert resume['skills'] == ['Python']
+
+    
+    def test_many_fixes_use_one_combined_call(self):
+        """Test that three or more independent fixes are applied with a single AI call"""
+        resume = {'summary': 'Engineer', 'experience': [], 'skills': ['Python']}
+        fixes = [{'type': 'grammar'}, {'type': 'keyword', 'keyword': 'Docker'}, {'type': 'keyword', 'keyword': 'Go'}]
+        
+        async def mock_generate(prompt, **kwargs):
+            return '{"experience": [], "skills": ["Python", "Docker", "Go"]}'
+        
+        with patch.object(batch_processor, 'generate_text_async', side_effect=mock_generate) as mock_call:
+            result = asyncio.run(ParallelFixProcessor().process_fixes_parallel(resume, fixes))
+        
+        assert mock_call.call_count == 1
+        assert result == {'summary': 'Engineer', 'experience': [], 'skills': ['Python', 'Docker', 'Go']}
+    
+    def test_combined_call_failure_falls_back(self):
+        """Test that fixes are applied separately when the combined call fails"""
+        resume = {'summary': 'Engineer', 'experience': [], 'skills': ['Python']}
+        fixes = [{'type': 'grammar'}, {'type': 'keyword'}, {'type': 'keyword'}]
+        
+        async def failing_generate(prompt, **kwargs):
+            raise RuntimeError("AI service unavailable")
+        
+        with patch.object(batch_processor, 'generate_text_async', side_effect=failing_generate):
+            result = asyncio.run(ParallelFixProcessor().process_fixes_parallel(resume, fixes))
+        
+        assert result == resume
+
+def test_combined_prompt_embeds_indented_json():
+    """Test that the combined prompt embeds the resume and fixes as indented JSON"""
+    resume = {'summary': 'Ingénieur backend', 'skills': ['Python']}
+    issues = [{'type': 'grammar', 'text': 'fix tense'}, {'type': 'keyword', 'keyword': 'Docker'}]
+    
+    prompt = combine_fixes_for_single_ai_call(resume, issues, [])
+    
+    assert json.dumps(resume, indent=2, ensure_ascii=False) in prompt
+    assert "GRAMMAR FIXES (1 issues):\n" + json.dumps(issues[:1], indent=2) in prompt
+    assert "RECOMMENDATIONS (0 items):\n[]" in prompt
+
@@ -0,0 +1,159 @@
+"""
+Unit tests for batch rewriter
+Tests change detection between original and rewritten bullets
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from app import batch_rewriter
+from app.cache_manager import cache_manager
+from app.batch_rewriter import identify_changes, parse_rewritten_bullets, rewrite_bullets_batch
+
+
+class TestIdentifyChanges:
+    """Test change labels for rewritten bullets"""
+    
+    def test_added_action_verb_and_metrics(self):
+        """Test that a new action verb, metrics and impact are all reported"""
+        changes = identify_changes(
+            "Worked on the billing system to make it faster",
+            "Optimized billing system latency by 40%, saving $50K yearly"
+        )
+        
+        assert changes == [
+            "Added strong action verb",
+            "Added quantifiable metrics",
+            "Emphasized results and impact"
+        ]
+    
+    def test_changed_action_verb_and_more_metrics(self):
+        """Test that a different opening verb and extra numbers are reported"""
+        changes = identify_changes(
+            "Managed 3 engineers on the payments team",
+            "Led 3 engineers shipping 12 payment features"
+        )
+        
+        assert changes[:2] == ["Improved action verb", "Added more metrics"]
+    
+    def test_unchanged_bullet_gets_default(self):
+        """Test that a bullet without detectable changes gets the default label"""
+        assert identify_changes("Built APIs", "Built APIs") == ["Enhanced clarity and professionalism"]
+
+
+class TestParseRewrittenBullets:
+    """Test extraction of rewritten bullets from AI responses"""
+    
+    def test_keeps_marked_lines_and_pads(self):
+        """Test that only long enough numbered or bulleted lines are kept, padded with originals"""
+        response = (
+            "Here are the rewrites:\n\n"
+            "1. Led migration of 12 billing services to Kubernetes  \r\n"
+            "2. Too short\n"
+            "  •\tReduced payments API latency by 35% via query tuning\n"
+        )
+        
+        bullets = parse_rewritten_bullets(response, ["one", "two", "three"])
+        
+        assert bullets == [
+            "Led migration of 12 billing services to Kubernetes",
+            "Reduced payments API latency by 35% via query tuning",
+            "three"
+        ]
+
+
+class TestRewriteBulletsBatch:
+    """Test per-bullet caching of rewrites"""
+    
+    def test_cached_bullets_skip_ai(self):
+        """Test that only bullets without a cached rewrite are sent to the AI"""
+        cache_manager.get_rewrite_cache().clear()
+        prompts = []
+        
+        async def mock_call_ai_rewriter(prompt, max_tokens=300):
+            prompts.append(prompt)
+            return "1. Led migration of billing services to Kubernetes"
+        
+        with patch.object(batch_rewriter, 'call_ai_rewriter', side_effect=mock_call_ai_rewriter):
+            asyncio.run(rewrite_bullets_batch(["Moved billing to k8s"], "Platform role"))
+            results = asyncio.run(rewrite_bullets_batch(
+                ["Moved billing to k8s", "Fixed bugs in the payments service"], "Platform role"
+            ))
+        
+        assert len(prompts) == 2
+        assert "Moved billing to k8s" not in prompts[1]
+        assert results[0].rewritten == "Led migration of billing services to Kubernetes"
+        assert results[1].original == "Fixed bugs in the payments service"
+    
+    def test_failed_rewrites_are_not_cached(self):
+        """Test that fallback results from a failed AI call are retried next time"""
+        cache_manager.get_rewrite_cache().clear()
+        
+        async def failing_call_ai_rewriter(prompt, max_tokens=300):
+            raise RuntimeError("AI service unavailable")
+        
+        with patch.object(batch_rewriter, 'call_ai_rewriter', side_effect=failing_call_ai_rewriter) as mock_call:
+            asyncio.run(rewrite_bullets_batch(["Moved billing to k8s"], "Platform role"))
+            results = asyncio.run(rewrite_bullets_batch(["Moved billing to k8s"], "Platform role"))
+        
+        assert mock_call.call_count == 2
+        assert results[0].confidence == 0.0
+    
+    def test_batches_run_concurrently_in_order(self):
+        """Test that bullet batches are rewritten in parallel and results keep input order"""
+        cache_manager.get_rewrite_cache().clear()
+        bullets = [f"Handled support ticket queue number {i}" for i in range(9)]
+        
+        async def slow_call_ai_rewriter(prompt, max_tokens=300):
+            await asyncio.sleep(0.2)
+            originals = [line.split('. ', 1)[1] for line in prompt.split('\n') if line[:1].isdigit()]
+            return '\n'.join(f"{n}. Resolved {bullet.lower()}" for n, bullet in enumerate(originals, 1))
+        
+        with patch.object(batch_rewriter, 'call_ai_rewriter', side_effect=slow_call_ai_rewriter):
+            start = time.perf_counter()
+            results = asyncio.run(rewrite_bullets_batch(bullets, "Support role"))
+            elapsed = time.perf_counter() - start
+        
+        assert [result.original for result in results] == bullets
+        assert results[4].rewritten == "Resolved handled support ticket queue number 4"
+        # Three batches of 0.2s each overlap instead of running back to back
+        assert elapsed < 0.5
+
+
+
+class TestRewriteBatchJobs:
+    """Test submitting and collecting Gemini batch rewrite jobs"""
+    
+    def test_job_kept_until_results_retrieved(self):
+        """Test that a failed results download leaves the job pollable"""
+        cache_manager.get_batch_job_cache().clear()
+        
+        with patch.object(batch_rewriter, 'submit_batch', return_value='batches/job-1'):
+            job_name = batch_rewriter.submit_rewrite_batch_job(["Moved billing to k8s"], "Platform role")
+        
+        with patch.object(batch_rewriter, 'get_batch_status', return_value='JOB_STATE_SUCCEEDED'):
+            with patch.object(batch_rewriter, 'retrieve_batch_results', side_effect=RuntimeError("download failed")):
+                with pytest.raises(RuntimeError):
+                    batch_rewriter.collect_rewrite_batch_job(job_name)
+            
+            with patch.object(batch_rewriter, 'retrieve_batch_results',
+                              return_value=["1. Led migration of billing services to Kubernetes"]):
+                results = batch_rewriter.collect_rewrite_batch_job(job_name)
+        
+        assert results[0].rewritten == "Led migration of billing services to Kubernetes"
+        with pytest.raises(KeyError):
+            batch_rewriter.collect_rewrite_batch_job(job_name)
+    
+    def test_running_job_returns_none(self):
+        """Test that polling a running job returns None without fetching results"""
+        cache_manager.get_batch_job_cache().clear()
+        
+        with patch.object(batch_rewriter, 'submit_batch', return_value='batches/job-2'):
+            job_name = batch_rewriter.submit_rewrite_batch_job(["Moved billing to k8s"], "Platform role")
+        
+        with patch.object(batch_rewriter, 'get_batch_status', return_value='JOB_STATE_RUNNING'), \
+             patch.object(batch_rewriter, 'retrieve_batch_results') as mock_retrieve:
+            assert batch_rewriter.collect_rewrite_batch_job(job_name) is None
+        
+        assert not mock_retrieve.called
@@ -0,0 +1,222 @@
+"""
+Unit tests for cache manager
+Tests LRU and semantic cache behavior
+"""
+
+import time
+import numpy as np
+from unittest.mock import patch
+from app.cache_manager import DiskStore, LRUCache, SemanticCache, ShardedLRUCache, generate_cache_key, make_cache_key
+
+
+def unit(*values) -> np.ndarray:
+    """Build a unit-length float32 vector"""
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class TestLRUCache:
+    """Test LRU cache lookups, expiry and eviction"""
+    
+    def test_evicts_least_recently_used(self):
+        """Test that reading an entry protects it from eviction"""
+        cache = LRUCache[str](max_size=2)
+        cache.set('a', 'value-a')
+        cache.set('b', 'value-b')
+        cache.get('a')
+        cache.set('c', 'value-c')
+        
+        assert cache.get('a') == 'value-a'
+        assert cache.get('b') is None
+        assert cache.get('c') == 'value-c'
+    
+    def test_disk_entries_survive_restart(self, tmp_path):
+        """Test that string keys written to disk are found by a fresh cache"""
+        disk_path = str(tmp_path / 'cache.sqlite3')
+        LRUCache[bytes](max_size=2, ttl=60, disk_path=disk_path).set('pdf:a', b'%PDF')
+        
+        cache = LRUCache[bytes](max_size=2, ttl=60, disk_path=disk_path)
+        assert cache.get('pdf:a') == b'%PDF'
+        assert cache.delete('pdf:a')
+        assert LRUCache[bytes](max_size=2, ttl=60, disk_path=disk_path).get('pdf:a') is None
+    
+    def test_disk_rows_bounded_by_max_size(self, tmp_path):
+        """Test that evicted entries don't accumulate on disk"""
+        cache = LRUCache[str](max_size=2, ttl=60, disk_path=str(tmp_path / 'cache.sqlite3'))
+        for i in range(10):
+            cache.set(f'key-{i}', f'value-{i}')
+        cache.set('key-8', 'value-8')
+        
+        rows = cache.disk.connection.execute('SELECT key FROM entries ORDER BY key').fetchall()
+        assert rows == [('key-8',), ('key-9',)]
+    
+    def test_expired_disk_rows_pruned_while_running(self, tmp_path):
+        """Test that expired rows are deleted periodically, not only on startup"""
+        cache = LRUCache[str](max_size=1000, ttl=60, disk_path=str(tmp_path / 'cache.sqlite3'))
+        cache.set('old', 'value')
+        
+        with patch('app.cache_manager.time.time', return_value=time.time() + 120):
+            for i in range(DiskStore.PRUNE_INTERVAL):
+                cache.set(f'key-{i}', 'value')
+        
+        assert cache.disk.get('old') is None
+    
+    def test_expired_entries_are_misses(self):
+        """Test that entries older than the TTL are dropped on lookup"""
+        cache = LRUCache[str](max_size=2, ttl=60)
+        cache.set('a', 'value-a')
+        
+        with patch.object(cache, 'clock', return_value=time.monotonic() + 120):
+            assert cache.get('a') is None
+        
+        stats = cache.get_stats()
+        assert stats['size'] == 0
+        assert stats['misses'] == 1
+
+
+class TestShardedLRUCache:
+    """Test sharded LRU cache dispatch and stats"""
+    
+    def test_keys_are_spread_over_shards(self):
+        """Test that entries land in several shards and are found again"""
+        cache = ShardedLRUCache[int](max_size=64, shards=4)
+        for i in range(32):
+            cache.set(f'key-{i}', i)
+        
+        assert [cache.get(f'key-{i}') for i in range(32)] == list(range(32))
+        assert sum(1 for shard in cache.shards if shard.cache) > 1
+        assert cache.delete('key-0')
+        assert cache.get('key-0') is None
+    
+    def test_stats_sum_over_shards(self):
+        """Test that stats count hits, misses and size across all shards"""
+        cache = ShardedLRUCache[str](max_size=16, shards=4)
+        cache.set('a', 'value-a')
+        cache.set('b', 'value-b')
+        cache.get('a')
+        cache.get('missing')
+        
+        stats = cache.get_stats()
+        assert (stats['size'], stats['hits'], stats['misses']) == (2, 1, 1)
+        
+        cache.clear()
+        assert cache.get_stats()['size'] == 0
+
+
+class TestSemanticCache:
+    """Test semantic cache lookups and eviction"""
+    
+    def test_exact_key_hit(self):
+        """Test lookup by exact key without an embedding"""
+        cache = SemanticCache[str](max_size=4)
+        cache.set('a', None, 'value-a')
+        
+        assert cache.get('a') == 'value-a'
+        assert cache.get('b') is None
+    
+    def test_similar_vector_hit(self):
+        """Test that a close embedding returns the cached value"""
+        cache = SemanticCache[str](max_size=4, threshold=0.9)
+        cache.set('a', unit(1, 0, 0), 'value-a')
+        cache.set('b', unit(0, 1, 0), 'value-b')
+        
+        assert cache.get('other', unit(1, 0.1, 0)) == 'value-a'
+        assert cache.get_stats()['semantic_hits'] == 1
+    
+    def test_dissimilar_vector_miss(self):
+        """Test that an embedding below the threshold misses"""
+        cache = SemanticCache[str](max_size=4, threshold=0.9)
+        cache.set('a', unit(1, 0, 0), 'value-a')
+        
+        assert cache.get('other', unit(1, 1, 0)) is None
+        assert cache.get_stats()['misses'] == 1
+    
+    def test_evicts_least_recently_used(self):
+        """Test LRU eviction among short-term entries"""
+        cache = SemanticCache[str](max_size=2)
+        cache.set('a', unit(1, 0, 0), 'value-a')
+        cache.set('b', unit(0, 1, 0), 'value-b')
+        cache.get('a')
+        cache.set('c', unit(0, 0, 1), 'value-c')
+        
+        assert cache.get('a') == 'value-a'
+        assert cache.get('b') is None
+        assert cache.get('c') == 'value-c'
+    
+    def test_promoted_entries_survive_eviction(self):
+        """Test that frequently hit entries outlive newer short-term entries"""
+        cache = SemanticCache[str](max_size=2, promote_after=2)
+        cache.set('a', unit(1, 0, 0), 'value-a')
+        cache.get('a')
+        cache.get('a')
+        cache.set('b', unit(0, 1, 0), 'value-b')
+        cache.get('b')
+        cache.set('c', unit(0, 0, 1), 'value-c')
+        
+        assert cache.get('a') == 'value-a'
+        assert cache.get('b') is None
+    
+    def test_expired_entries_free_their_slots(self):
+        """Test that expired entries stop matching and their slots are reused"""
+        cache = SemanticCache[str](max_size=2, ttl=60)
+        cache.set('a', unit(1, 0, 0), 'value-a')
+        
+        with patch('app.cache_manager.time.monotonic', return_value=time.monotonic() + 120):
+            assert cache.get('other', unit(1, 0, 0)) is None
+            cache.set('b', unit(0, 1, 0), 'value-b')
+            cache.set('c', unit(0, 0, 1), 'value-c')
+            
+            assert cache.get('b') == 'value-b'
+            assert cache.get('c') == 'value-c'
+            assert cache.get_stats()['size'] == 2
+    
+    def test_clear(self):
+        """Test clearing entries and stats"""
+        cache = SemanticCache[str](max_size=2)
+        cache.set('a', unit(1, 0, 0), 'value-a')
+        cache.get('a')
+        cache.clear()
+        
+        stats = cache.get_stats()
+        assert stats['size'] == 0
+        assert stats['hits'] == 0
+
+
+class TestGenerateCacheKey:
+    """Test cache key generation"""
+    
+    def test_key_ignores_dict_order(self):
+        """Test that equal dicts produce the same key regardless of insertion order"""
+        assert generate_cache_key({'a': 1, 'b': [1, 2]}, tone='formal') == \
+            generate_cache_key({'b': [1, 2], 'a': 1}, tone='formal')
+    
+    def test_key_distinguishes_arguments(self):
+        """Test that different arguments produce different keys"""
+        keys = {
+            generate_cache_key('resume', 'job'),
+            generate_cache_key('resume', 'other job'),
+            generate_cache_key('resume', tone='job'),
+            generate_cache_key({'resume': 'job'})
+        }
+        assert len(keys) == 4
+
+
+class TestMakeCacheKey:
+    """Test in-process cache keys"""
+    
+    def test_key_ignores_dict_order(self):
+        """Test that equal nested arguments produce equal keys"""
+        assert make_cache_key({'a': 1, 'b': [1, {'c': 2}]}, tone='formal') == \
+            make_cache_key({'b': [1, {'c': 2}], 'a': 1}, tone='formal')
+    
+    def test_key_distinguishes_arguments(self):
+        """Test that positional, keyword and container arguments don't collide"""
+        keys = {
+            make_cache_key('a', 'b'),
+            make_cache_key('a', b='b'),
+            make_cache_key(['a', 'b']),
+            make_cache_key(('a', 'b')),
+            make_cache_key({'a': 'b'}),
+            make_cache_key({('a', 'b')})
+        }
+        assert len(keys) == 6
@@ -3,12 +3,16 @@ Unit tests for chat service
 Tests context building, conversation history formatting, and prompt construction
 """
 
+import asyncio
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+from app.gemini_client import GeminiClient, GeminiError, GeminiTimeoutError, GeminiUnavailableError
 from app.chat_service import (
     build_enhanced_context,
     format_conversation_history,
     generate_chat_response,
+    stream_chat_response,
+    RESUME_SUMMARY_TOKENS,
     SYSTEM_PROMPT
 )
 
@@ -22,6 +26,11 @@ class TestBuildEnhancedContext:
         result = build_enhanced_context(context)
         assert result == "No analysis context available"
     
+    def test_context_without_analysis_keys(self):
+        """Test that unrelated keys are treated as an empty context"""
+        result = build_enhanced_context({'session_id': 'abc123'})
+        assert result == "No analysis context available"
+    
     def test_job_information(self):
         """Test with job title and company"""
         context = {
@@ -99,15 +108,21 @@ class TestBuildEnhancedContext:
     
     def test_resume_summary_truncation(self):
         """Test resume summary truncation"""
-        long_summary = 'A' * 300
+        long_summary = 'word ' * 300
         context = {
             'resume_summary': long_summary
         }
         result = build_enhanced_context(context)
         assert 'Resume Summary:' in result
-        # Should be truncated to 200 chars + "..."
-        assert len(result.split('Resume Summary: ')[1]) <= 204
-        assert '...' in result
+        # Should be truncated to the token budget + "..."
+        assert len(result.split('Resume Summary: ')[1].split()) <= RESUME_SUMMARY_TOKENS
+        assert result.endswith('...')
+    
+    def test_short_job_description_not_truncated(self):
+        """Test that a job description within budget is kept whole"""
+        result = build_enhanced_context({'job_description': 'Python developer role'})
+        assert '\nJob Description:\nPython developer role\n' in result
+        assert '...' not in result
     
     def test_recommendations(self):
         """Test with recommendations"""
@@ -183,29 +198,31 @@ class TestFormatConversationHistory:
         assert 'Assistant: Your main gaps are Python and Docker.' in result
         assert 'User: How can I improve?' in result
     
-    def test_last_five_messages_only(self):
-        """Test that only last 5 messages are included"""
+    def test_history_window_starts_on_fixed_boundary(self):
+        """Test that at least the last 5 messages are kept, in windows starting every 5 messages"""
         history = [
-            {'role': 'user', 'content': 'Message 1'},
-            {'role': 'assistant', 'content': 'Response 1'},
-            {'role': 'user', 'content': 'Message 2'},
-            {'role': 'assistant', 'content': 'Response 2'},
-            {'role': 'user', 'content': 'Message 3'},
-            {'role': 'assistant', 'content': 'Response 3'},
-            {'role': 'user', 'content': 'Message 4'},
+            {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'Message {i}'}
+            for i in range(1, 12)
         ]
+        
+        # With 7 messages the window still starts at the first one
+        result = format_conversation_history(history[:7])
+        assert 'Message 1\n' in result
+        assert 'Message 7' in result
+        
+        # With 11 messages it starts at the 6th
         result = format_conversation_history(history)
+        assert 'Message 5' not in result
+        assert all(f'Message {i}' in result for i in range(6, 12))
+    
+    def test_history_prefix_stable_across_turns(self):
+        """Test that adding a message doesn't change the history already sent"""
+        history = [{'role': 'user', 'content': f'Message {i}'} for i in range(1, 12)]
         
-        # Should not include first messages
-        assert 'Message 1' not in result
-        assert 'Response 1' not in result
+        previous = format_conversation_history(history[:10])
+        current = format_conversation_history(history[:11])
         
-        # Should include last 5
-        assert 'Message 2' in result
-        assert 'Response 2' in result
-        assert 'Message 3' in result
-        assert 'Response 3' in result
-        assert 'Message 4' in result
+        assert current.startswith(previous)
     
     def test_long_message_truncation(self):
         """Test that long messages are truncated"""
@@ -237,7 +254,7 @@ class TestFormatConversationHistory:
 class TestGenerateChatResponse:
     """Test chat response generation with mocked AI client"""
     
-    @patch('app.chat_service.gemini_client.generate')
+    @patch('app.chat_service.gemini_client.generate_async', new_callable=AsyncMock)
     def test_successful_response(self, mock_generate):
         """Test successful AI response generation"""
         mock_generate.return_value = "Here's how to improve your resume..."
@@ -248,7 +265,7 @@ class TestGenerateChatResponse:
             'scores': {'ats': 65}
         }
         
-        result = generate_chat_response(message, context)
+        result = asyncio.run(generate_chat_response(message, context))
         
         assert result == "Here's how to improve your resume..."
         assert mock_generate.called
@@ -261,7 +278,7 @@ class TestGenerateChatResponse:
         assert 'USER MESSAGE:' in prompt
         assert message in prompt
     
-    @patch('app.chat_service.gemini_client.generate')
+    @patch('app.chat_service.gemini_client.generate_async', new_callable=AsyncMock)
     def test_with_conversation_history(self, mock_generate):
         """Test response generation with conversation history"""
         mock_generate.return_value = "Based on our previous discussion..."
@@ -273,7 +290,7 @@ class TestGenerateChatResponse:
             {'role': 'assistant', 'content': 'Your gaps include Python.'}
         ]
         
-        result = generate_chat_response(message, context, history)
+        result = asyncio.run(generate_chat_response(message, context, history))
         
         assert result == "Based on our previous discussion..."
         
@@ -283,49 +300,49 @@ class TestGenerateChatResponse:
         assert 'CONVERSATION HISTORY:' in prompt
         assert 'What are my gaps?' in prompt
     
-    @patch('app.chat_service.gemini_client.generate')
+    @patch('app.chat_service.gemini_client.generate_async', new_callable=AsyncMock)
     def test_timeout_error_handling(self, mock_generate):
         """Test handling of timeout errors"""
-        mock_generate.side_effect = Exception('Request timeout')
+        mock_generate.side_effect = GeminiTimeoutError('Gemini API request timeout')
         
         message = "Help me"
         context = {}
         
-        result = generate_chat_response(message, context)
+        result = asyncio.run(generate_chat_response(message, context))
         
         # Should return user-friendly timeout message
         assert 'taking longer than expected' in result.lower()
         assert 'try again' in result.lower()
     
-    @patch('app.chat_service.gemini_client.generate')
+    @patch('app.chat_service.gemini_client.generate_async', new_callable=AsyncMock)
     def test_connection_error_handling(self, mock_generate):
         """Test handling of connection errors"""
-        mock_generate.side_effect = Exception('Connection refused')
+        mock_generate.side_effect = GeminiUnavailableError('Could not connect to the Gemini API')
         
         message = "Help me"
         context = {}
         
-        result = generate_chat_response(message, context)
+        result = asyncio.run(generate_chat_response(message, context))
         
         # Should return user-friendly connection error message
         assert 'trouble connecting' in result.lower()
         assert 'try again' in result.lower()
     
-    @patch('app.chat_service.gemini_client.generate')
+    @patch('app.chat_service.gemini_client.generate_async', new_callable=AsyncMock)
     def test_generic_error_handling(self, mock_generate):
         """Test handling of generic errors"""
-        mock_generate.side_effect = Exception('Unknown error')
+        mock_generate.side_effect = GeminiError('Gemini API error: unknown')
         
         message = "Help me"
         context = {}
         
-        result = generate_chat_response(message, context)
+        result = asyncio.run(generate_chat_response(message, context))
         
         # Should return generic error message
         assert 'encountered an error' in result.lower()
         assert 'try again' in result.lower()
     
-    @patch('app.chat_service.gemini_client.generate')
+    @patch('app.chat_service.gemini_client.generate_async', new_callable=AsyncMock)
     def test_model_configuration(self, mock_generate):
         """Test that correct model is used"""
         mock_generate.return_value = "Response"
@@ -333,14 +350,14 @@ class TestGenerateChatResponse:
         message = "Test"
         context = {}
         
-        generate_chat_response(message, context)
+        asyncio.run(generate_chat_response(message, context))
         
         # Verify model parameter
         call_args = mock_generate.call_args
         assert 'model' in call_args.kwargs
         # Should use GEMINI_MODEL from environment
     
-    @patch('app.chat_service.gemini_client.generate')
+    @patch('app.chat_service.gemini_client.generate_async', new_callable=AsyncMock)
     def test_prompt_includes_guardrails(self, mock_generate):
         """Test that system prompt includes guardrails"""
         mock_generate.return_value = "Response"
@@ -348,7 +365,7 @@ class TestGenerateChatResponse:
         message = "Test"
         context = {}
         
-        generate_chat_response(message, context)
+        asyncio.run(generate_chat_response(message, context))
         
         call_args = mock_generate.call_args
         prompt = call_args.kwargs['prompt']
@@ -359,3 +376,75 @@ class TestGenerateChatResponse:
         assert 'BOUNDARIES:' in prompt
         assert 'resume' in prompt.lower()
         assert 'career' in prompt.lower()
+    
+    @patch('app.chat_service.GEMINI_CONTEXT_CACHE_ENABLED', True)
+    @patch('app.chat_service.gemini_client.get_context_cache', new_callable=AsyncMock)
+    @patch('app.chat_service.gemini_client.generate_async', new_callable=AsyncMock)
+    def test_cached_system_prompt_not_resent(self, mock_generate, mock_get_cache):
+        """Test that a context-cached system prompt is referenced instead of included"""
+        mock_get_cache.return_value = 'cachedContents/system'
+        mock_generate.return_value = "Response"
+        
+        asyncio.run(generate_chat_response("Test", {'job_title': 'Engineer'}))
+        
+        call_args = mock_generate.call_args
+        assert call_args.kwargs['cached_content'] == 'cachedContents/system'
+        assert SYSTEM_PROMPT not in call_args.kwargs['prompt']
+        assert call_args.kwargs['prompt'].startswith('ANALYSIS CONTEXT:')
+        assert mock_get_cache.call_args.args[0] == SYSTEM_PROMPT
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_resent_message_answered_from_cache(self, mock_client_class):
+        """Test that re-sending the same message in the same conversation skips the API"""
+        mock_client_instance = Mock()
+        mock_client_instance.aio.models.generate_content = AsyncMock(return_value=Mock(text="Add Kubernetes"))
+        mock_client_class.return_value = mock_client_instance
+        
+        history = [{'role': 'user', 'content': 'What are my gaps?'}]
+        
+        with patch('app.chat_service.gemini_client', GeminiClient(api_key="test_key")):
+            first = asyncio.run(generate_chat_response("How do I fix them?", {'job_title': 'SRE'}, history))
+            second = asyncio.run(generate_chat_response("How do I fix them?", {'job_title': 'SRE'}, history))
+            asyncio.run(generate_chat_response("Anything else?", {'job_title': 'SRE'}, history))
+        
+        assert first == second == "Add Kubernetes"
+        assert mock_client_instance.aio.models.generate_content.call_count == 2
+
+
+async def collect_stream(message, context):
+    """Collect all chunks from a streamed chat response"""
+    return [chunk async for chunk in stream_chat_response(message, context)]
+
+
+class TestStreamChatResponse:
+    """Test streamed chat response generation"""
+    
+    @patch('app.chat_service.gemini_client.generate_stream')
+    def test_yields_chunks_in_order(self, mock_stream):
+        """Test that generated chunks are passed through as they arrive"""
+        async def fake_stream(**kwargs):
+            for chunk in ["Add ", "metrics ", "to your bullets."]:
+                yield chunk
+        
+        mock_stream.side_effect = fake_stream
+        
+        chunks = asyncio.run(collect_stream("How do I improve?", {'job_title': 'Engineer'}))
+        
+        assert chunks == ["Add ", "metrics ", "to your bullets."]
+        prompt = mock_stream.call_args.kwargs['prompt']
+        assert SYSTEM_PROMPT in prompt
+        assert 'Target Job: Engineer' in prompt
+    
+    @patch('app.chat_service.gemini_client.generate_stream')
+    def test_error_yields_friendly_message(self, mock_stream):
+        """Test that a failure mid-stream ends with a user-friendly message"""
+        async def failing_stream(**kwargs):
+            yield "Partial "
+            raise GeminiTimeoutError("Gemini API request timeout")
+        
+        mock_stream.side_effect = failing_stream
+        
+        chunks = asyncio.run(collect_stream("Test", {}))
+        
+        assert chunks[0] == "Partial "
+        assert 'taking longer than expected' in chunks[-1].lower()
@@ -0,0 +1,136 @@
+"""
+Unit tests for embedding service
+Tests model loading and response packing of embeddings
+"""
+
+import asyncio
+import base64
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from app import embedding_service
+from app.embedding_service import encode_embeddings_base64, encode_embeddings_binary
+
+
+class TestGetEmbeddingModel:
+    """Test the process-wide model singleton"""
+    
+    def test_concurrent_first_use_loads_once(self):
+        """Test that threads racing on first use share a single load"""
+        def slow_load():
+            time.sleep(0.1)
+            return MagicMock()
+        
+        with patch.object(embedding_service, '_embedding_model', None), \
+             patch.object(embedding_service, 'load_embedding_model', side_effect=slow_load) as mock_load:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                models = list(executor.map(lambda _: embedding_service.get_embedding_model(), range(4)))
+        
+        assert mock_load.call_count == 1
+        assert all(model is models[0] for model in models)
+    
+    def test_warm_up_runs_one_encode(self):
+        """Test that warm-up loads the model and runs a first inference"""
+        model = MagicMock()
+        
+        with patch.object(embedding_service, '_embedding_model', None), \
+             patch.object(embedding_service, 'load_embedding_model', return_value=model):
+            assert embedding_service.warm_up_embedding_model() is True
+        
+        model.encode.assert_called_once()
+
+
+class TestGetOnnxFileName:
+    """Test choice of ONNX export"""
+    
+    def test_explicit_file_wins(self):
+        """Test that EMBEDDING_ONNX_FILE overrides the automatic choice"""
+        with patch.object(embedding_service, 'EMBEDDING_ONNX_FILE', 'onnx/custom.onnx'):
+            assert embedding_service.get_onnx_file_name() == 'onnx/custom.onnx'
+    
+    def test_fp32_precision(self):
+        """Test that fp32 precision loads the unquantized export"""
+        with patch.object(embedding_service, 'EMBEDDING_ONNX_FILE', ''), \
+             patch.object(embedding_service, 'EMBEDDING_PRECISION', 'fp32'):
+            assert embedding_service.get_onnx_file_name() == 'onnx/model.onnx'
+    
+    def test_int8_matches_cpu(self):
+        """Test that int8 precision picks a quantized export"""
+        with patch.object(embedding_service, 'EMBEDDING_ONNX_FILE', ''), \
+             patch.object(embedding_service, 'EMBEDDING_PRECISION', 'int8'):
+            assert 'int8' in embedding_service.get_onnx_file_name()
+
+
+class TestEncodeTextsForApi:
+    """Test micro-batching of concurrent /embeddings requests"""
+    
+    def test_concurrent_requests_share_one_encode(self):
+        """Test that requests within the window are merged and split back in order"""
+        def fake_encode(texts):
+            return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+        
+        async def run():
+            return await asyncio.gather(
+                embedding_service.encode_texts_for_api(['a', 'bb']),
+                embedding_service.encode_texts_for_api(['ccc']),
+                embedding_service.encode_texts_for_api(['dddd', 'eeeee'])
+            )
+        
+        with patch.object(embedding_service, 'EMBEDDINGS_PROVIDER', 'local'), \
+             patch.object(embedding_service, 'encode_texts', side_effect=fake_encode) as mock_encode:
+            results = asyncio.run(run())
+        
+        mock_encode.assert_called_once_with(['a', 'bb', 'ccc', 'dddd', 'eeeee'])
+        assert [result[:, 0].tolist() for result in results] == [[1.0, 2.0], [3.0], [4.0, 5.0]]
+    
+    def test_encode_error_reaches_every_request(self):
+        """Test that a failed batch fails each merged request"""
+        async def run():
+            return await asyncio.gather(
+                embedding_service.encode_texts_for_api(['a']),
+                embedding_service.encode_texts_for_api(['b']),
+                return_exceptions=True
+            )
+        
+        with patch.object(embedding_service, 'EMBEDDINGS_PROVIDER', 'local'), \
+             patch.object(embedding_service, 'encode_texts', side_effect=ImportError("missing")):
+            results = asyncio.run(run())
+        
+        assert all(isinstance(result, ImportError) for result in results)
+
+
+class TestEncodeEmbeddingsBase64:
+    """Test float16 base64 packing"""
+    
+    def test_round_trip(self):
+        """Test that packed embeddings decode back to the original values"""
+        embeddings = np.array([[0.5, -0.25, 0.125], [1.0, 0.0, -1.0]], dtype=np.float32)
+        
+        packed = encode_embeddings_base64(embeddings)
+        
+        assert len(packed) == 2
+        decoded = np.frombuffer(base64.b64decode(packed[0]), dtype='<f2')
+        np.testing.assert_array_equal(decoded, embeddings[0])
+    
+    def test_halves_payload_bytes(self):
+        """Test that each value is packed into two bytes"""
+        embeddings = np.random.rand(1, 384).astype(np.float32)
+        
+        packed = encode_embeddings_base64(embeddings)
+        
+        assert len(base64.b64decode(packed[0])) == 384 * 2
+
+
+class TestEncodeEmbeddingsBinary:
+    """Test raw float16 packing"""
+    
+    def test_row_major_float16(self):
+        """Test that the blob decodes back to the matrix in row order"""
+        embeddings = np.array([[0.5, -0.25], [1.0, 0.0], [0.125, -1.0]], dtype=np.float32)
+        
+        blob = encode_embeddings_binary(embeddings)
+        
+        assert len(blob) == 3 * 2 * 2
+        decoded = np.frombuffer(blob, dtype='<f2').reshape(3, 2)
+        np.testing.assert_array_equal(decoded, embeddings)
@@ -3,9 +3,16 @@ Unit tests for Gemini client
 Tests initialization, generation, error handling, and availability checks
 """
 
+import json
+import asyncio
+import httpx
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-from app.gemini_client import GeminiClient, generate_text, check_ai_available
+from google.genai import errors
+from unittest.mock import Mock, AsyncMock, patch, MagicMock
+from app.gemini_client import (
+    GeminiClient, GeminiAuthError, GeminiContentFilterError, GeminiError, GeminiRateLimitError,
+    GeminiTimeoutError, GeminiUnavailableError, generate_text, generate_text_async, check_ai_available
+)
 
 
 class TestGeminiClientInitialization:
@@ -21,7 +28,7 @@ class TestGeminiClientInitialization:
         
         assert client.api_key == "test_api_key"
         assert client.client == mock_client_instance
-        mock_client_class.assert_called_once_with(api_key="test_api_key")
+        assert mock_client_class.call_args.kwargs['api_key'] == "test_api_key"
     
     @patch('app.gemini_client.genai.Client')
     @patch('app.gemini_client.GEMINI_API_KEY', 'env_api_key')
@@ -33,7 +40,28 @@ class TestGeminiClientInitialization:
         client = GeminiClient()
         
         assert client.api_key == 'env_api_key'
-        mock_client_class.assert_called_once_with(api_key='env_api_key')
+        assert mock_client_class.call_args.kwargs['api_key'] == 'env_api_key'
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_initialization_uses_keep_alive_pool(self, mock_client_class):
+        """Test that sync and async requests share the pooled keep-alive connection settings"""
+        GeminiClient(api_key="test_api_key")
+        
+        http_options = mock_client_class.call_args.kwargs['http_options']
+        assert http_options.client_args['limits'].max_keepalive_connections == 16
+        assert http_options.async_client_args == http_options.client_args
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_aclose_closes_both_pools(self, mock_client_class):
+        """Test that closing the client releases the sync and async connection pools"""
+        mock_client_instance = Mock()
+        mock_client_instance.aio.aclose = AsyncMock()
+        mock_client_class.return_value = mock_client_instance
+        
+        asyncio.run(GeminiClient(api_key="test_api_key").aclose())
+        
+        assert mock_client_instance.close.called
+        assert mock_client_instance.aio.aclose.called
     
     def test_initialization_without_api_key(self):
         """Test that initialization fails without API key"""
@@ -108,6 +136,53 @@ class TestGeminiClientGenerate:
         config = call_args.kwargs['config']
         assert config.temperature == 0.9
         assert config.max_output_tokens == 800
+        assert config.top_p is None
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_generation_with_sampling_options(self, mock_client_class):
+        """Test that top_p and stop sequences are forwarded to the generation config"""
+        mock_response = Mock()
+        mock_response.text = "Response"
+        
+        mock_client_instance = Mock()
+        mock_client_instance.models.generate_content.return_value = mock_response
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        client.generate(prompt="Test prompt", temperature=0.0, top_p=0.1, stop_sequences=['\n\n\n'])
+        
+        config = mock_client_instance.models.generate_content.call_args.kwargs['config']
+        assert config.temperature == 0.0
+        assert config.top_p == 0.1
+        assert config.stop_sequences == ['\n\n\n']
+
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_low_temperature_responses_cached(self, mock_client_class):
+        """Test that repeated low-temperature requests reuse the first response"""
+        mock_client_instance = Mock()
+        mock_client_instance.models.generate_content.return_value = Mock(text="Response")
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        results = [client.generate(prompt="Fix grammar", temperature=0.2) for _ in range(3)]
+        client.generate(prompt="Fix grammar", temperature=0.2, max_tokens=100)
+        
+        assert results == ["Response"] * 3
+        assert mock_client_instance.models.generate_content.call_count == 2
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_high_temperature_responses_not_cached(self, mock_client_class):
+        """Test that requests meant to vary are always sent"""
+        mock_client_instance = Mock()
+        mock_client_instance.models.generate_content.return_value = Mock(text="Response")
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        for _ in range(2):
+            client.generate(prompt="Suggest ideas", temperature=0.7)
+        
+        assert mock_client_instance.models.generate_content.call_count == 2
 
 
 class TestGeminiClientErrorHandling:
@@ -117,48 +192,130 @@ class TestGeminiClientErrorHandling:
     def test_authentication_error(self, mock_client_class):
         """Test handling of authentication errors"""
         mock_client_instance = Mock()
-        mock_client_instance.models.generate_content.side_effect = Exception("API key invalid")
+        mock_client_instance.models.generate_content.side_effect = errors.ClientError(400, {'error': {
+            'code': 400, 'status': 'INVALID_ARGUMENT', 'message': 'API key not valid.',
+            'details': [{'reason': 'API_KEY_INVALID'}]
+        }})
         mock_client_class.return_value = mock_client_instance
         
         client = GeminiClient(api_key="test_key")
         
-        with pytest.raises(Exception, match="authentication failed"):
+        with pytest.raises(GeminiAuthError, match="authentication failed"):
             client.generate(prompt="Test")
     
+    @patch('app.gemini_client.time.sleep')
     @patch('app.gemini_client.genai.Client')
-    def test_rate_limit_error(self, mock_client_class):
+    def test_rate_limit_error(self, mock_client_class, mock_sleep):
         """Test handling of rate limit errors"""
         mock_client_instance = Mock()
-        mock_client_instance.models.generate_content.side_effect = Exception("Rate limit exceeded")
+        mock_client_instance.models.generate_content.side_effect = errors.ClientError(429, {'error': {'status': 'RESOURCE_EXHAUSTED'}})
         mock_client_class.return_value = mock_client_instance
         
         client = GeminiClient(api_key="test_key")
         
-        with pytest.raises(Exception, match="rate limit"):
+        with pytest.raises(GeminiRateLimitError, match="rate limit"):
             client.generate(prompt="Test")
     
+    @patch('app.gemini_client.time.sleep')
     @patch('app.gemini_client.genai.Client')
-    def test_timeout_error(self, mock_client_class):
+    def test_timeout_error(self, mock_client_class, mock_sleep):
         """Test handling of timeout errors"""
         mock_client_instance = Mock()
-        mock_client_instance.models.generate_content.side_effect = Exception("Request timeout")
+        mock_client_instance.models.generate_content.side_effect = httpx.ReadTimeout("timed out")
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        with pytest.raises(GeminiTimeoutError, match="timeout"):
+            client.generate(prompt="Test")
+    
+    @patch('app.gemini_client.time.sleep')
+    @patch('app.gemini_client.genai.Client')
+    def test_server_error(self, mock_client_class, mock_sleep):
+        """Test that 5xx responses are reported as unavailable"""
+        mock_client_instance = Mock()
+        mock_client_instance.models.generate_content.side_effect = errors.ServerError(503, {'error': {'status': 'UNAVAILABLE'}})
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        with pytest.raises(GeminiUnavailableError):
+            client.generate(prompt="Test")
+    
+    @patch('app.gemini_client.time.sleep')
+    @patch('app.gemini_client.genai.Client')
+    def test_transient_errors_retried(self, mock_client_class, mock_sleep):
+        """Test that a 503 is retried after a backoff and the later response returned"""
+        mock_client_instance = Mock()
+        mock_client_instance.models.generate_content.side_effect = [
+            errors.ServerError(503, {'error': {'status': 'UNAVAILABLE'}}),
+            Mock(text="Response")
+        ]
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        assert client.generate(prompt="Test") == "Response"
+        assert mock_client_instance.models.generate_content.call_count == 2
+        assert mock_sleep.call_count == 1
+    
+    @patch('app.gemini_client.time.sleep')
+    @patch('app.gemini_client.genai.Client')
+    def test_retry_waits_for_retry_after(self, mock_client_class, mock_sleep):
+        """Test that a 429 waits at least as long as its Retry-After header"""
+        rate_limited = errors.ClientError(
+            429, {'error': {'status': 'RESOURCE_EXHAUSTED'}}, httpx.Response(429, headers={'retry-after': '5'})
+        )
+        mock_client_instance = Mock()
+        mock_client_instance.models.generate_content.side_effect = [rate_limited, Mock(text="Response")]
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        assert client.generate(prompt="Test") == "Response"
+        assert mock_sleep.call_args.args[0] >= 5
+    
+    @patch('app.gemini_client.time.sleep')
+    @patch('app.gemini_client.genai.Client')
+    def test_retry_after_beyond_timeout_fails_fast(self, mock_client_class, mock_sleep):
+        """Test that a retry which couldn't finish within the timeout isn't attempted"""
+        rate_limited = errors.ClientError(
+            429, {'error': {'status': 'RESOURCE_EXHAUSTED'}}, httpx.Response(429, headers={'retry-after': '60'})
+        )
+        mock_client_instance = Mock()
+        mock_client_instance.models.generate_content.side_effect = rate_limited
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        with pytest.raises(GeminiRateLimitError):
+            client.generate(prompt="Test", timeout=10)
+        assert mock_client_instance.models.generate_content.call_count == 1
+        assert not mock_sleep.called
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_client_errors_not_retried(self, mock_client_class):
+        """Test that authentication failures are raised after one attempt"""
+        mock_client_instance = Mock()
+        mock_client_instance.models.generate_content.side_effect = errors.ClientError(403, {'error': {'status': 'PERMISSION_DENIED'}})
         mock_client_class.return_value = mock_client_instance
         
         client = GeminiClient(api_key="test_key")
         
-        with pytest.raises(Exception, match="timeout"):
+        with pytest.raises(GeminiAuthError):
             client.generate(prompt="Test")
+        assert mock_client_instance.models.generate_content.call_count == 1
     
     @patch('app.gemini_client.genai.Client')
     def test_content_filter_error(self, mock_client_class):
         """Test handling of content filtering"""
         mock_client_instance = Mock()
-        mock_client_instance.models.generate_content.side_effect = Exception("Content filtered by safety")
+        mock_client_instance.models.generate_content.return_value = Mock(text=None)
         mock_client_class.return_value = mock_client_instance
         
         client = GeminiClient(api_key="test_key")
         
-        with pytest.raises(Exception, match="filtered"):
+        with pytest.raises(GeminiContentFilterError, match="filtered"):
             client.generate(prompt="Test")
     
     @patch('app.gemini_client.genai.Client')
@@ -170,8 +327,34 @@ class TestGeminiClientErrorHandling:
         
         client = GeminiClient(api_key="test_key")
         
-        with pytest.raises(Exception, match="Gemini API error"):
+        with pytest.raises(GeminiError, match="Gemini API error"):
             client.generate(prompt="Test")
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_stalled_stream_times_out(self, mock_client_class):
+        """Test that a stream which stops sending chunks fails with a timeout"""
+        async def stalled_stream():
+            yield Mock(text="Partial")
+            await asyncio.sleep(10)
+            yield Mock(text="never sent")
+        
+        mock_client_instance = Mock()
+        mock_client_instance.aio.models.generate_content_stream = AsyncMock(return_value=stalled_stream())
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        chunks = []
+        
+        async def consume():
+            async for chunk in client.generate_stream(prompt="Test", timeout=0.2):
+                chunks.append(chunk)
+        
+        with pytest.raises(GeminiTimeoutError):
+            asyncio.run(consume())
+        
+        assert chunks == ["Partial"]
+        config = mock_client_instance.aio.models.generate_content_stream.call_args.kwargs['config']
+        assert config.http_options.timeout == 200
 
 
 class TestGeminiClientAvailability:
@@ -192,6 +375,18 @@ class TestGeminiClientAvailability:
         
         assert result is True
     
+    @patch('app.gemini_client.genai.Client')
+    def test_async_availability_check_uses_async_client(self, mock_client_class):
+        """Test that the async availability check awaits the SDK's async client"""
+        mock_client_instance = Mock()
+        mock_client_instance.aio.models.generate_content = AsyncMock(return_value=Mock(text="test response"))
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        assert asyncio.run(client.check_availability_async()) is True
+        assert not mock_client_instance.models.generate_content.called
+    
     @patch('app.gemini_client.genai.Client')
     def test_availability_check_failure(self, mock_client_class):
         """Test availability check when service is unavailable"""
@@ -220,6 +415,141 @@ class TestGeminiClientAvailability:
         assert result is False
 
 
+class TestGeminiClientBatch:
+    """Test Gemini Batch API submission and retrieval"""
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_submit_batch_uploads_jsonl(self, mock_client_class):
+        """Test that prompts are uploaded as one JSONL file and a job is created"""
+        mock_client_instance = Mock()
+        mock_client_instance.files.upload.return_value = Mock(name='uploaded')
+        mock_client_instance.files.upload.return_value.name = 'files/abc'
+        mock_client_instance.batches.create.return_value = Mock()
+        mock_client_instance.batches.create.return_value.name = 'batches/123'
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        job_name = client.submit_batch(["First prompt", "Second prompt"], max_tokens=300)
+        
+        assert job_name == 'batches/123'
+        
+        uploaded = mock_client_instance.files.upload.call_args.kwargs['file'].getvalue().decode('utf-8')
+        lines = [json.loads(line) for line in uploaded.splitlines()]
+        assert [line['key'] for line in lines] == ['request-0', 'request-1']
+        assert lines[1]['request']['contents'][0]['parts'][0]['text'] == "Second prompt"
+        assert lines[0]['request']['generation_config']['max_output_tokens'] == 300
+        
+        assert mock_client_instance.batches.create.call_args.kwargs['src'] == 'files/abc'
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_retrieve_batch_results_in_order(self, mock_client_class):
+        """Test that batch results are returned in submission order"""
+        def result_line(key, text):
+            return json.dumps({
+                'key': key,
+                'response': {'candidates': [{'content': {'parts': [{'text': text}]}}]}
+            })
+        
+        mock_job = Mock()
+        mock_job.state.name = 'JOB_STATE_SUCCEEDED'
+        mock_job.dest.file_name = 'files/results'
+        
+        mock_client_instance = Mock()
+        mock_client_instance.batches.get.return_value = mock_job
+        mock_client_instance.files.download.return_value = '\n'.join([
+            result_line('request-1', 'Second'),
+            json.dumps({'key': 'request-2', 'error': {'message': 'failed'}}),
+            result_line('request-0', ' First '),
+            result_line('request-4', 'Fifth'),
+        ]).encode('utf-8')
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        # request-3 is missing from the output; only its own slot is empty
+        assert client.retrieve_batch_results('batches/123', 5) == ['First', 'Second', None, None, 'Fifth']
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_retrieve_batch_results_not_finished(self, mock_client_class):
+        """Test that retrieving an unfinished job raises"""
+        mock_job = Mock()
+        mock_job.state.name = 'JOB_STATE_RUNNING'
+        
+        mock_client_instance = Mock()
+        mock_client_instance.batches.get.return_value = mock_job
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        with pytest.raises(Exception, match="not complete"):
+            client.retrieve_batch_results('batches/123', 1)
+
+
+class TestGeminiClientEmbed:
+    """Test Gemini embeddings"""
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_embed_partitions_to_request_limit(self, mock_client_class):
+        """Test that texts are split into requests of 100 and results keep input order"""
+        async def fake_embed_content(model, contents):
+            response = Mock()
+            response.embeddings = [Mock(values=[float(text)]) for text in contents]
+            return response
+        
+        mock_client_instance = Mock()
+        mock_client_instance.aio.models.embed_content = AsyncMock(side_effect=fake_embed_content)
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        texts = [str(i) for i in range(250)]
+        embeddings = asyncio.run(client.embed_async(texts))
+        
+        assert embeddings == [[float(i)] for i in range(250)]
+        chunk_sizes = [len(call.kwargs['contents']) for call in mock_client_instance.aio.models.embed_content.call_args_list]
+        assert chunk_sizes == [100, 100, 50]
+
+
+class TestGeminiClientContextCache:
+    """Test context caching of static instructions"""
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_cache_created_once_and_passed_to_generation(self, mock_client_class):
+        """Test that the cache is created on first use, reused, and sent as cached_content"""
+        mock_client_instance = Mock()
+        mock_client_instance.aio.caches.create = AsyncMock(return_value=Mock())
+        mock_client_instance.aio.caches.create.return_value.name = 'cachedContents/system'
+        mock_client_instance.aio.models.generate_content = AsyncMock(return_value=Mock(text="Response"))
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        async def run():
+            first = await client.get_context_cache("Be helpful")
+            second = await client.get_context_cache("Be helpful")
+            await client.generate_async(prompt="Hi", cached_content=second)
+            return first, second
+        
+        assert asyncio.run(run()) == ('cachedContents/system', 'cachedContents/system')
+        assert mock_client_instance.aio.caches.create.call_count == 1
+        config = mock_client_instance.aio.models.generate_content.call_args.kwargs['config']
+        assert config.cached_content == 'cachedContents/system'
+    
+    @patch('app.gemini_client.genai.Client')
+    def test_uncacheable_instruction_falls_back_without_retrying(self, mock_client_class):
+        """Test that a failed cache creation returns None and is not retried on every call"""
+        mock_client_instance = Mock()
+        mock_client_instance.aio.caches.create = AsyncMock(side_effect=Exception("Cached content is too small"))
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        async def run():
+            return [await client.get_context_cache("Be helpful") for _ in range(3)]
+        
+        assert asyncio.run(run()) == [None, None, None]
+        assert mock_client_instance.aio.caches.create.call_count == 1
+
+
 class TestConvenienceFunctions:
     """Test module-level convenience functions"""
     
@@ -250,6 +580,32 @@ class TestConvenienceFunctions:
         with pytest.raises(Exception, match="not initialized"):
             generate_text(prompt="Test")
     
+    @patch('app.gemini_client.genai.Client')
+    def test_generate_text_async_uses_async_client(self, mock_client_class):
+        """Test that generate_text_async awaits the SDK's async client instead of a worker thread"""
+        mock_response = Mock()
+        mock_response.text = " Generated text \n"
+        
+        mock_client_instance = Mock()
+        mock_client_instance.aio.models.generate_content = AsyncMock(return_value=mock_response)
+        mock_client_class.return_value = mock_client_instance
+        
+        client = GeminiClient(api_key="test_key")
+        
+        with patch('app.gemini_client.gemini_client', client):
+            result = asyncio.run(generate_text_async(prompt="Test prompt", max_tokens=100))
+        
+        assert result == "Generated text"
+        assert not mock_client_instance.models.generate_content.called
+        config = mock_client_instance.aio.models.generate_content.call_args.kwargs['config']
+        assert config.max_output_tokens == 100
+    
+    @patch('app.gemini_client.gemini_client', None)
+    def test_generate_text_async_no_client(self):
+        """Test generate_text_async when client is not initialized"""
+        with pytest.raises(Exception, match="not initialized"):
+            asyncio.run(generate_text_async(prompt="Test"))
+    
     @patch('app.gemini_client.gemini_client')
     def test_check_ai_available(self, mock_client):
         """Test check_ai_available convenience function"""
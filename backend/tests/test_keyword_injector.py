@@ -0,0 +1,52 @@
+"""
+Unit tests for keyword injector
+Tests placement planning and merging of injected skills
+"""
+
+from app.keyword_injector import plan_keyword_placements, merge_injected_skills
+
+
+SAMPLE_RESUME = {
+    'summary': 'Backend engineer building APIs',
+    'experience': [{'title': 'Engineer', 'bullets': ['Built services']}],
+    'skills': ['Python', 'FastAPI']
+}
+
+
+class TestPlanKeywordPlacements:
+    """Test placement planning before injection"""
+    
+    def test_no_keyword_recommendations(self):
+        """Test that recommendations without keywords plan nothing"""
+        recommendations = [{'type': 'format', 'suggestedText': 'Use bullet points'}]
+        
+        assert plan_keyword_placements(SAMPLE_RESUME, recommendations, 'Platform role') == {}
+    
+    def test_technical_keywords_go_to_skills(self):
+        """Test that technical keywords are planned for the skills section only"""
+        recommendations = [{'type': 'keyword', 'suggestedText': 'Docker'}]
+        
+        placements = plan_keyword_placements(SAMPLE_RESUME, recommendations, 'Platform role')
+        
+        assert placements == {'skills': ['Docker']}
+
+
+class TestMergeInjectedSkills:
+    """Test merging planned skills keywords onto another resume version"""
+    
+    def test_keeps_grammar_fixed_skills(self):
+        """Test that keywords are appended to the grammar-fixed skills, not replacing them"""
+        grammar_fixed = dict(SAMPLE_RESUME, summary='Backend engineer who builds APIs',
+                             skills=['Python', 'FastAPI', 'PostgreSQL'])
+        
+        merged = merge_injected_skills(grammar_fixed, ['Docker', 'fastapi'])
+        
+        assert merged['summary'] == 'Backend engineer who builds APIs'
+        assert merged['skills'] == ['Python', 'FastAPI', 'PostgreSQL', 'Docker']
+        assert grammar_fixed['skills'] == ['Python', 'FastAPI', 'PostgreSQL']
+    
+    def test_missing_skills_section_created(self):
+        """Test that a resume without skills gets the keywords as its skills list"""
+        resume = {'summary': 'Backend engineer'}
+        
+        assert merge_injected_skills(resume, ['Docker'])['skills'] == ['Docker']
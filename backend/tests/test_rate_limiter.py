@@ -0,0 +1,151 @@
+"""
+Unit tests for rate limiter
+Tests in-memory and Redis sliding-window limits
+"""
+
+import asyncio
+import pytest
+import redis
+from unittest.mock import AsyncMock, Mock, patch
+from fastapi import HTTPException
+from app import rate_limiter
+from app.rate_limiter import rate_limit, check_local_limit, check_redis_limit
+
+
+def make_request(ip: str = "10.0.0.1") -> Mock:
+    """Build a minimal request object with a client IP"""
+    request = Mock()
+    request.headers = {}
+    request.client.host = ip
+    return request
+
+
+@pytest.fixture(autouse=True)
+def clear_history():
+    """Start every test with an empty in-memory history"""
+    rate_limiter.request_history.clear()
+    yield
+    rate_limiter.request_history.clear()
+
+
+class TestLocalLimit:
+    """Test the per-process in-memory window"""
+    
+    def test_allows_up_to_limit(self):
+        """Test that requests under the limit are allowed"""
+        assert check_local_limit("1.1.1.1", 2, 60) == (True, 0)
+        assert check_local_limit("1.1.1.1", 2, 60) == (True, 0)
+        
+        allowed, retry_after = check_local_limit("1.1.1.1", 2, 60)
+        assert not allowed
+        assert 0 < retry_after <= 61
+    
+    def test_limits_are_per_ip(self):
+        """Test that one client does not consume another's quota"""
+        check_local_limit("1.1.1.1", 1, 60)
+        
+        assert check_local_limit("2.2.2.2", 1, 60) == (True, 0)
+
+
+class TestRedisLimit:
+    """Test the Redis sliding window"""
+    
+    def test_allowed_request(self):
+        """Test that an allowed script result passes through"""
+        script = AsyncMock(return_value=[1, 0])
+        
+        assert asyncio.run(check_redis_limit(script, "1.1.1.1", 5, 60)) == (True, 0)
+        
+        call = script.call_args.kwargs
+        assert call['keys'] == ["ratelimit:1.1.1.1"]
+        assert call['args'][1:3] == [60000, 5]
+    
+    def test_rejected_request_reports_retry_after(self):
+        """Test that retry-after is derived from the oldest request in the window"""
+        script = AsyncMock(return_value=[0, 1_000_000])
+        
+        with patch('app.rate_limiter.time.time', return_value=1_030.0):
+            allowed, retry_after = asyncio.run(check_redis_limit(script, "1.1.1.1", 5, 60))
+        
+        assert not allowed
+        assert retry_after == 31
+    
+    def test_decorator_uses_redis_when_configured(self):
+        """Test that the decorator rejects based on the shared window"""
+        script = AsyncMock(return_value=[0, 0])
+        
+        @rate_limit(max_requests=1, window_seconds=60)
+        async def endpoint(request):
+            return "ok"
+        
+        with patch.object(rate_limiter, 'get_sliding_window', return_value=script):
+            with pytest.raises(HTTPException) as exc:
+                asyncio.run(endpoint(make_request()))
+        
+        assert exc.value.status_code == 429
+        assert not rate_limiter.request_history
+    
+    def test_decorator_falls_back_when_redis_fails(self):
+        """Test that a Redis outage falls back to the in-memory window"""
+        script = AsyncMock(side_effect=ConnectionError("redis down"))
+        
+        @rate_limit(max_requests=1, window_seconds=60)
+        async def endpoint(request):
+            return "ok"
+        
+        with patch.object(rate_limiter, 'get_sliding_window', return_value=script):
+            assert asyncio.run(endpoint(make_request())) == "ok"
+            with pytest.raises(HTTPException):
+                asyncio.run(endpoint(make_request()))
+    
+    def test_decorator_falls_back_when_redis_times_out(self):
+        """Test that a Redis timeout falls back to the in-memory window"""
+        script = AsyncMock(side_effect=redis.exceptions.TimeoutError("Timeout connecting to server"))
+        
+        @rate_limit(max_requests=1, window_seconds=60)
+        async def endpoint(request):
+            return "ok"
+        
+        with patch.object(rate_limiter, 'get_sliding_window', return_value=script):
+            assert asyncio.run(endpoint(make_request())) == "ok"
+            with pytest.raises(HTTPException):
+                asyncio.run(endpoint(make_request()))
+    
+    def test_redis_client_uses_short_timeouts(self):
+        """Test that the Redis client gives up quickly on an unresponsive server"""
+        with patch.object(rate_limiter, 'REDIS_URL', 'redis://10.0.0.1:6379/0'), \
+             patch.object(rate_limiter, '_redis_client', None), \
+             patch.object(rate_limiter, '_sliding_window', None):
+            rate_limiter.get_sliding_window()
+            kwargs = rate_limiter._redis_client.connection_pool.connection_kwargs
+        
+        assert kwargs['socket_connect_timeout'] == rate_limiter.REDIS_SOCKET_TIMEOUT
+        assert kwargs['socket_timeout'] == rate_limiter.REDIS_SOCKET_TIMEOUT
+    
+    def test_limits_are_per_endpoint(self):
+        """Test that each endpoint has its own window for the same client"""
+        @rate_limit(max_requests=1, window_seconds=60)
+        async def first_endpoint(request):
+            return "first"
+        
+        @rate_limit(max_requests=1, window_seconds=60)
+        async def second_endpoint(request):
+            return "second"
+        
+        assert asyncio.run(first_endpoint(make_request())) == "first"
+        assert asyncio.run(second_endpoint(make_request())) == "second"
+        with pytest.raises(HTTPException):
+            asyncio.run(first_endpoint(make_request()))
+    
+    def test_redis_key_includes_endpoint(self):
+        """Test that the Redis bucket is keyed by client IP and endpoint"""
+        script = AsyncMock(return_value=[1, 0])
+        
+        @rate_limit(max_requests=5, window_seconds=60)
+        async def chat_endpoint(request):
+            return "ok"
+        
+        with patch.object(rate_limiter, 'get_sliding_window', return_value=script):
+            asyncio.run(chat_endpoint(make_request("10.0.0.9")))
+        
+        assert script.call_args.kwargs['keys'] == ["ratelimit:10.0.0.9:chat_endpoint"]
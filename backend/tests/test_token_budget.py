@@ -0,0 +1,39 @@
+"""
+Unit tests for token budget
+Tests token-based truncation and the character fallback
+"""
+
+from unittest.mock import patch
+from app.token_budget import truncate_to_tokens
+
+
+class TestTruncateToTokens:
+    """Test truncation with and without the tokenizer"""
+    
+    def setup_method(self):
+        truncate_to_tokens.cache_clear()
+    
+    def test_short_text_unchanged(self):
+        """Test that text within the budget is returned as-is"""
+        assert truncate_to_tokens("Python developer", 50) == "Python developer"
+    
+    def test_fallback_cuts_at_word_boundary(self):
+        """Test character budgeting when no tokenizer is available"""
+        with patch('app.token_budget.get_token_encoding', return_value=None):
+            result = truncate_to_tokens("alpha beta gamma delta", 3)
+        
+        assert result == "alpha beta"
+    
+    def test_uses_encoding_token_count(self):
+        """Test that the tokenizer's token count sets the cut point"""
+        class WordEncoding:
+            def encode(self, text, disallowed_special=()):
+                return text.split(' ')
+            
+            def decode(self, tokens):
+                return ' '.join(tokens)
+        
+        with patch('app.token_budget.get_token_encoding', return_value=WordEncoding()):
+            result = truncate_to_tokens("one two three four five", 2)
+        
+        assert result == "one two"
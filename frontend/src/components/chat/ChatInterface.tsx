@@ -37,6 +37,7 @@ export function ChatInterface({ analysisId }: ChatInterfaceProps) {
     messages, 
     sendMessage, 
     isSending, 
+    streamingResponse,
     error, 
     clearError, 
     setCurrentAnalysis, 
@@ -360,7 +361,10 @@ export function ChatInterface({ analysisId }: ChatInterfaceProps) {
             {messages.map((message) => (
               <MessageBubble key={message.id} message={message} />
             ))}
-            {isTyping && (
+            {isTyping && streamingResponse && (
+              <MessageBubble message={{ role: 'assistant', content: streamingResponse, timestamp: new Date() }} />
+            )}
+            {isTyping && !streamingResponse && (
               <div className="flex items-start gap-3" role="status" aria-live="polite" aria-label="Assistant is typing">
                 <div className="p-2 bg-blue-100 rounded-lg" aria-hidden="true">
                   <Bot className="w-4 h-4 text-blue-600" />
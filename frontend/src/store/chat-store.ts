@@ -64,6 +64,7 @@ interface ChatStore {
   isOffline: boolean
   messageQueue: QueuedMessage[]
   abortController: AbortController | null
+  streamingResponse: string
   
   // Actions
   sendMessage: (content: string) => Promise<void>
@@ -84,6 +85,46 @@ interface ChatStore {
   getContextFromCache: (analysisId: number) => Promise<ChatContext>
 }
 
+/**
+ * Read a Server-Sent Events response from /api/chat/stream
+ * Calls onText with the reply so far after each delta event
+ */
+async function readChatStream(
+  response: Response,
+  onText: (text: string) => void
+): Promise<string> {
+  const reader = response.body!.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let text = ''
+  
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    
+    buffer += decoder.decode(value, { stream: true })
+    const events = buffer.split('\n\n')
+    buffer = events.pop() ?? ''
+    
+    for (const event of events) {
+      if (event.startsWith('event: done')) {
+        return text
+      }
+      
+      const dataLine = event.split('\n').find(line => line.startsWith('data: '))
+      if (!dataLine) continue
+      
+      const { delta } = JSON.parse(dataLine.slice('data: '.length))
+      if (delta) {
+        text += delta
+        onText(text)
+      }
+    }
+  }
+  
+  return text
+}
+
 export const useChatStore = create<ChatStore>((set, get) => ({
   messages: [],
   currentAnalysisId: null,
@@ -96,6 +137,7 @@ export const useChatStore = create<ChatStore>((set, get) => ({
   isOffline: false,
   messageQueue: [],
   abortController: null,
+  streamingResponse: '',
   
   toggleSidebar: () => {
     set(state => ({ isOpen: !state.isOpen }))
@@ -311,8 +353,8 @@ export const useChatStore = create<ChatStore>((set, get) => ({
       const abortController = new AbortController()
       set({ abortController })
       
-      // Call chat API
-      const response = await fetch('http://localhost:8000/api/chat', {
+      // Call streaming chat API
+      const response = await fetch('http://localhost:8000/api/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -328,13 +370,11 @@ export const useChatStore = create<ChatStore>((set, get) => ({
         signal: abortController.signal
       })
       
-      // Clear abort controller
-      set({ abortController: null })
-      
       // Check if analysis switched during API call
       if (get().currentAnalysisId !== startAnalysisId) {
         console.log('Analysis switched during API call, discarding response')
-        set({ isSending: false })
+        abortController.abort()
+        set({ isSending: false, abortController: null })
         return
       }
       
@@ -365,12 +405,26 @@ export const useChatStore = create<ChatStore>((set, get) => ({
         }
       }
       
-      const data = await response.json()
+      // Show the reply as it streams in; the abort controller stays set so
+      // switching analyses can still cancel the stream
+      const responseText = await readChatStream(response, (text) => {
+        if (get().currentAnalysisId === startAnalysisId) {
+          set({ streamingResponse: text })
+        }
+      })
+      set({ abortController: null, streamingResponse: '' })
+      
+      // Check if analysis switched while streaming
+      if (get().currentAnalysisId !== startAnalysisId) {
+        console.log('Analysis switched during API call, discarding response')
+        set({ isSending: false })
+        return
+      }
       
       // Create assistant message
       const assistantMessage: any = {
         role: 'assistant',
-        content: data.response,
+        content: responseText,
         timestamp: new Date(),
         analysisId: currentAnalysisId,
         sessionId: `session-${currentAnalysisId}`
@@ -415,7 +469,7 @@ export const useChatStore = create<ChatStore>((set, get) => ({
       // Don't show error if request was aborted due to analysis switch
       if (error.name === 'AbortError') {
         console.log('Request aborted due to analysis switch')
-        set({ isSending: false, abortController: null })
+        set({ isSending: false, abortController: null, streamingResponse: '' })
         return
       }
       
@@ -441,7 +495,8 @@ export const useChatStore = create<ChatStore>((set, get) => ({
       set({ 
         error: errorMessage,
         isSending: false,
-        abortController: null
+        abortController: null,
+        streamingResponse: ''
       })
     }
   },